@@ -44,6 +44,12 @@ def create_app(config_class=Config):
     
     # Create database tables
     with app.app_context():
+        from app.models.inventory import create_missing_indexes
         db.create_all()
+        create_missing_indexes()
+    
+    # Load the Ollama model in the background and keep it warm while in use
+    from app.services.ollama_service import model_residency
+    model_residency.start(app)
     
     return app
\ No newline at end of file
@@ -1,68 +1,875 @@
 from flask import current_app
 import pandas as pd
+import io
 import os
+import re
 import csv
-from datetime import datetime
+import zlib
+import hashlib
+import random
+import tempfile
+from datetime import datetime, timezone
 import json
-from app.services.ollama_service import OllamaService
+from sqlalchemy.orm import defer
+from app.services.ollama_service import OllamaService, generate_tiered, stream_tiered
+from app.services.model_tiers import model_ladder, ladder_key
+from app.services.llm_gate import LLMOverloaded
+from app.services.inventory_snapshot import get_inventory_snapshot
+from app.services.response_cache import insight_cache, cache_key
+
+# Columns written to inventory exports, in order
+EXPORT_FIELDS = ['id', 'name', 'category', 'supplier', 'current_stock',
+                 'reorder_level', 'purchase_price', 'selling_price', 'stock_status']
+
+# Delta exports add the kind of change as a trailing column: 'upsert' or 'delete'
+DELTA_EXPORT_FIELDS = EXPORT_FIELDS + ['change']
+
+def parse_since(value):
+    """
+    Turn a delta export cutoff into a naive UTC datetime.
+    
+    Accepts an inventory version as returned by Product.inventory_version()
+    (``counter:timestamp``), an ISO 8601 timestamp, or Unix epoch seconds.
+    """
+    value = value.strip()
+    count, sep, stamp = value.partition(':')
+    if sep and count.isdigit():
+        # Inventory version; an empty timestamp means the table was empty
+        value = stamp
+        if not value:
+            return datetime.min
+    else:
+        try:
+            return datetime.fromtimestamp(float(value), tz=timezone.utc).replace(tzinfo=None)
+        except (ValueError, OverflowError, OSError):
+            pass
+    
+    try:
+        cutoff = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        raise ValueError(f"Invalid since value '{value}'. Use an inventory version, an ISO timestamp or epoch seconds")
+    if cutoff.tzinfo is not None:
+        cutoff = cutoff.astimezone(timezone.utc).replace(tzinfo=None)
+    return cutoff
+
+def stock_status(current_stock, reorder_level):
+    """Classify a stock level as OUT_OF_STOCK, LOW_STOCK or IN_STOCK."""
+    if current_stock <= 0:
+        return 'OUT_OF_STOCK'
+    elif current_stock <= reorder_level:
+        return 'LOW_STOCK'
+    return 'IN_STOCK'
+
+# Hex digits of the content hash used in export file names
+EXPORT_HASH_LENGTH = 16
+
+# Maps inventory versions to the content hash of the export taken at that version
+EXPORT_INDEX_FILE = 'export_index.json'
+
+# Number of inventory versions remembered in the export index
+EXPORT_INDEX_SIZE = 256
+
+def _load_export_index(export_dir):
+    try:
+        with open(os.path.join(export_dir, EXPORT_INDEX_FILE)) as index_file:
+            index = json.load(index_file)
+        return index if isinstance(index, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+def _save_export_index(export_dir, index):
+    # Keep only the most recently recorded versions
+    entries = list(index.items())[-EXPORT_INDEX_SIZE:]
+    tmp_path = os.path.join(export_dir, EXPORT_INDEX_FILE + '.tmp')
+    with open(tmp_path, 'w') as index_file:
+        json.dump(dict(entries), index_file)
+    os.replace(tmp_path, os.path.join(export_dir, EXPORT_INDEX_FILE))
+
+def prune_export_index(export_dir):
+    """
+    Drop export index entries whose files no longer exist.
+    
+    Returns:
+        Number of entries dropped
+    """
+    index = _load_export_index(export_dir)
+    existing = {version: digest for version, digest in index.items()
+                if os.path.exists(os.path.join(export_dir, f'inventory_export_{digest}.csv'))}
+    if len(existing) != len(index):
+        _save_export_index(export_dir, existing)
+    return len(index) - len(existing)
+
+def _default_file_mode():
+    # Mode open() gives new files; mkstemp always creates them 0600
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+# Permissions given to stored export files
+EXPORT_FILE_MODE = _default_file_mode()
+
+def prune_exports(export_dir, max_age_days=None, max_files=None, max_bytes=None, dry_run=False):
+    """
+    Delete stored inventory exports that fall outside the retention policy.
+    
+    Exports are kept newest first while they are younger than
+    ``max_age_days``, fewer than ``max_files`` and within ``max_bytes`` in
+    total; any limit set to None is not enforced. Legacy timestamped
+    exports are covered as well. The export index is left alone; see
+    prune_export_index.
+    
+    Returns:
+        Dict with the removed file names, the number kept and bytes freed
+    """
+    exports = []
+    for name in os.listdir(export_dir):
+        if name.startswith('inventory_export_') and name.endswith('.csv'):
+            path = os.path.join(export_dir, name)
+            stat = os.stat(path)
+            exports.append((stat.st_mtime, stat.st_size, name))
+    exports.sort(reverse=True)
+    
+    cutoff = datetime.now().timestamp() - max_age_days * 86400 if max_age_days is not None else None
+    kept, kept_bytes = [], 0
+    removed, freed = [], 0
+    for mtime, size, name in exports:
+        if (cutoff is not None and mtime < cutoff) or \
+           (max_files is not None and len(kept) >= max_files) or \
+           (max_bytes is not None and kept_bytes + size > max_bytes):
+            removed.append(name)
+            freed += size
+            if not dry_run:
+                os.remove(os.path.join(export_dir, name))
+        else:
+            kept.append(name)
+            kept_bytes += size
+    
+    return {'removed': removed, 'kept': len(kept), 'bytes_freed': freed}
+
+# Formats served by the columnar export and their Arrow writers
+COLUMNAR_FORMATS = {
+    'parquet': 'application/vnd.apache.parquet',
+    'arrow': 'application/vnd.apache.arrow.stream',
+    'feather': 'application/vnd.apache.arrow.file'
+}
+
+# How sales history is attached to a columnar export
+HISTORY_MODES = ('none', 'nested', 'long')
+
+def _columnar_schema(history, dictionary_encode=True):
+    """Arrow schema of a columnar export for the given history mode"""
+    import pyarrow as pa
+    
+    def label(index_type):
+        # Low-cardinality labels are dictionary-encoded where the format allows it
+        return pa.dictionary(index_type, pa.string()) if dictionary_encode else pa.string()
+    
+    if history == 'long':
+        return pa.schema([
+            ('product_id', pa.string()),
+            ('day', pa.string()),
+            ('day_number', pa.int32()),
+            ('quantity', pa.float64())
+        ])
+    
+    fields = [
+        ('id', pa.string()),
+        ('name', pa.string()),
+        ('category', label(pa.int32())),
+        ('supplier', label(pa.int32())),
+        ('current_stock', pa.int64()),
+        ('reorder_level', pa.int64()),
+        ('purchase_price', pa.float64()),
+        ('selling_price', pa.float64()),
+        ('lead_time', pa.int64()),
+        ('stock_status', label(pa.int8())),
+        ('updated_at', pa.timestamp('us'))
+    ]
+    if history == 'nested':
+        fields.append(('historical_sales', pa.list_(pa.struct([
+            ('day', pa.string()),
+            ('quantity', pa.float64())
+        ]))))
+    return pa.schema(fields)
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only stream that hands written bytes back to a generator"""
+    
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+    
+    def writable(self):
+        return True
+    
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+    
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+# System prompt for Ollama-generated inventory insights
+INSIGHTS_SYSTEM_PROMPT = "You are an inventory management expert. Analyze the data and provide specific, actionable insights."
+
+# Phrase tables for the rule-based assistant, matched case-insensitively
+BASIC_GREETINGS = (
+    "hello", "hi", "hey", "hi there", "hello there", "greetings",
+    "good morning", "good afternoon", "good evening", "good day"
+)
+CASUAL_GREETINGS = (
+    "what's up", "how's it going", "how are you", "how are you doing",
+    "how's everything", "how's your day", "howdy", "yo", "hey there"
+)
+FORMAL_GREETINGS = (
+    "good day to you", "pleased to meet you", "it's nice to meet you",
+    "how do you do", "welcome"
+)
+CONTEXTUAL_GREETINGS = (
+    "hello inventiq", "hi assistant", "hey smart assistant",
+    "hello inventory assistant", "greetings inventiq assistant"
+)
+INTENT_GREETINGS = (
+    "hello, can you help me", "hi, i need assistance", "hey there, i have a question",
+    "good morning, i'd like some information", "hello, are you available"
+)
+TIME_GREETINGS = ("morning", "afternoon", "evening")
+FAREWELL_GREETINGS = ("good night", "goodnight", "night", "bye", "goodbye", "see you", "see ya", "farewell", "take care", "later", "cya")
+GREETING_WORDS = ("hello", "hi", "hey", "greetings")
+TIME_WORDS = ("morning", "afternoon", "evening", "night", "day")
+TIME_PREFIXES = ("good", "nice")
+QUESTION_WORDS = ("how", "what", "who")
+THANK_PHRASES = ("thank", "thanks", "appreciate", "grateful", "thank you", "thx", "ty", "thankyou")
+ASSISTANT_QUESTIONS = (
+    "who are you", "what can you do", "help me", "what are you", "tell me about yourself",
+    "your capabilities", "what do you do", "how can you help", "what's your purpose",
+    "how do you work", "your functions", "assistant info", "about you", "your features"
+)
+INVENTIQ_QUESTIONS = (
+    "what is inventiq", "about inventiq", "tell me about inventiq", "inventiq system",
+    "inventiq features", "inventiq capabilities", "how does inventiq work",
+    "inventiq benefits", "why use inventiq", "inventiq overview", "inventiq details"
+)
+
+def _phrase_pattern(phrases):
+    """Compile phrases into a single alternation that finds any of them as a substring"""
+    # Longest first so the automaton prefers the most specific phrase
+    ordered = sorted(set(phrases), key=len, reverse=True)
+    return re.compile('|'.join(re.escape(phrase) for phrase in ordered))
+
+def _prefix_pattern(words):
+    """Compile words into a pattern matching a query that starts with one of them and a space"""
+    return re.compile('(?:' + '|'.join(re.escape(word) for word in words) + ') ')
+
+# Exact-match tables, built once
+_ALL_GREETINGS = frozenset(BASIC_GREETINGS + CASUAL_GREETINGS + FORMAL_GREETINGS + CONTEXTUAL_GREETINGS +
+                           INTENT_GREETINGS + TIME_GREETINGS + FAREWELL_GREETINGS)
+_BASIC_GREETINGS = frozenset(BASIC_GREETINGS)
+_CASUAL_GREETINGS = frozenset(CASUAL_GREETINGS)
+_FORMAL_GREETINGS = frozenset(FORMAL_GREETINGS)
+_FAREWELLS = frozenset(FAREWELL_GREETINGS)
+_TIMED_GREETINGS = frozenset(f"{prefix} {time}" for prefix in TIME_PREFIXES for time in TIME_WORDS)
+_STANDALONE_GREETINGS = frozenset(GREETING_WORDS + TIME_WORDS)
+
+# Substring and prefix matchers, compiled once
+_FAREWELL_RE = _phrase_pattern(FAREWELL_GREETINGS)
+_FAREWELL_WORD_RE = re.compile(r'\b(?:' + _FAREWELL_RE.pattern + r')\b')
+_BYE_RE = _phrase_pattern(("bye", "goodbye", "see you"))
+_GREETING_PREFIX_RE = _prefix_pattern(GREETING_WORDS)
+_QUESTION_PREFIX_RE = _prefix_pattern(QUESTION_WORDS)
+_QUESTION_GREETING_RE = _phrase_pattern(("you", "going", "day"))
+_CASUAL_RE = _phrase_pattern(("what's up", "how's it going", "how are you"))
+_INTENT_RE = _phrase_pattern(("can you help", "need assistance", "have a question"))
+_CONTEXTUAL_RE = _phrase_pattern(("assistant", "inventiq"))
+_THANK_RE = _phrase_pattern(THANK_PHRASES)
+_THANK_WORD_RE = re.compile(r'\b(?:' + _THANK_RE.pattern + r')\b')
+_ASSISTANT_RE = _phrase_pattern(ASSISTANT_QUESTIONS)
+_INVENTIQ_RE = _phrase_pattern(INVENTIQ_QUESTIONS)
+_INVENTIQ_TOPIC_RE = _phrase_pattern(("what", "about", "tell", "how", "why"))
+_LOW_STOCK_RE = _phrase_pattern(("low stock", "running low", "what products are low"))
+_OUT_OF_STOCK_RE = _phrase_pattern(("critical", "out of stock"))
+_CATEGORIES_RE = _phrase_pattern(("categories", "attention", "which categories"))
+
+# Canned replies; greeting replies take the time-of-day greeting as {time_greeting}
+NIGHT_FAREWELL_RESPONSES = (
+    "Good night! I'll be here if you need any inventory insights tomorrow. Rest well!",
+    "Sleep tight! Your inventory will be waiting for your attention tomorrow.",
+    "Have a restful night! I'll keep an eye on your inventory while you're away.",
+    "Good night! Dream of perfectly optimized inventory levels!",
+    "Night! I'll be here ready to assist with your inventory needs when you return."
+)
+BYE_FAREWELL_RESPONSES = (
+    "Goodbye! I'll be here when you need inventory insights again!",
+    "See you soon! Your inventory data will be ready for analysis when you return.",
+    "Bye for now! I'll keep monitoring your inventory metrics while you're away.",
+    "Take care! I'll be here to help optimize your inventory whenever you need me.",
+    "Farewell! Your inventory assistant will be waiting for your next question."
+)
+FAREWELL_RESPONSES = (
+    "Until next time! I'll be here for all your inventory management needs.",
+    "Take care! I'll keep your inventory data organized and ready for your return.",
+    "Goodbye for now! Looking forward to our next inventory analysis session.",
+    "See you later! I'll be here whenever you need inventory insights.",
+    "Farewell! Your inventory is in good hands until we chat again."
+)
+BASIC_GREETING_RESPONSES = (
+    "{time_greeting} I'm your InventIQ Smart Assistant. I can help you with inventory insights, stock levels, category analysis, and more. How can I assist you today?",
+    "{time_greeting} Welcome to InventIQ! I'm here to make inventory management a breeze. What would you like to explore today?",
+    "{time_greeting} Great to see you! I'm your inventory management assistant. Ready to dive into your stock data?",
+    "{time_greeting} InventIQ at your service! Let's tackle your inventory challenges together. What's on your mind?",
+    "{time_greeting} Your inventory command center is active! How can I help optimize your stock management today?"
+)
+TIME_GREETING_RESPONSES = (
+    "{time_greeting} I'm your InventIQ Smart Assistant. How can I help with your inventory management today?",
+    "{time_greeting} Perfect timing! Your inventory dashboard is ready for exploration. What would you like to focus on?",
+    "{time_greeting} Hope you're having a productive day! I'm here to provide inventory insights whenever you need them.",
+    "{time_greeting} Your InventIQ assistant is online and ready to analyze your inventory data. What shall we examine?",
+    "{time_greeting} Time for some inventory magic! What aspect of your stock would you like to explore?"
+)
+CASUAL_GREETING_RESPONSES = (
+    "{time_greeting} How's it going? I'm your InventIQ Smart Assistant. I can help you with inventory insights, stock levels, category analysis, and more. What would you like to know today?",
+    "{time_greeting} I'm doing great! Your inventory is looking interesting today. Anything specific you'd like to check out?",
+    "{time_greeting} All systems operational! I've been analyzing your inventory trends while waiting. What can I help you discover?",
+    "{time_greeting} Hey there! I'm ready to dive into inventory data whenever you are. What's on your mind?",
+    "{time_greeting} I'm fantastic, thanks for asking! Your inventory is waiting for your expert attention. Where should we focus?"
+)
+FORMAL_GREETING_RESPONSES = (
+    "{time_greeting} It's a pleasure to assist you. I'm the InventIQ Smart Assistant, ready to provide inventory insights, stock analysis, and category performance data. How may I be of service?",
+    "{time_greeting} At your service! I'm delighted to help with your inventory management needs. What information would you like to review?",
+    "{time_greeting} Welcome to your inventory command center. I'm prepared to assist with detailed analytics and insights. How may I help you today?",
+    "{time_greeting} I'm honored to assist with your inventory management. My analytics are at your disposal. What would you like to examine?",
+    "{time_greeting} A pleasure to see you. Your inventory dashboard awaits your instructions. How may I be of assistance?"
+)
+INTENT_GREETING_RESPONSES = (
+    "{time_greeting} I'm here to help! As your InventIQ Smart Assistant, I can provide inventory insights, analyze stock levels, identify trends, and more. What specific information are you looking for?",
+    "{time_greeting} Absolutely! I specialize in inventory analytics. Tell me what you need, and I'll find the answers in your data.",
+    "{time_greeting} Help is my middle name! Your inventory questions are my priority. What would you like to know about your stock?",
+    "{time_greeting} I'd be delighted to assist! Whether it's low stock alerts, category performance, or trend analysis, I've got you covered.",
+    "{time_greeting} That's what I'm here for! Your inventory management companion is ready to tackle any question you have."
+)
+CONTEXTUAL_GREETING_RESPONSES = (
+    "{time_greeting} I'm your InventIQ inventory assistant. Ready to provide insights on your stock levels, product categories, and inventory health. What would you like to know?",
+    "{time_greeting} InventIQ assistant online! Your inventory data is processed and ready for analysis. What aspects would you like to explore?",
+    "{time_greeting} You called for InventIQ? I'm here with all your inventory data at my fingertips. What shall we analyze today?",
+    "{time_greeting} Your personal inventory analyst reporting for duty! The InventIQ system is ready to provide insights. What's your focus today?",
+    "{time_greeting} InventIQ assistant at your service! I've been monitoring your inventory metrics. Would you like a summary or specific details?"
+)
+DEFAULT_GREETING_RESPONSES = (
+    "{time_greeting} I'm your InventIQ Smart Assistant. I can help you with inventory insights, stock levels, category analysis, and more. How can I assist you today?",
+    "{time_greeting} InventIQ is ready to analyze your inventory! From stock levels to sales trends, I'm here to help. What would you like to know?",
+    "{time_greeting} Your inventory management just got smarter! I'm here to provide insights and answer questions about your stock. What can I help with?",
+    "{time_greeting} Ready to make inventory management effortless! Ask me about stock levels, product performance, or category insights.",
+    "{time_greeting} InventIQ assistant online and ready to serve! Your inventory data is at my fingertips. What would you like to explore today?"
+)
+THANK_RESPONSES = (
+    "You're welcome! I'm happy to help with your inventory management needs. Is there anything else you'd like to know?",
+    "Anytime! Your inventory success is my priority. What else can I assist you with today?",
+    "It's my pleasure! I'm here to make inventory management easier for you. Need anything else?",
+    "Glad I could help! Your inventory insights are just a question away. What's next on your mind?",
+    "No problem at all! That's what I'm here for. Any other inventory questions I can answer?",
+    "You're most welcome! I enjoy providing valuable inventory insights. What other aspects would you like to explore?",
+    "Happy to be of service! Your inventory management journey is important to me. What else can I help with?",
+    "The pleasure is mine! I'm always ready to dive into inventory data. What other insights would you like?"
+)
+ASSISTANT_INFO_RESPONSES = (
+    "I'm the InventIQ Smart Assistant, designed to help you manage your inventory efficiently. I can provide insights about:\n\n" + \
+    "1. Low stock items and reorder recommendations\n" + \
+    "2. Out of stock products that need immediate attention\n" + \
+    "3. Category performance and which categories need focus\n" + \
+    "4. Overall inventory health and valuation\n" + \
+    "5. Product-specific details and stock history\n\n" + \
+    "You can ask me questions like 'What products are low on stock?', 'Which categories need attention?', 'How is my overall inventory health?', or about specific products or categories. I'm here to make inventory management easier for you!",
+
+    "I'm your InventIQ Smart Assistant! Think of me as your inventory management partner. My capabilities include:\n\n" + \
+    "✓ Identifying low stock and out-of-stock items\n" + \
+    "✓ Analyzing category performance metrics\n" + \
+    "✓ Providing comprehensive inventory health reports\n" + \
+    "✓ Offering product-specific insights and history\n" + \
+    "✓ Suggesting optimal reorder quantities\n\n" + \
+    "Just ask me anything about your inventory in natural language, and I'll provide the insights you need to make informed decisions!",
+
+    "Hello! I'm your AI-powered inventory assistant, designed to transform how you manage stock. Here's what I can do for you:\n\n" + \
+    "• Provide real-time low stock alerts and recommendations\n" + \
+    "• Identify products that need immediate restocking\n" + \
+    "• Analyze performance across different product categories\n" + \
+    "• Assess overall inventory health and optimization opportunities\n" + \
+    "• Deliver detailed product analytics and historical trends\n\n" + \
+    "Simply ask me questions about your inventory in everyday language, and I'll handle the complex data analysis for you!",
+
+    "I'm the InventIQ Smart Assistant, your inventory management companion! My purpose is to help you:\n\n" + \
+    "1️⃣ Stay ahead of stock shortages with timely alerts\n" + \
+    "2️⃣ Identify products requiring immediate attention\n" + \
+    "3️⃣ Understand which product categories are thriving or struggling\n" + \
+    "4️⃣ Get a complete picture of your inventory health\n" + \
+    "5️⃣ Access detailed product insights instantly\n\n" + \
+    "Ask me anything about your inventory, and I'll translate complex data into actionable insights. How can I assist you today?",
+
+    "Greetings! I'm your InventIQ Smart Assistant, bringing AI-powered intelligence to your inventory management. My capabilities include:\n\n" + \
+    "★ Stock level monitoring and alerts\n" + \
+    "★ Out-of-stock product identification\n" + \
+    "★ Category performance analysis\n" + \
+    "★ Comprehensive inventory health assessment\n" + \
+    "★ Product-specific analytics and history\n\n" + \
+    "I understand natural language, so you can simply ask questions like you would to a human inventory specialist. How can I optimize your inventory management today?"
+)
+INVENTIQ_INFO_RESPONSES = (
+    "InventIQ is a next-generation smart inventory management system with the following key features:\n\n" + \
+    "1. AI-Powered Smart Assistant: Natural language interface for inventory insights\n" + \
+    "2. Predictive Analytics: Advanced demand forecasting and trend analysis\n" + \
+    "3. Comprehensive Dashboard: Real-time inventory metrics and visualizations\n" + \
+    "4. Smart Notifications: Automated alerts for low stock and reordering\n" + \
+    "5. Voice Integration: Hands-free operation with voice commands\n" + \
+    "6. Category Analysis: Performance tracking across product categories\n" + \
+    "7. Multi-user Support: Role-based access for team collaboration\n\n" + \
+    "InventIQ helps businesses optimize inventory levels, reduce costs, prevent stockouts, and make data-driven decisions for improved profitability and customer satisfaction.",
+
+    "Welcome to InventIQ - your revolutionary inventory management solution! Here's what makes us special:\n\n" + \
+    "🔹 Conversational AI Assistant - Talk to your inventory system naturally\n" + \
+    "🔹 Smart Forecasting - Predict demand before it happens\n" + \
+    "🔹 Interactive Dashboards - Visual insights at your fingertips\n" + \
+    "🔹 Proactive Alerts - Never miss a reorder point again\n" + \
+    "🔹 Voice-Controlled Interface - Manage inventory hands-free\n" + \
+    "🔹 Deep Category Insights - Understand performance across product lines\n" + \
+    "🔹 Team Collaboration Tools - Everyone stays in sync\n\n" + \
+    "InventIQ transforms inventory from a cost center to a strategic advantage by eliminating stockouts, reducing excess inventory, and providing actionable intelligence.",
+
+    "InventIQ is the intelligent inventory management platform designed for modern businesses:\n\n" + \
+    "⚡ AI-Powered Insights - Get answers about your inventory in plain English\n" + \
+    "⚡ Future-Proof Forecasting - Machine learning algorithms predict demand patterns\n" + \
+    "⚡ Visual Analytics Dashboard - See your inventory health at a glance\n" + \
+    "⚡ Intelligent Notification System - Get alerts before problems occur\n" + \
+    "⚡ Voice Command System - Manage inventory while multitasking\n" + \
+    "⚡ Product Category Intelligence - Optimize across product categories\n" + \
+    "⚡ Collaborative Workflow - Perfect for teams of any size\n\n" + \
+    "By implementing InventIQ, businesses typically reduce carrying costs by 20%, eliminate 95% of stockouts, and save 15+ hours per week on inventory management tasks.",
+
+    "InventIQ: Redefining Inventory Management for the AI Age\n\n" + \
+    "📊 Features That Set Us Apart:\n\n" + \
+    "• Smart Assistant Technology - Ask questions in everyday language\n" + \
+    "• Predictive Inventory Intelligence - Stay ahead of market demands\n" + \
+    "• Dynamic Dashboard Environment - Customizable real-time metrics\n" + \
+    "• Intelligent Alert Ecosystem - Timely, relevant notifications\n" + \
+    "• Voice-First Interface Option - Effortless hands-free control\n" + \
+    "• Category Performance Analytics - Granular product insights\n" + \
+    "• Team Collaboration Platform - Streamlined communication\n\n" + \
+    "InventIQ transforms inventory management from reactive to proactive, helping businesses maintain optimal stock levels while maximizing profitability and customer satisfaction.",
+
+    "InventIQ is your intelligent inventory management solution built on cutting-edge technology:\n\n" + \
+    "🔵 Core Capabilities:\n" + \
+    "• Conversational AI - Natural language inventory management\n" + \
+    "• Advanced Forecasting - ML-powered demand prediction\n" + \
+    "• Intuitive Visualization - Clear, actionable dashboards\n" + \
+    "• Smart Alert System - Context-aware notifications\n" + \
+    "• Voice Control - Seamless speech recognition\n" + \
+    "• Category Insights - Deep product performance analysis\n" + \
+    "• Team Management - Role-based collaborative access\n\n" + \
+    "Our system integrates with your existing workflows to provide immediate value through optimized stock levels, reduced carrying costs, and enhanced inventory intelligence."
+)
+
+def _classify_greeting(query_lower):
+    """Return (is_greeting, is_farewell) for a lower-cased query"""
+    # Farewell phrases have the highest priority
+    if _FAREWELL_RE.search(query_lower):
+        return True, True
+    if query_lower in _ALL_GREETINGS:
+        return True, query_lower in _FAREWELLS
+    # Time-based greetings (good morning, good night, etc.)
+    if query_lower in _TIMED_GREETINGS:
+        return True, "night" in query_lower
+    # Greeting words as standalone
+    if query_lower in _STANDALONE_GREETINGS:
+        return True, query_lower == "night"
+    # Greeting words at the start
+    if _GREETING_PREFIX_RE.match(query_lower):
+        return True, False
+    # Question-based greetings
+    if _QUESTION_PREFIX_RE.match(query_lower) and _QUESTION_GREETING_RE.search(query_lower):
+        return True, False
+    return False, False
+
+def smalltalk_kind(query):
+    """
+    Kind of conversational (non-data) question the rule-based assistant
+    answers: 'greeting', 'thanks', 'assistant' or 'inventiq', else None.
+    
+    Stricter than the assistant's own matching, so that data questions such
+    as "what sold last night" or "total quantity" are not taken for chat.
+    """
+    query_lower = query.lower().strip(' !.?,')
+    if query_lower in _ALL_GREETINGS or query_lower in _TIMED_GREETINGS or \
+       query_lower in _STANDALONE_GREETINGS or _GREETING_PREFIX_RE.match(query_lower) or \
+       _CASUAL_RE.search(query_lower):
+        return 'greeting'
+    # Farewells and thanks must be whole words, and farewells short
+    if _FAREWELL_WORD_RE.search(query_lower) and len(query_lower.split()) <= 3:
+        return 'greeting'
+    if _THANK_WORD_RE.search(query_lower):
+        return 'thanks'
+    if _ASSISTANT_RE.search(query_lower):
+        return 'assistant'
+    if _INVENTIQ_RE.search(query_lower) or ("inventiq" in query_lower and _INVENTIQ_TOPIC_RE.search(query_lower)):
+        return 'inventiq'
+    return None
+
+def _time_greeting():
+    """Greeting for the current time of day"""
+    current_hour = datetime.now().hour
+    if 5 <= current_hour < 12:
+        return "Good morning!"
+    elif 12 <= current_hour < 17:
+        return "Good afternoon!"
+    elif 17 <= current_hour < 22:
+        return "Good evening!"
+    return "Hello!"
+
+def _item_lines(items, prefix, stock_label='Current', reorder_label='Reorder'):
+    """One formatted line per product, built column-wise instead of row by row"""
+    if stock_label is None:
+        stock = 'Last known stock: 0'
+    else:
+        stock = stock_label + ': ' + items['current_stock'].astype(str)
+    return (prefix + items['name'].astype(str) + ' (' + stock + ', ' +
+            reorder_label + ': ' + items['reorder_level'].astype(str) + ')\n')
+
+def _category_sections(items, lines):
+    """Group per-product lines under a header for each category"""
+    grouped = lines.groupby(items['category'], sort=True)
+    blocks = grouped.agg(''.join)
+    counts = grouped.size()
+    return ''.join(f"Category: {category} ({counts[category]} items)\n{block}\n"
+                   for category, block in blocks.items())
+
+def _category_stats(df):
+    """Product count, total stock and stock value per category"""
+    return df.assign(
+        total_value=df['current_stock'] * df['purchase_price']
+    ).groupby('category').agg(
+        count=('id', 'count'),
+        current_stock=('current_stock', 'sum'),
+        total_value=('total_value', 'sum')
+    )
+
+def _category_overview(category_stats, with_stock):
+    """Category statistics section, one line per category"""
+    lines = '- ' + category_stats.index.to_series().astype(str) + ': ' + category_stats['count'].astype(str) + ' products, '
+    if with_stock:
+        lines = lines + 'Total stock: ' + category_stats['current_stock'].astype(str) + ', '
+    lines = lines + 'Value: $' + category_stats['total_value'].map('{:,.2f}'.format) + '\n'
+    return ''.join(lines)
+
+def _health_summary(df, low_stock_items, out_of_stock_items):
+    """Overall inventory health report"""
+    parts = [
+        "Inventory Health Summary:\n\n",
+        f"- Total Products: {len(df)}\n",
+        f"- Products Out of Stock: {len(out_of_stock_items)}\n",
+        f"- Products with Low Stock: {len(low_stock_items)}\n\n"
+    ]
+    if len(low_stock_items) > 0:
+        parts.append("Critical Items Requiring Attention:\n")
+        parts.append(''.join(_item_lines(low_stock_items.head(5), '- ')))
+        if len(low_stock_items) > 5:
+            parts.append(f"...and {len(low_stock_items) - 5} more items\n")
+    parts.append("\nCategory Overview:\n")
+    parts.append(_category_overview(_category_stats(df), with_stock=False))
+    return ''.join(parts)
 
 class ExportData:
     """Class for exporting inventory data to CSV and generating insights"""
     
     @staticmethod
-    def export_inventory_data():
-        """Export current inventory data to CSV"""
+    def iter_inventory_rows(batch_size=1000, since=None):
+        """
+        Yield export rows from a server-side cursor, one product at a time.
+        
+        With ``since`` only products updated after that datetime are read,
+        using the index on updated_at.
+        """
+        from app.models.inventory import Product
+        
+        query = Product.query.with_entities(
+            Product.id, Product.name, Product.category, Product.supplier,
+            Product.current_stock, Product.reorder_level,
+            Product.purchase_price, Product.selling_price
+        )
+        if since is not None:
+            query = query.filter(Product.updated_at > since)
+        query = query.order_by(Product.id).yield_per(batch_size)
+        
+        for row in query:
+            yield (
+                row.id, row.name, row.category, row.supplier,
+                row.current_stock, row.reorder_level,
+                row.purchase_price, row.selling_price,
+                stock_status(row.current_stock, row.reorder_level)
+            )
+    
+    @staticmethod
+    def iter_deleted_rows(since, batch_size=1000):
+        """Yield a tombstone row for each product deleted after ``since``"""
+        from app.models.inventory import ProductDeletion
+        
+        query = ProductDeletion.query.with_entities(ProductDeletion.product_id).filter(
+            ProductDeletion.deleted_at > since
+        ).distinct().order_by(ProductDeletion.product_id).yield_per(batch_size)
+        
+        blanks = ('',) * (len(EXPORT_FIELDS) - 1)
+        for row in query:
+            yield (row.product_id,) + blanks + ('delete',)
+    
+    @staticmethod
+    def iter_delta_rows(since, batch_size=1000):
+        """
+        Yield delta export rows: tombstones for products deleted after
+        ``since``, then upserts for products added or changed after it.
+        
+        Tombstones come first so a product deleted and re-created inside the
+        window ends up present once the rows are applied in order.
+        """
+        yield from ExportData.iter_deleted_rows(since, batch_size)
+        for row in ExportData.iter_inventory_rows(batch_size, since=since):
+            yield row + ('upsert',)
+    
+    @staticmethod
+    def iter_inventory_csv(batch_size=1000, compress=False, since=None):
+        """
+        Stream the inventory as CSV text chunks without touching the disk.
+        
+        Rows are buffered ``batch_size`` at a time, so memory stays constant
+        regardless of catalog size. With ``compress`` the chunks form a gzip
+        stream instead of plain CSV. With ``since`` (a datetime) only the
+        changes after it are written, as described in iter_delta_rows.
+        """
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        
+        def flush():
+            data = buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate(0)
+            return compressor.compress(data) if compressor else data
+        
+        if since is None:
+            writer.writerow(EXPORT_FIELDS)
+            rows = ExportData.iter_inventory_rows(batch_size)
+        else:
+            writer.writerow(DELTA_EXPORT_FIELDS)
+            rows = ExportData.iter_delta_rows(since, batch_size)
+        
+        for count, row in enumerate(rows, start=1):
+            writer.writerow(row)
+            if count % batch_size == 0:
+                chunk = flush()
+                if chunk:
+                    yield chunk
+        
+        chunk = flush()
+        if compressor:
+            chunk += compressor.flush()
+        if chunk:
+            yield chunk
+    
+    @staticmethod
+    def iter_inventory_batches(columns=None, history='none', batch_size=10000, dictionary_encode=True):
+        """
+        Yield the inventory as typed Arrow record batches.
+        
+        Args:
+            columns: Optional list of columns to keep
+            history: 'none', 'nested' to add historical_sales as a list of
+                (day, quantity) structs, or 'long' for one row per product and day
+            batch_size: Products read from the database per batch
+            dictionary_encode: Dictionary-encode category, supplier and stock_status
+        """
+        import pyarrow as pa
         from app.models.inventory import Product
+        from app.services.trend_store import parse_historical_sales, day_number
+        
+        if history not in HISTORY_MODES:
+            raise ValueError(f"Invalid history mode '{history}'. Use one of: {', '.join(HISTORY_MODES)}")
+        
+        schema = _columnar_schema(history, dictionary_encode)
+        if columns:
+            unknown = [column for column in columns if column not in schema.names]
+            if unknown:
+                raise ValueError(f"Unknown columns: {', '.join(unknown)}. Available: {', '.join(schema.names)}")
+            schema = pa.schema([schema.field(column) for column in columns])
+        
+        query = Product.query.order_by(Product.id).yield_per(batch_size)
+        if history == 'none':
+            # Skip loading the sales history text when it is not exported
+            query = query.options(defer(Product.historical_sales))
+        
+        def make_batch(data):
+            return pa.RecordBatch.from_pydict({name: data[name] for name in schema.names}, schema=schema)
+        
+        data = {name: [] for name in _columnar_schema(history).names}
+        rows = 0
+        for product in query:
+            if history == 'long':
+                for day, quantity in parse_historical_sales(product.historical_sales).items():
+                    try:
+                        qty = float(quantity)
+                    except (ValueError, TypeError):
+                        continue
+                    data['product_id'].append(product.id)
+                    data['day'].append(str(day))
+                    data['day_number'].append(day_number(day))
+                    data['quantity'].append(qty)
+            else:
+                data['id'].append(product.id)
+                data['name'].append(product.name)
+                data['category'].append(product.category)
+                data['supplier'].append(product.supplier)
+                data['current_stock'].append(product.current_stock)
+                data['reorder_level'].append(product.reorder_level)
+                data['purchase_price'].append(product.purchase_price)
+                data['selling_price'].append(product.selling_price)
+                data['lead_time'].append(product.lead_time)
+                data['stock_status'].append(stock_status(product.current_stock, product.reorder_level))
+                data['updated_at'].append(product.updated_at)
+                if history == 'nested':
+                    sales = []
+                    for day, quantity in parse_historical_sales(product.historical_sales).items():
+                        try:
+                            sales.append({'day': str(day), 'quantity': float(quantity)})
+                        except (ValueError, TypeError):
+                            continue
+                    data['historical_sales'].append(sales)
+            
+            rows += 1
+            if rows % batch_size == 0:
+                yield make_batch(data)
+                data = {name: [] for name in data}
+        
+        if any(data.values()) or rows == 0:
+            yield make_batch(data)
+    
+    @staticmethod
+    def iter_inventory_columnar(fmt, columns=None, history='none', batch_size=10000):
+        """
+        Stream the inventory as Parquet, Arrow IPC stream or Feather bytes.
+        
+        Each record batch is written and flushed to the response before the
+        next one is read, so memory stays bounded by ``batch_size``.
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
         
-        # Get all products
-        products = Product.query.all()
+        if fmt not in COLUMNAR_FORMATS:
+            raise ValueError(f"Invalid format '{fmt}'. Use one of: csv, {', '.join(COLUMNAR_FORMATS)}")
+        
+        # IPC files cannot replace a dictionary between batches, so Feather gets plain strings
+        batches = ExportData.iter_inventory_batches(columns, history, batch_size, dictionary_encode=fmt != 'feather')
+        first = next(batches)
+        
+        sink = _ChunkSink()
+        if fmt == 'parquet':
+            writer = pq.ParquetWriter(sink, first.schema, compression='snappy')
+            write = writer.write_batch
+        else:
+            stream = pa.PythonFile(sink, mode='w')
+            writer = pa.ipc.new_stream(stream, first.schema) if fmt == 'arrow' \
+                else pa.ipc.new_file(stream, first.schema)
+            write = writer.write_batch
         
-        # Create export directory if it doesn't exist
-        export_dir = os.path.join(current_app.root_path, 'exports')
+        write(first)
+        yield sink.drain()
+        for batch in batches:
+            write(batch)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+        writer.close()
+        yield sink.drain()
+    
+    @staticmethod
+    def get_export_dir():
+        """Directory holding stored export files"""
+        export_dir = current_app.config.get('EXPORT_DIR') or os.path.join(current_app.root_path, 'exports')
         os.makedirs(export_dir, exist_ok=True)
+        return export_dir
+    
+    @staticmethod
+    def export_inventory_data():
+        """
+        Export current inventory data to a content-addressed CSV file.
+        
+        Files are named by the hash of their contents, so identical inventory
+        states share one file. The inventory version each file was taken at
+        is remembered, making a repeat export of an unchanged inventory a
+        single lookup. The retention policy is applied after each new file.
+        """
+        from app.models.inventory import Product
+        
+        export_dir = ExportData.get_export_dir()
+        version = Product.inventory_version()
+        index = _load_export_index(export_dir)
         
-        # Generate timestamp for filename
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        csv_path = os.path.join(export_dir, f'inventory_export_{timestamp}.csv')
+        # Unchanged inventory: hand back the file taken at this version
+        digest = index.get(version)
+        if digest:
+            csv_path = os.path.join(export_dir, f'inventory_export_{digest}.csv')
+            if os.path.exists(csv_path):
+                return csv_path
         
-        # Write to CSV
-        with open(csv_path, 'w', newline='') as csvfile:
-            fieldnames = ['id', 'name', 'category', 'supplier', 'current_stock', 
-                          'reorder_level', 'purchase_price', 'selling_price', 'stock_status']
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+        # Stream to a temporary file while hashing, then keep it only if new
+        hasher = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=export_dir, prefix='.inventory_export_', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as csvfile:
+                for chunk in ExportData.iter_inventory_csv():
+                    hasher.update(chunk)
+                    csvfile.write(chunk)
             
-            writer.writeheader()
-            for product in products:
-                # Determine stock status
-                if product.current_stock <= 0:
-                    stock_status = 'OUT_OF_STOCK'
-                elif product.current_stock <= product.reorder_level:
-                    stock_status = 'LOW_STOCK'
-                else:
-                    stock_status = 'IN_STOCK'
-                    
-                writer.writerow({
-                    'id': product.id,
-                    'name': product.name,
-                    'category': product.category,
-                    'supplier': product.supplier,
-                    'current_stock': product.current_stock,
-                    'reorder_level': product.reorder_level,
-                    'purchase_price': product.purchase_price,
-                    'selling_price': product.selling_price,
-                    'stock_status': stock_status
-                })
+            digest = hasher.hexdigest()[:EXPORT_HASH_LENGTH]
+            csv_path = os.path.join(export_dir, f'inventory_export_{digest}.csv')
+            if os.path.exists(csv_path):
+                os.remove(tmp_path)
+                # Refresh the timestamp so retention treats it as recently used
+                os.utime(csv_path)
+            else:
+                os.chmod(tmp_path, EXPORT_FILE_MODE)
+                os.replace(tmp_path, csv_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        
+        index[version] = digest
+        _save_export_index(export_dir, index)
         
+        ExportData.apply_retention_policy(export_dir)
         return csv_path
     
     @staticmethod
-    def get_inventory_insights(query=None):
-        """Get AI-powered insights about inventory using Ollama"""
-        # Export latest data
-        csv_path = ExportData.export_inventory_data()
+    def apply_retention_policy(export_dir=None, dry_run=False):
+        """Prune stored exports using the EXPORT_RETENTION_* settings, then their index entries"""
+        export_dir = export_dir or ExportData.get_export_dir()
+        result = prune_exports(
+            export_dir,
+            max_age_days=current_app.config.get('EXPORT_RETENTION_DAYS', 30),
+            max_files=current_app.config.get('EXPORT_RETENTION_MAX_FILES', 20),
+            max_bytes=current_app.config.get('EXPORT_RETENTION_MAX_BYTES', 100 * 1024 * 1024),
+            dry_run=dry_run
+        )
+        if not dry_run:
+            prune_export_index(export_dir)
+        return result
+    
+    @staticmethod
+    def prepare_insights_prompt(query=None):
+        """
+        Snapshot the inventory and build the Ollama prompt for an insights query.
         
-        # Read the CSV data
-        df = pd.read_csv(csv_path)
+        Returns ``(version, df, summary, prompt, query)``, where ``query`` has
+        the default general question filled in when none was given.
+        """
+        # Shared DataFrame snapshot, rebuilt only when the inventory changes
+        version, df = get_inventory_snapshot()
         
         # Prepare inventory summary
         summary = {
@@ -70,7 +877,7 @@ class ExportData:
             'out_of_stock': len(df[df['stock_status'] == 'OUT_OF_STOCK']),
             'low_stock': len(df[df['stock_status'] == 'LOW_STOCK']),
             'categories': df['category'].unique().tolist(),
-            'total_value': (df['current_stock'] * df['purchase_price']).sum()
+            'total_value': float((df['current_stock'] * df['purchase_price']).sum())
         }
         
         # Prepare context for Ollama
@@ -91,521 +898,184 @@ class ExportData:
             3. Overall inventory health
             Keep the response concise and actionable."""
         
-        # Check if Ollama is available without raising exceptions
-        ollama_available = False
-        try:
-            # Quick health check without logging errors
-            import requests
-            from flask import current_app
-            base_url = current_app.config.get('OLLAMA_BASE_URL', 'http://localhost:11434')
-            health_response = requests.get(f"{base_url}/api/health", timeout=2)
-            ollama_available = health_response.status_code == 200
-        except:
-            # Silently handle connection issues
-            ollama_available = False
-        
-        if ollama_available:
-            try:
-                # Try to get insights from Ollama
-                ollama_service = OllamaService()
-                insights = ollama_service.generate(
-                    prompt=f"{context}\n\nQuery: {query}",
-                    system_prompt="You are an inventory management expert. Analyze the data and provide specific, actionable insights."
-                )
-            except Exception:
-                # Fallback to rule-based insights if Ollama generation fails
+        return version, df, summary, f"{context}\n\nQuery: {query}", query
+    
+    @staticmethod
+    def get_inventory_insights(query=None):
+        """Get AI-powered insights about inventory using Ollama"""
+        version, df, summary, prompt, query = ExportData.prepare_insights_prompt(query)
+        
+        ollama_service = OllamaService.from_config()
+        
+        # Answers generated for this question, model ladder and inventory version are reused
+        key = cache_key(query, None, ladder_key(model_ladder()), version)
+        insights = insight_cache.get(key)
+        if insights is None:
+            # Cached availability probe; never blocks on the network once warmed up
+            if ollama_service.is_available():
+                try:
+                    # Try to get insights from the model tier the question calls for
+                    insights = generate_tiered(
+                        query,
+                        prompt=prompt,
+                        system_prompt=INSIGHTS_SYSTEM_PROMPT
+                    )
+                    insight_cache.set(key, insights)
+                except LLMOverloaded:
+                    # Back-pressure is the caller's to report, not a reason to fall back
+                    raise
+                except Exception:
+                    # Fallback to rule-based insights if Ollama generation fails
+                    insights = ExportData.generate_rule_based_insights(df, query)
+            else:
+                # Use rule-based insights without attempting Ollama connection
                 insights = ExportData.generate_rule_based_insights(df, query)
-        else:
-            # Use rule-based insights without attempting Ollama connection
-            insights = ExportData.generate_rule_based_insights(df, query)
         
         return {
             'insights': insights,
             'summary': summary,
-            'export_path': csv_path
+            'inventory_version': version
         }
     
     @staticmethod
-    def generate_rule_based_insights(df, query):
-        """Generate rule-based insights when Ollama is not available"""
-        # Get low stock items
-        low_stock_items = df[df['stock_status'] == 'LOW_STOCK']
-        out_of_stock_items = df[df['stock_status'] == 'OUT_OF_STOCK']
+    def stream_inventory_insights(query=None):
+        """
+        Yield inventory insights piece by piece as Ollama generates them.
         
-        # Get category statistics
-        category_stats = df.groupby('category').agg({
-            'id': 'count',
-            'current_stock': 'sum',
-            'purchase_price': lambda x: (df.loc[x.index, 'current_stock'] * x).sum()
-        }).rename(columns={'id': 'count', 'purchase_price': 'total_value'})
+        Falls back to the rule-based answer, as a single piece, when Ollama
+        is unavailable or fails before producing any output. A failure after
+        output has started, or LLMOverloaded, is raised to the caller.
+        """
+        version, df, summary, prompt, query = ExportData.prepare_insights_prompt(query)
         
-        # Check for greetings and general conversation first
+        ollama_service = OllamaService.from_config()
+        
+        # A cached answer is sent whole
+        key = cache_key(query, None, ladder_key(model_ladder()), version)
+        cached = insight_cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+        
+        if ollama_service.is_available():
+            tokens = stream_tiered(query, prompt=prompt, system_prompt=INSIGHTS_SYSTEM_PROMPT)
+            try:
+                first = next(tokens, '')
+            except LLMOverloaded:
+                raise
+            except Exception:
+                first = None
+            if first is not None:
+                pieces = [first]
+                yield first
+                for piece in tokens:
+                    pieces.append(piece)
+                    yield piece
+                insight_cache.set(key, ''.join(pieces))
+                return
+        
+        yield ExportData.generate_rule_based_insights(df, query)
+    
+    @staticmethod
+    def generate_rule_based_insights(df, query):
+        """Generate rule-based insights when Ollama is not available"""
         query_lower = query.lower()
         
-        # Define comprehensive greeting lists exactly as provided by the user
-        # Basic Greetings
-        basic_greetings = [
-            "hello", "hi", "hey", "hi there", "hello there", "greetings", 
-            "good morning", "good afternoon", "good evening", "good day"
-        ]
-        
-        # Casual Greetings
-        casual_greetings = [
-            "what's up", "how's it going", "how are you", "how are you doing", 
-            "how's everything", "how's your day", "howdy", "yo", "hey there"
-        ]
-        
-        # Formal Greetings
-        formal_greetings = [
-            "good day to you", "pleased to meet you", "it's nice to meet you", 
-            "how do you do", "welcome"
-        ]
-        
-        # Contextual Greetings
-        contextual_greetings = [
-            "hello inventiq", "hi assistant", "hey smart assistant", 
-            "hello inventory assistant", "greetings inventiq assistant"
-        ]
-        
-        # Greeting with Intent
-        intent_greetings = [
-            "hello, can you help me", "hi, i need assistance", "hey there, i have a question", 
-            "good morning, i'd like some information", "hello, are you available"
-        ]
-        
-        # Time-specific Greetings
-        time_greetings = ["morning", "afternoon", "evening"]
-        
-        # Special cases
-        farewell_greetings = ["good night", "goodnight", "night", "bye", "goodbye", "see you", "see ya", "farewell", "take care", "later", "cya"]
-        
-        # Combine all greeting types for exact matching
-        all_greetings = basic_greetings + casual_greetings + formal_greetings + \
-                        contextual_greetings + intent_greetings + time_greetings + farewell_greetings
-        
-        # Create word lists for partial matching
-        greeting_words = ["hello", "hi", "hey", "greetings"]
-        time_words = ["morning", "afternoon", "evening", "night", "day"]
-        time_prefixes = ["good", "nice"]
-        question_words = ["how", "what", "who"]
-        
-        # Extremely robust greeting detection
-        is_greeting = False
-        is_farewell = False
-        
-        # Check for farewell phrases first (highest priority)
-        if any(farewell in query_lower for farewell in farewell_greetings):
-            is_greeting = True
-            is_farewell = True
-        
-        # Check for exact matches
-        elif query_lower in all_greetings:
-            is_greeting = True
-            if query_lower in farewell_greetings:
-                is_farewell = True
-        
-        # Check for common greeting patterns
-        elif any(query_lower == greeting for greeting in all_greetings):
-            is_greeting = True
-        
-        # Check for time-based greetings (good morning, good night, etc.)
-        elif any(f"{prefix} {time}" == query_lower for prefix in time_prefixes for time in time_words):
-            is_greeting = True
-            if "night" in query_lower:
-                is_farewell = True
-        
-        # Check for greeting words as standalone
-        elif any(word == query_lower for word in greeting_words + time_words):
-            is_greeting = True
-            if query_lower == "night":
-                is_farewell = True
-        
-        # Check for greeting words at the start
-        elif any(query_lower.startswith(word + " ") for word in greeting_words):
-            is_greeting = True
-        
-        # Check for question-based greetings
-        elif any(query_lower.startswith(question + " ") for question in question_words) and \
-             any(word in query_lower for word in ["you", "going", "day"]):
-            is_greeting = True
+        # Check for greetings and general conversation first
+        is_greeting, is_farewell = _classify_greeting(query_lower)
         
         if is_greeting:
             # Handle farewell greetings first (Good night, bye, etc.)
             if is_farewell:
-                import random
-                # Different responses based on time of day
-                from datetime import datetime
-                current_hour = datetime.now().hour
-                
-                if "night" in query_lower or "goodnight" in query_lower:
-                    farewell_responses = [
-                        "Good night! I'll be here if you need any inventory insights tomorrow. Rest well!",
-                        "Sleep tight! Your inventory will be waiting for your attention tomorrow.",
-                        "Have a restful night! I'll keep an eye on your inventory while you're away.",
-                        "Good night! Dream of perfectly optimized inventory levels!",
-                        "Night! I'll be here ready to assist with your inventory needs when you return."
-                    ]
-                elif "bye" in query_lower or "goodbye" in query_lower or "see you" in query_lower:
-                    farewell_responses = [
-                        "Goodbye! I'll be here when you need inventory insights again!",
-                        "See you soon! Your inventory data will be ready for analysis when you return.",
-                        "Bye for now! I'll keep monitoring your inventory metrics while you're away.",
-                        "Take care! I'll be here to help optimize your inventory whenever you need me.",
-                        "Farewell! Your inventory assistant will be waiting for your next question."
-                    ]
-                else:
-                    farewell_responses = [
-                        "Until next time! I'll be here for all your inventory management needs.",
-                        "Take care! I'll keep your inventory data organized and ready for your return.",
-                        "Goodbye for now! Looking forward to our next inventory analysis session.",
-                        "See you later! I'll be here whenever you need inventory insights.",
-                        "Farewell! Your inventory is in good hands until we chat again."
-                    ]
-                return random.choice(farewell_responses)
-                
-            # Personalize greeting based on time of day
-            from datetime import datetime
-            current_hour = datetime.now().hour
+                if "night" in query_lower:
+                    return random.choice(NIGHT_FAREWELL_RESPONSES)
+                elif _BYE_RE.search(query_lower):
+                    return random.choice(BYE_FAREWELL_RESPONSES)
+                return random.choice(FAREWELL_RESPONSES)
             
-            if 5 <= current_hour < 12:
-                time_greeting = "Good morning!"
-            elif 12 <= current_hour < 17:
-                time_greeting = "Good afternoon!"
-            elif 17 <= current_hour < 22:
-                time_greeting = "Good evening!"
-            else:
-                time_greeting = "Hello!"
-            
-            import random
-            
-            # Match exact greetings first
-            if query_lower in basic_greetings:
-                # Basic greeting responses
-                basic_responses = [
-                    f"{time_greeting} I'm your InventIQ Smart Assistant. I can help you with inventory insights, stock levels, category analysis, and more. How can I assist you today?",
-                    f"{time_greeting} Welcome to InventIQ! I'm here to make inventory management a breeze. What would you like to explore today?",
-                    f"{time_greeting} Great to see you! I'm your inventory management assistant. Ready to dive into your stock data?",
-                    f"{time_greeting} InventIQ at your service! Let's tackle your inventory challenges together. What's on your mind?",
-                    f"{time_greeting} Your inventory command center is active! How can I help optimize your stock management today?"
-                ]
-                return random.choice(basic_responses)
-                
-            # Handle time-specific greetings
-            elif query_lower in time_greetings or any(f"{prefix} {time}" == query_lower for prefix in time_prefixes for time in time_words):
-                # Time-specific greeting responses
-                time_responses = [
-                    f"{time_greeting} I'm your InventIQ Smart Assistant. How can I help with your inventory management today?",
-                    f"{time_greeting} Perfect timing! Your inventory dashboard is ready for exploration. What would you like to focus on?",
-                    f"{time_greeting} Hope you're having a productive day! I'm here to provide inventory insights whenever you need them.",
-                    f"{time_greeting} Your InventIQ assistant is online and ready to analyze your inventory data. What shall we examine?",
-                    f"{time_greeting} Time for some inventory magic! What aspect of your stock would you like to explore?"
-                ]
-                return random.choice(time_responses)
-                
-            # Handle casual greetings
-            elif query_lower in casual_greetings or any(casual in query_lower for casual in ["what's up", "how's it going", "how are you"]):
-                # Casual greeting responses
-                casual_responses = [
-                    f"{time_greeting} How's it going? I'm your InventIQ Smart Assistant. I can help you with inventory insights, stock levels, category analysis, and more. What would you like to know today?",
-                    f"{time_greeting} I'm doing great! Your inventory is looking interesting today. Anything specific you'd like to check out?",
-                    f"{time_greeting} All systems operational! I've been analyzing your inventory trends while waiting. What can I help you discover?",
-                    f"{time_greeting} Hey there! I'm ready to dive into inventory data whenever you are. What's on your mind?",
-                    f"{time_greeting} I'm fantastic, thanks for asking! Your inventory is waiting for your expert attention. Where should we focus?"
-                ]
-                return random.choice(casual_responses)
-                
-            # Handle formal greetings
-            elif query_lower in formal_greetings or "pleased to meet you" in query_lower or "welcome" == query_lower:
-                # Formal greeting responses
-                formal_responses = [
-                    f"{time_greeting} It's a pleasure to assist you. I'm the InventIQ Smart Assistant, ready to provide inventory insights, stock analysis, and category performance data. How may I be of service?",
-                    f"{time_greeting} At your service! I'm delighted to help with your inventory management needs. What information would you like to review?",
-                    f"{time_greeting} Welcome to your inventory command center. I'm prepared to assist with detailed analytics and insights. How may I help you today?",
-                    f"{time_greeting} I'm honored to assist with your inventory management. My analytics are at your disposal. What would you like to examine?",
-                    f"{time_greeting} A pleasure to see you. Your inventory dashboard awaits your instructions. How may I be of assistance?"
-                ]
-                return random.choice(formal_responses)
-                
-            # Handle intent greetings
-            elif any(intent in query_lower for intent in ["can you help", "need assistance", "have a question"]):
-                # Intent-based greeting responses
-                intent_responses = [
-                    f"{time_greeting} I'm here to help! As your InventIQ Smart Assistant, I can provide inventory insights, analyze stock levels, identify trends, and more. What specific information are you looking for?",
-                    f"{time_greeting} Absolutely! I specialize in inventory analytics. Tell me what you need, and I'll find the answers in your data.",
-                    f"{time_greeting} Help is my middle name! Your inventory questions are my priority. What would you like to know about your stock?",
-                    f"{time_greeting} I'd be delighted to assist! Whether it's low stock alerts, category performance, or trend analysis, I've got you covered.",
-                    f"{time_greeting} That's what I'm here for! Your inventory management companion is ready to tackle any question you have."
-                ]
-                return random.choice(intent_responses)
-                
-            # Handle contextual greetings
-            elif "assistant" in query_lower or "inventiq" in query_lower:
-                # Contextual greeting responses
-                contextual_responses = [
-                    f"{time_greeting} I'm your InventIQ inventory assistant. Ready to provide insights on your stock levels, product categories, and inventory health. What would you like to know?",
-                    f"{time_greeting} InventIQ assistant online! Your inventory data is processed and ready for analysis. What aspects would you like to explore?",
-                    f"{time_greeting} You called for InventIQ? I'm here with all your inventory data at my fingertips. What shall we analyze today?",
-                    f"{time_greeting} Your personal inventory analyst reporting for duty! The InventIQ system is ready to provide insights. What's your focus today?",
-                    f"{time_greeting} InventIQ assistant at your service! I've been monitoring your inventory metrics. Would you like a summary or specific details?"
-                ]
-                return random.choice(contextual_responses)
-                
-            # Default greeting response
+            # Personalize greeting based on time of day
+            if query_lower in _BASIC_GREETINGS:
+                responses = BASIC_GREETING_RESPONSES
+            elif query_lower in TIME_GREETINGS or query_lower in _TIMED_GREETINGS:
+                responses = TIME_GREETING_RESPONSES
+            elif query_lower in _CASUAL_GREETINGS or _CASUAL_RE.search(query_lower):
+                responses = CASUAL_GREETING_RESPONSES
+            elif query_lower in _FORMAL_GREETINGS or "pleased to meet you" in query_lower:
+                responses = FORMAL_GREETING_RESPONSES
+            elif _INTENT_RE.search(query_lower):
+                responses = INTENT_GREETING_RESPONSES
+            elif _CONTEXTUAL_RE.search(query_lower):
+                responses = CONTEXTUAL_GREETING_RESPONSES
             else:
-                # Default greeting responses
-                default_responses = [
-                    f"{time_greeting} I'm your InventIQ Smart Assistant. I can help you with inventory insights, stock levels, category analysis, and more. How can I assist you today?",
-                    f"{time_greeting} InventIQ is ready to analyze your inventory! From stock levels to sales trends, I'm here to help. What would you like to know?",
-                    f"{time_greeting} Your inventory management just got smarter! I'm here to provide insights and answer questions about your stock. What can I help with?",
-                    f"{time_greeting} Ready to make inventory management effortless! Ask me about stock levels, product performance, or category insights.",
-                    f"{time_greeting} InventIQ assistant online and ready to serve! Your inventory data is at my fingertips. What would you like to explore today?"
-                ]
-                return random.choice(default_responses)
-        
-        # Handle thank you and appreciation with more variations
-        thank_phrases = ["thank", "thanks", "appreciate", "grateful", "thank you", "thx", "ty", "thankyou"]
-        if any(phrase in query_lower for phrase in thank_phrases):
-            import random
-            thank_responses = [
-                "You're welcome! I'm happy to help with your inventory management needs. Is there anything else you'd like to know?",
-                "Anytime! Your inventory success is my priority. What else can I assist you with today?",
-                "It's my pleasure! I'm here to make inventory management easier for you. Need anything else?",
-                "Glad I could help! Your inventory insights are just a question away. What's next on your mind?",
-                "No problem at all! That's what I'm here for. Any other inventory questions I can answer?",
-                "You're most welcome! I enjoy providing valuable inventory insights. What other aspects would you like to explore?",
-                "Happy to be of service! Your inventory management journey is important to me. What else can I help with?",
-                "The pleasure is mine! I'm always ready to dive into inventory data. What other insights would you like?"
-            ]
-            return random.choice(thank_responses)
-        
-        # Handle questions about the assistant with more comprehensive detection
-        assistant_questions = [
-            "who are you", "what can you do", "help me", "what are you", "tell me about yourself",
-            "your capabilities", "what do you do", "how can you help", "what's your purpose",
-            "how do you work", "your functions", "assistant info", "about you", "your features"
-        ]
-        
-        if any(question in query_lower for question in assistant_questions):
-            import random
-            assistant_info_responses = [
-                "I'm the InventIQ Smart Assistant, designed to help you manage your inventory efficiently. I can provide insights about:\n\n" + \
-                "1. Low stock items and reorder recommendations\n" + \
-                "2. Out of stock products that need immediate attention\n" + \
-                "3. Category performance and which categories need focus\n" + \
-                "4. Overall inventory health and valuation\n" + \
-                "5. Product-specific details and stock history\n\n" + \
-                "You can ask me questions like 'What products are low on stock?', 'Which categories need attention?', 'How is my overall inventory health?', or about specific products or categories. I'm here to make inventory management easier for you!",
-                
-                "I'm your InventIQ Smart Assistant! Think of me as your inventory management partner. My capabilities include:\n\n" + \
-                "✓ Identifying low stock and out-of-stock items\n" + \
-                "✓ Analyzing category performance metrics\n" + \
-                "✓ Providing comprehensive inventory health reports\n" + \
-                "✓ Offering product-specific insights and history\n" + \
-                "✓ Suggesting optimal reorder quantities\n\n" + \
-                "Just ask me anything about your inventory in natural language, and I'll provide the insights you need to make informed decisions!",
-                
-                "Hello! I'm your AI-powered inventory assistant, designed to transform how you manage stock. Here's what I can do for you:\n\n" + \
-                "• Provide real-time low stock alerts and recommendations\n" + \
-                "• Identify products that need immediate restocking\n" + \
-                "• Analyze performance across different product categories\n" + \
-                "• Assess overall inventory health and optimization opportunities\n" + \
-                "• Deliver detailed product analytics and historical trends\n\n" + \
-                "Simply ask me questions about your inventory in everyday language, and I'll handle the complex data analysis for you!",
-                
-                "I'm the InventIQ Smart Assistant, your inventory management companion! My purpose is to help you:\n\n" + \
-                "1️⃣ Stay ahead of stock shortages with timely alerts\n" + \
-                "2️⃣ Identify products requiring immediate attention\n" + \
-                "3️⃣ Understand which product categories are thriving or struggling\n" + \
-                "4️⃣ Get a complete picture of your inventory health\n" + \
-                "5️⃣ Access detailed product insights instantly\n\n" + \
-                "Ask me anything about your inventory, and I'll translate complex data into actionable insights. How can I assist you today?",
-                
-                "Greetings! I'm your InventIQ Smart Assistant, bringing AI-powered intelligence to your inventory management. My capabilities include:\n\n" + \
-                "★ Stock level monitoring and alerts\n" + \
-                "★ Out-of-stock product identification\n" + \
-                "★ Category performance analysis\n" + \
-                "★ Comprehensive inventory health assessment\n" + \
-                "★ Product-specific analytics and history\n\n" + \
-                "I understand natural language, so you can simply ask questions like you would to a human inventory specialist. How can I optimize your inventory management today?"
-            ]
-            return random.choice(assistant_info_responses)
-        
-        # Handle questions about InventIQ with more comprehensive detection
-        inventiq_questions = [
-            "what is inventiq", "about inventiq", "tell me about inventiq", "inventiq system",
-            "inventiq features", "inventiq capabilities", "how does inventiq work", 
-            "inventiq benefits", "why use inventiq", "inventiq overview", "inventiq details"
-        ]
-        
-        if any(question in query_lower for question in inventiq_questions) or \
-           ("inventiq" in query_lower and any(word in query_lower for word in ["what", "about", "tell", "how", "why"])):
-            import random
-            inventiq_info_responses = [
-                "InventIQ is a next-generation smart inventory management system with the following key features:\n\n" + \
-                "1. AI-Powered Smart Assistant: Natural language interface for inventory insights\n" + \
-                "2. Predictive Analytics: Advanced demand forecasting and trend analysis\n" + \
-                "3. Comprehensive Dashboard: Real-time inventory metrics and visualizations\n" + \
-                "4. Smart Notifications: Automated alerts for low stock and reordering\n" + \
-                "5. Voice Integration: Hands-free operation with voice commands\n" + \
-                "6. Category Analysis: Performance tracking across product categories\n" + \
-                "7. Multi-user Support: Role-based access for team collaboration\n\n" + \
-                "InventIQ helps businesses optimize inventory levels, reduce costs, prevent stockouts, and make data-driven decisions for improved profitability and customer satisfaction.",
-                
-                "Welcome to InventIQ - your revolutionary inventory management solution! Here's what makes us special:\n\n" + \
-                "🔹 Conversational AI Assistant - Talk to your inventory system naturally\n" + \
-                "🔹 Smart Forecasting - Predict demand before it happens\n" + \
-                "🔹 Interactive Dashboards - Visual insights at your fingertips\n" + \
-                "🔹 Proactive Alerts - Never miss a reorder point again\n" + \
-                "🔹 Voice-Controlled Interface - Manage inventory hands-free\n" + \
-                "🔹 Deep Category Insights - Understand performance across product lines\n" + \
-                "🔹 Team Collaboration Tools - Everyone stays in sync\n\n" + \
-                "InventIQ transforms inventory from a cost center to a strategic advantage by eliminating stockouts, reducing excess inventory, and providing actionable intelligence.",
-                
-                "InventIQ is the intelligent inventory management platform designed for modern businesses:\n\n" + \
-                "⚡ AI-Powered Insights - Get answers about your inventory in plain English\n" + \
-                "⚡ Future-Proof Forecasting - Machine learning algorithms predict demand patterns\n" + \
-                "⚡ Visual Analytics Dashboard - See your inventory health at a glance\n" + \
-                "⚡ Intelligent Notification System - Get alerts before problems occur\n" + \
-                "⚡ Voice Command System - Manage inventory while multitasking\n" + \
-                "⚡ Product Category Intelligence - Optimize across product categories\n" + \
-                "⚡ Collaborative Workflow - Perfect for teams of any size\n\n" + \
-                "By implementing InventIQ, businesses typically reduce carrying costs by 20%, eliminate 95% of stockouts, and save 15+ hours per week on inventory management tasks.",
-                
-                "InventIQ: Redefining Inventory Management for the AI Age\n\n" + \
-                "📊 Features That Set Us Apart:\n\n" + \
-                "• Smart Assistant Technology - Ask questions in everyday language\n" + \
-                "• Predictive Inventory Intelligence - Stay ahead of market demands\n" + \
-                "• Dynamic Dashboard Environment - Customizable real-time metrics\n" + \
-                "• Intelligent Alert Ecosystem - Timely, relevant notifications\n" + \
-                "• Voice-First Interface Option - Effortless hands-free control\n" + \
-                "• Category Performance Analytics - Granular product insights\n" + \
-                "• Team Collaboration Platform - Streamlined communication\n\n" + \
-                "InventIQ transforms inventory management from reactive to proactive, helping businesses maintain optimal stock levels while maximizing profitability and customer satisfaction.",
-                
-                "InventIQ is your intelligent inventory management solution built on cutting-edge technology:\n\n" + \
-                "🔵 Core Capabilities:\n" + \
-                "• Conversational AI - Natural language inventory management\n" + \
-                "• Advanced Forecasting - ML-powered demand prediction\n" + \
-                "• Intuitive Visualization - Clear, actionable dashboards\n" + \
-                "• Smart Alert System - Context-aware notifications\n" + \
-                "• Voice Control - Seamless speech recognition\n" + \
-                "• Category Insights - Deep product performance analysis\n" + \
-                "• Team Management - Role-based collaborative access\n\n" + \
-                "Our system integrates with your existing workflows to provide immediate value through optimized stock levels, reduced carrying costs, and enhanced inventory intelligence."
-            ]
-            return random.choice(inventiq_info_responses)
+                responses = DEFAULT_GREETING_RESPONSES
+            return random.choice(responses).format(time_greeting=_time_greeting())
+        
+        # Handle thank you and appreciation
+        if _THANK_RE.search(query_lower):
+            return random.choice(THANK_RESPONSES)
+        
+        # Handle questions about the assistant
+        if _ASSISTANT_RE.search(query_lower):
+            return random.choice(ASSISTANT_INFO_RESPONSES)
+        
+        # Handle questions about InventIQ
+        if _INVENTIQ_RE.search(query_lower) or \
+           ("inventiq" in query_lower and _INVENTIQ_TOPIC_RE.search(query_lower)):
+            return random.choice(INVENTIQ_INFO_RESPONSES)
+        
+        low_stock_items = df[df['stock_status'] == 'LOW_STOCK']
+        out_of_stock_items = df[df['stock_status'] == 'OUT_OF_STOCK']
         
         # Generate insights based on the query
-        if 'low stock' in query_lower or 'running low' in query_lower or 'what products are low' in query_lower:
-            if len(low_stock_items) > 0:
-                # Group low stock items by category
-                low_stock_by_category = low_stock_items.groupby('category')
-                
-                insights = f"Found {len(low_stock_items)} products with low stock:\n\n"
-                
-                # Show items by category
-                for category, group in low_stock_by_category:
-                    insights += f"Category: {category} ({len(group)} items)\n"
-                    for _, item in group.iterrows():
-                        insights += f"- {item['name']} (Current: {item['current_stock']}, Reorder level: {item['reorder_level']})\n"
-                    insights += "\n"
-            else:
-                insights = "No products are currently running low on stock."
-                
-        elif 'critical' in query_lower or 'out of stock' in query_lower:
-            if len(out_of_stock_items) > 0:
-                # Group out of stock items by category
-                out_of_stock_by_category = out_of_stock_items.groupby('category')
-                
-                insights = f"Found {len(out_of_stock_items)} products that are out of stock:\n\n"
-                
-                # Show items by category
-                for category, group in out_of_stock_by_category:
-                    insights += f"Category: {category} ({len(group)} items)\n"
-                    for _, item in group.iterrows():
-                        insights += f"- {item['name']} (Last known stock: 0, Reorder level: {item['reorder_level']})\n"
-                    insights += "\n"
-            else:
-                insights = "No products are currently out of stock."
-                
-        elif 'categories' in query_lower or 'attention' in query_lower or 'which categories' in query_lower:
+        if _LOW_STOCK_RE.search(query_lower):
+            if len(low_stock_items) == 0:
+                return "No products are currently running low on stock."
+            return (f"Found {len(low_stock_items)} products with low stock:\n\n" +
+                    _category_sections(low_stock_items, _item_lines(low_stock_items, '- ', reorder_label='Reorder level')))
+        
+        if _OUT_OF_STOCK_RE.search(query_lower):
+            if len(out_of_stock_items) == 0:
+                return "No products are currently out of stock."
+            return (f"Found {len(out_of_stock_items)} products that are out of stock:\n\n" +
+                    _category_sections(out_of_stock_items, _item_lines(out_of_stock_items, '- ', stock_label=None, reorder_label='Reorder level')))
+        
+        if _CATEGORIES_RE.search(query_lower):
             # Identify categories with low stock and out of stock items
-            category_low_stock = df[df['stock_status'] == 'LOW_STOCK'].groupby('category').size().reset_index(name='low_stock_count')
-            category_out_stock = df[df['stock_status'] == 'OUT_OF_STOCK'].groupby('category').size().reset_index(name='out_stock_count')
+            category_low_stock = low_stock_items.groupby('category').size().reset_index(name='low_stock_count')
+            category_out_stock = out_of_stock_items.groupby('category').size().reset_index(name='out_stock_count')
             
-            # Merge the two dataframes
-            if not category_low_stock.empty:
-                # Sort categories by number of low stock items
-                category_low_stock = category_low_stock.sort_values('low_stock_count', ascending=False)
-                top_category = category_low_stock.iloc[0]
-                
-                insights = f"The category requiring most attention is {top_category['category']} with {top_category['low_stock_count']} low stock items.\n\n"
-                
-                # List all categories with low stock items
-                insights += "Categories with low stock items:\n"
-                for _, row in category_low_stock.iterrows():
-                    category = row['category']
-                    count = row['low_stock_count']
-                    insights += f"- {category}: {count} low stock items\n"
-                    
-                    # List the specific products in this category that are low on stock
-                    low_stock_in_category = df[(df['stock_status'] == 'LOW_STOCK') & (df['category'] == category)]
-                    for _, item in low_stock_in_category.iterrows():
-                        insights += f"  * {item['name']} (Current: {item['current_stock']}, Reorder: {item['reorder_level']})\n"
-                
-                insights += "\n"
-                
-                # Add out of stock information if available
-                if not category_out_stock.empty:
-                    insights += "Categories with out of stock items:\n"
-                    for _, row in category_out_stock.sort_values('out_stock_count', ascending=False).iterrows():
-                        insights += f"- {row['category']}: {row['out_stock_count']} out of stock items\n"
-                    insights += "\n"
-                
-                # Add general category statistics
-                insights += "Category statistics:\n"
-                for category, stats in category_stats.iterrows():
-                    insights += f"- {category}: {stats['count']} products, Total stock: {stats['current_stock']}, Value: ${stats['total_value']:,.2f}\n"
-            else:
-                insights = "No categories currently need attention. All stock levels are normal."
-        
-        # Handle general inventory questions
-        elif "inventory" in query_lower or "stock" in query_lower or "products" in query_lower or "health" in query_lower:
-            # Provide a comprehensive inventory health summary
-            insights = f"Inventory Health Summary:\n\n"
-            insights += f"- Total Products: {len(df)}\n"
-            insights += f"- Products Out of Stock: {len(out_of_stock_items)}\n"
-            insights += f"- Products with Low Stock: {len(low_stock_items)}\n\n"
+            if category_low_stock.empty:
+                return "No categories currently need attention. All stock levels are normal."
             
-            if len(low_stock_items) > 0:
-                insights += "Critical Items Requiring Attention:\n"
-                for _, item in low_stock_items.head(5).iterrows():
-                    insights += f"- {item['name']} (Current: {item['current_stock']}, Reorder: {item['reorder_level']})\n"
-                if len(low_stock_items) > 5:
-                    insights += f"...and {len(low_stock_items) - 5} more items\n"
+            # Sort categories by number of low stock items
+            category_low_stock = category_low_stock.sort_values('low_stock_count', ascending=False)
+            top_category = category_low_stock.iloc[0]
             
-            # Add category information
-            insights += "\nCategory Overview:\n"
-            for category, stats in category_stats.iterrows():
-                insights += f"- {category}: {stats['count']} products, Value: ${stats['total_value']:,.2f}\n"
-        
-        else:
-            # For any other query, provide the same detailed inventory health summary
-            insights = f"Inventory Health Summary:\n\n"
-            insights += f"- Total Products: {len(df)}\n"
-            insights += f"- Products Out of Stock: {len(out_of_stock_items)}\n"
-            insights += f"- Products with Low Stock: {len(low_stock_items)}\n\n"
+            # Products that are low on stock, pre-grouped by category
+            product_lines = _item_lines(low_stock_items, '  * ').groupby(low_stock_items['category']).agg(''.join)
+            
+            parts = [
+                f"The category requiring most attention is {top_category['category']} with {top_category['low_stock_count']} low stock items.\n\n",
+                "Categories with low stock items:\n"
+            ]
+            parts.extend(
+                f"- {category}: {count} low stock items\n{product_lines[category]}"
+                for category, count in zip(category_low_stock['category'], category_low_stock['low_stock_count'])
+            )
+            parts.append("\n")
             
-            if len(low_stock_items) > 0:
-                insights += "Critical Items Requiring Attention:\n"
-                for _, item in low_stock_items.head(5).iterrows():
-                    insights += f"- {item['name']} (Current: {item['current_stock']}, Reorder: {item['reorder_level']})\n"
-                if len(low_stock_items) > 5:
-                    insights += f"...and {len(low_stock_items) - 5} more items\n"
+            # Add out of stock information if available
+            if not category_out_stock.empty:
+                category_out_stock = category_out_stock.sort_values('out_stock_count', ascending=False)
+                parts.append("Categories with out of stock items:\n")
+                parts.append(''.join('- ' + category_out_stock['category'].astype(str) + ': ' +
+                                     category_out_stock['out_stock_count'].astype(str) + ' out of stock items\n'))
+                parts.append("\n")
             
-            # Add category information
-            insights += "\nCategory Overview:\n"
-            for category, stats in category_stats.iterrows():
-                insights += f"- {category}: {stats['count']} products, Value: ${stats['total_value']:,.2f}\n"
+            # Add general category statistics
+            parts.append("Category statistics:\n")
+            parts.append(_category_overview(_category_stats(df), with_stock=True))
+            return ''.join(parts)
         
-        return insights
+        # General inventory questions and anything else get the health summary
+        return _health_summary(df, low_stock_items, out_of_stock_items)
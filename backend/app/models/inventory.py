@@ -1,5 +1,7 @@
 from app.extensions import db
 from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.orm import Session
 import json
 
 class Product(db.Model):
@@ -16,11 +18,26 @@ class Product(db.Model):
     lead_time = db.Column(db.Integer, nullable=False)  # in days
     historical_sales = db.Column(db.Text, nullable=False)  # JSON string
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     
     def __repr__(self):
         return f'<Product {self.id}: {self.name}>'
     
+    @classmethod
+    def inventory_version(cls):
+        """
+        Cheap fingerprint of the products table: ``counter:timestamp``.
+        
+        The counter is bumped by every write to products or transactions,
+        so the version changes whenever a product is added, edited, sold,
+        restocked or deleted and can key caches of anything derived from the
+        inventory. The timestamp is the latest updated_at, which delta
+        exports use as their cutoff.
+        """
+        counter = db.session.query(InventoryVersion.version).filter(InventoryVersion.id == 1).scalar_subquery()
+        version, last_update = db.session.query(counter, db.func.max(cls.updated_at)).one()
+        return f"{version or 0}:{last_update.isoformat() if last_update else ''}"
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -49,4 +66,84 @@ class Transaction(db.Model):
     product = db.relationship('Product', backref=db.backref('transactions', lazy=True))
     
     def __repr__(self):
-        return f'<Transaction {self.id}: {self.transaction_type} {self.quantity} units of {self.product_id}>'
\ No newline at end of file
+        return f'<Transaction {self.id}: {self.transaction_type} {self.quantity} units of {self.product_id}>'
+
+
+class ProductDeletion(db.Model):
+    __tablename__ = 'product_deletions'
+    
+    # Deletion log, so delta exports can emit tombstones for removed products
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.String(10), nullable=False, index=True)  # no FK: the product row is gone
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    
+    def __repr__(self):
+        return f'<ProductDeletion {self.id}: {self.product_id} at {self.deleted_at}>'
+
+class Anomaly(db.Model):
+    __tablename__ = 'anomalies'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.String(10), db.ForeignKey('products.id'), nullable=False, index=True)
+    kind = db.Column(db.String(20), nullable=False)  # 'spike', 'drop', 'shift_up', 'shift_down'
+    day = db.Column(db.String(20), nullable=False)  # sales day the anomaly was observed on, e.g. 'Day-152'
+    observed = db.Column(db.Float, nullable=False)  # units sold that day
+    expected = db.Column(db.Float, nullable=False)  # EWMA forecast for the day
+    score = db.Column(db.Float, nullable=False)  # z-score for spikes/drops, CUSUM statistic for shifts
+    detected_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    
+    product = db.relationship('Product', backref=db.backref('anomalies', lazy=True))
+    
+    def __repr__(self):
+        return f'<Anomaly {self.id}: {self.kind} for {self.product_id} on {self.day}>'
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'product_id': self.product_id,
+            'kind': self.kind,
+            'day': self.day,
+            'observed': self.observed,
+            'expected': round(self.expected, 2),
+            'score': round(self.score, 2),
+            'detected_at': self.detected_at.isoformat() if self.detected_at else None
+        }
+
+class InventoryVersion(db.Model):
+    __tablename__ = 'inventory_version'
+    
+    # Single row (id 1) counting writes to the inventory; see Product.inventory_version()
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<InventoryVersion {self.version}>'
+
+def bump_inventory_version(session=None):
+    """
+    Count a write to the inventory, inside the caller's transaction.
+    
+    ORM writes to products, transactions and deletions are counted
+    automatically on flush; bulk writes that bypass the unit of work
+    (bulk_*_mappings, Query.update/delete) must call this themselves.
+    """
+    connection = (session or db.session).connection()
+    table = InventoryVersion.__table__
+    bumped = connection.execute(table.update().where(table.c.id == 1).values(version=table.c.version + 1))
+    if not bumped.rowcount:
+        connection.execute(table.insert().values(id=1, version=1))
+
+# Models whose writes change the inventory version
+VERSIONED_MODELS = (Product, Transaction, ProductDeletion)
+
+@event.listens_for(Session, 'before_flush')
+def _bump_on_flush(session, flush_context, instances):
+    changed = [obj for obj in session.dirty if isinstance(obj, VERSIONED_MODELS) and session.is_modified(obj)]
+    if changed or any(isinstance(obj, VERSIONED_MODELS) for obj in session.new) or \
+            any(isinstance(obj, VERSIONED_MODELS) for obj in session.deleted):
+        bump_inventory_version(session)
+
+def create_missing_indexes():
+    """Create indexes declared on existing tables; db.create_all() only indexes new tables"""
+    for index in Product.__table__.indexes:
+        index.create(bind=db.engine, checkfirst=True)
@@ -1,11 +1,40 @@
-from flask import Blueprint, request, jsonify, current_app
-from app.services.llm_service import get_llm_insights
+import json
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
+from app.services.llm_service import get_llm_insights, stream_llm_insights
+from app.services.intent_router import intent_router
+from app.services.response_cache import insight_cache
+from app.services.llm_gate import llm_gate, LLMOverloaded
+from app.services.circuit_breaker import breaker_stats
+from app.services.product_index import product_index
+from app.services.ollama_service import model_residency
+from app.services.model_tiers import tier_stats
 
 assistant_bp = Blueprint('assistant', __name__, url_prefix='/api/assistant')
 
+def _sse_event(data, event=None):
+    """Format one Server-Sent Events message"""
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data)}\n\n"
+
+def _overloaded(error):
+    """503 telling the client when the LLM queue should have room again"""
+    response = jsonify({'error': str(error), 'retry_after': error.retry_after})
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, 503
+
+def _wants_stream(data):
+    return bool(data.get('stream')) or 'text/event-stream' in request.headers.get('Accept', '')
+
 @assistant_bp.route('/insights', methods=['POST'])
 def get_insights():
-    """Generate AI insights based on user query."""
+    """
+    Generate AI insights based on user query.
+    
+    With ``"stream": true`` in the body (or ``Accept: text/event-stream``)
+    the answer is sent as Server-Sent Events: one ``{"token": ...}`` message
+    per generated piece, then a ``done`` event, or an ``error`` event if
+    generation fails part-way. A full LLM queue answers 503 with Retry-After.
+    """
     data = request.get_json()
     
     if not data or 'query' not in data:
@@ -14,10 +43,53 @@ def get_insights():
     query = data['query']
     product_id = data.get('product_id')  # Optional product ID for context
     
+    if _wants_stream(data):
+        pieces = stream_llm_insights(query, product_id)
+        # Wait for the first piece so a full queue is still reported as a 503
+        try:
+            first_piece = next(pieces, None)
+        except LLMOverloaded as e:
+            return _overloaded(e)
+        except Exception as e:
+            current_app.logger.error(f"Error streaming insights: {str(e)}")
+            return jsonify({'error': f'Failed to generate insights: {str(e)}'}), 500
+        
+        def generate():
+            try:
+                if first_piece is not None:
+                    yield _sse_event({'token': first_piece})
+                for piece in pieces:
+                    yield _sse_event({'token': piece})
+                yield _sse_event({}, event='done')
+            except Exception as e:
+                current_app.logger.error(f"Error streaming insights: {str(e)}")
+                yield _sse_event({'error': f'Failed to generate insights: {str(e)}'}, event='error')
+        
+        return Response(
+            stream_with_context(generate()),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+    
     try:
         # Get insights from LLM service
         insights = get_llm_insights(query, product_id)
         return jsonify({'insights': insights})
+    except LLMOverloaded as e:
+        return _overloaded(e)
     except Exception as e:
         current_app.logger.error(f"Error generating insights: {str(e)}")
         return jsonify({'error': f'Failed to generate insights: {str(e)}'}), 500
+
+@assistant_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Per-route and per-model-tier request counts and latencies, answer cache, LLM queue, Ollama breaker, model residency and product index statistics."""
+    return jsonify({
+        'routes': intent_router.metrics.snapshot(),
+        'cache': insight_cache.stats(),
+        'llm_queue': llm_gate.stats(),
+        'ollama_breakers': breaker_stats(),
+        'ollama_residency': model_residency.stats(),
+        'model_tiers': tier_stats(),
+        'product_index': product_index.stats()
+    })
@@ -1,13 +1,21 @@
 import os
 import json
-import csv
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response
+from app.services.csv_store import get_csv_store, product_row
+from app.services.inventory_sync import sync_inventory
+from app.routes.auth import token_required
 
 csv_handler = Blueprint('csv_handler', __name__)
 
 # Path to the CSV file
 CSV_FILE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'data', 'inventory_data.csv')
 
+# Paging of get_csv_data: default and largest page, and listing size that switches to streaming
+DEFAULT_PAGE_LIMIT = 100
+MAX_PAGE_LIMIT = 1000
+STREAM_MIN_ROWS = 5000
+STREAM_CHUNK_ROWS = 500
+
 @csv_handler.route('/update_csv', methods=['POST'])
 def update_csv():
     """
@@ -20,89 +28,98 @@ def update_csv():
         if not product_data:
             return jsonify({'success': False, 'message': 'No product data provided'}), 400
         
-        # Read existing data from CSV
-        existing_products = []
-        with open(CSV_FILE_PATH, 'r', newline='', encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
-            existing_products = list(reader)
-        
-        # Check if product already exists
-        product_exists = False
-        for i, product in enumerate(existing_products):
-            if product['product_id'] == product_data.get('id') or product['product_id'] == product_data.get('product_id'):
-                # Update existing product
-                existing_products[i] = {
-                    'product_id': product_data.get('id') or product_data.get('product_id'),
-                    'name': product_data.get('name', ''),
-                    'category': product_data.get('category', ''),
-                    'supplier': product_data.get('supplier', ''),
-                    'current_stock': str(product_data.get('current_stock', 0)),
-                    'reorder_level': str(product_data.get('reorder_level', 0)),
-                    'purchase_price': str(product_data.get('purchase_price', 0)),
-                    'selling_price': str(product_data.get('selling_price', 0)),
-                    'lead_time': str(product_data.get('lead_time', 0)),
-                    'historical_sales': json.dumps(product_data.get('historical_sales', {}))
-                }
-                product_exists = True
-                break
-        
-        # Add new product if it doesn't exist
-        if not product_exists:
-            new_product = {
-                'product_id': product_data.get('id') or product_data.get('product_id'),
-                'name': product_data.get('name', ''),
-                'category': product_data.get('category', ''),
-                'supplier': product_data.get('supplier', ''),
-                'current_stock': str(product_data.get('current_stock', 0)),
-                'reorder_level': str(product_data.get('reorder_level', 0)),
-                'purchase_price': str(product_data.get('purchase_price', 0)),
-                'selling_price': str(product_data.get('selling_price', 0)),
-                'lead_time': str(product_data.get('lead_time', 0)),
-                'historical_sales': json.dumps(product_data.get('historical_sales', {}))
-            }
-            existing_products.append(new_product)
-        
-        # Write updated data back to CSV
-        with open(CSV_FILE_PATH, 'w', newline='', encoding='utf-8') as csvfile:
-            fieldnames = ['product_id', 'name', 'category', 'supplier', 'current_stock', 
-                          'reorder_level', 'purchase_price', 'selling_price', 'lead_time', 'historical_sales']
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(existing_products)
+        # Append the change to the journal instead of rewriting the whole file
+        product_action = get_csv_store(CSV_FILE_PATH).upsert(product_row(product_data))
         
         return jsonify({
             'success': True, 
             'message': 'CSV file updated successfully',
-            'product_action': 'updated' if product_exists else 'added'
+            'product_action': product_action
         })
     
     except Exception as e:
         print(f"Error updating CSV: {str(e)}")
         return jsonify({'success': False, 'message': f'Error updating CSV: {str(e)}'}), 500
 
+def _stream_products(products):
+    """The full listing as JSON, sent in chunks instead of one large body."""
+    yield '{"success": true, "products": ['
+    for start in range(0, len(products), STREAM_CHUNK_ROWS):
+        chunk = ','.join(json.dumps(row) for row in products[start:start + STREAM_CHUNK_ROWS])
+        yield (',' if start else '') + chunk
+    yield ']}'
+
 @csv_handler.route('/get_csv_data', methods=['GET'])
 def get_csv_data():
     """
-    Get all data from the CSV file
+    Get data from the CSV file
+    
+    Without paging parameters every product is returned, streamed once the
+    file has more than STREAM_MIN_ROWS products. With ``limit`` (at most
+    MAX_PAGE_LIMIT) one page is returned, starting at ``offset`` or after
+    the product named by ``cursor`` (a previous page's ``next_cursor``).
     """
     try:
-        # Read data from CSV
-        products = []
-        with open(CSV_FILE_PATH, 'r', newline='', encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                # Convert historical_sales from string to object
-                try:
-                    row['historical_sales'] = json.loads(row['historical_sales'])
-                except:
-                    row['historical_sales'] = {}
-                products.append(row)
+        # Parsed rows, including journaled changes, cached until the CSV or its journal changes
+        products, positions = get_csv_store(CSV_FILE_PATH).snapshot()
+        
+        offset = request.args.get('offset', type=int)
+        limit = request.args.get('limit', type=int)
+        cursor = request.args.get('cursor')
+        
+        if offset is None and limit is None and cursor is None:
+            if len(products) > STREAM_MIN_ROWS:
+                return Response(_stream_products(products), mimetype='application/json')
+            return jsonify({
+                'success': True,
+                'products': products
+            })
+        
+        if cursor is not None:
+            if cursor not in positions:
+                return jsonify({'success': False, 'message': f'Unknown cursor: {cursor}'}), 400
+            offset = positions[cursor] + 1
+        offset = max(offset or 0, 0)
+        limit = min(max(limit if limit is not None else DEFAULT_PAGE_LIMIT, 1), MAX_PAGE_LIMIT)
+        page = products[offset:offset + limit]
         
         return jsonify({
             'success': True,
-            'products': products
+            'products': page,
+            'total': len(products),
+            'offset': offset,
+            'limit': limit,
+            'next_cursor': page[-1]['product_id'] if page and offset + limit < len(products) else None
         })
     
     except Exception as e:
         print(f"Error reading CSV: {str(e)}")
         return jsonify({'success': False, 'message': f'Error reading CSV: {str(e)}'}), 500
+
+@csv_handler.route('/sync', methods=['POST'])
+@token_required
+def sync_csv(current_user):
+    """
+    Reconcile the products table with the CSV file, copying only changed rows
+    
+    Accepts ``dry_run`` (report without writing) and ``prefer`` (conflict
+    rule: db, csv or skip) in the JSON body or the query string.
+    """
+    if current_user.role != 'admin':
+        return jsonify({'success': False, 'message': 'Permission denied! Only admin can sync the CSV file.'}), 403
+    
+    try:
+        options = request.get_json(silent=True) or {}
+        dry_run = options.get('dry_run', request.args.get('dry_run', 'false'))
+        if isinstance(dry_run, str):
+            dry_run = dry_run.lower() in ('true', '1', 't')
+        prefer = options.get('prefer', request.args.get('prefer'))
+        
+        report = sync_inventory(CSV_FILE_PATH, dry_run=bool(dry_run), prefer=prefer)
+        return jsonify(dict(report, success=True))
+    
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        print(f"Error syncing CSV: {str(e)}")
+        return jsonify({'success': False, 'message': f'Error syncing CSV: {str(e)}'}), 500
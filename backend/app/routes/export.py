@@ -1,11 +1,83 @@
-from flask import Blueprint, jsonify, request, send_file
-from app.models.export_data import ExportData
+from flask import Blueprint, jsonify, request, send_file, Response, stream_with_context
+from datetime import datetime
+from app.models.export_data import ExportData, COLUMNAR_FORMATS, parse_since
+from app.models.inventory import Product
+from app.services.llm_gate import LLMOverloaded
 
 export_bp = Blueprint('export', __name__)
 
 @export_bp.route('/inventory', methods=['GET'])
 def export_inventory():
-    """Export inventory data to CSV and return the file"""
+    """
+    Stream inventory data as a download.
+    
+    CSV by default (optionally gzip-compressed), or a typed columnar file
+    with format=parquet|arrow|feather, optional columns=a,b,c selection and
+    history=nested|long to include sales history.
+    
+    CSV exports accept since=<inventory version|ISO timestamp|epoch seconds>
+    to return only products changed after that point plus tombstones for
+    deleted ones. Every CSV export carries an X-Inventory-Version header to
+    pass as ``since`` on the next sync.
+    """
+    try:
+        fmt = request.args.get('format', 'csv').lower()
+        since = request.args.get('since')
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        
+        if fmt == 'csv':
+            compress = request.args.get('gzip', 'false').lower() in ('true', '1', 't')
+            cutoff = parse_since(since) if since else None
+            # Taken before reading rows, so changes made while streaming are picked up next time
+            version = Product.inventory_version()
+            filename = f"inventory_{'delta' if cutoff is not None else 'export'}_{timestamp}.csv"
+            if compress:
+                filename += '.gz'
+            
+            return Response(
+                stream_with_context(ExportData.iter_inventory_csv(compress=compress, since=cutoff)),
+                mimetype='application/gzip' if compress else 'text/csv',
+                headers={
+                    'Content-Disposition': f'attachment; filename={filename}',
+                    'X-Inventory-Version': version
+                }
+            )
+        
+        if since:
+            return jsonify({'error': 'since is only supported for CSV exports'}), 400
+        
+        if fmt not in COLUMNAR_FORMATS:
+            return jsonify({'error': f"Invalid format '{fmt}'. Use one of: csv, {', '.join(COLUMNAR_FORMATS)}"}), 400
+        
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            return jsonify({'error': f'{fmt} export requires pyarrow. Please run: pip install pyarrow'}), 501
+        
+        columns = [column.strip() for column in request.args.get('columns', '').split(',') if column.strip()]
+        history = request.args.get('history', 'none').lower()
+        
+        # Start the generator so invalid columns or history modes fail before streaming
+        chunks = ExportData.iter_inventory_columnar(fmt, columns=columns or None, history=history)
+        first_chunk = next(chunks)
+        
+        def generate():
+            yield first_chunk
+            yield from chunks
+        
+        return Response(
+            stream_with_context(generate()),
+            mimetype=COLUMNAR_FORMATS[fmt],
+            headers={'Content-Disposition': f'attachment; filename=inventory_export_{timestamp}.{fmt}'}
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@export_bp.route('/inventory/archive', methods=['GET'])
+def archive_inventory():
+    """Store the current inventory as a content-addressed file (e.g. for audits) and return it"""
     try:
         filepath = ExportData.export_inventory_data()
         return send_file(filepath, as_attachment=True)
@@ -26,5 +98,9 @@ def get_inventory_insights():
             'success': True,
             'data': result
         })
+    except LLMOverloaded as e:
+        response = jsonify({'error': str(e), 'retry_after': e.retry_after})
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 503
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -1,6 +1,9 @@
 from flask import Blueprint, request, jsonify
-from app.models.inventory import Product, Transaction
+from app.models.inventory import Product, Transaction, Anomaly, ProductDeletion
 from app.routes.auth import token_required
+from app.services.trend_store import trend_store
+from app.services.anomaly_service import anomaly_detector
+from app.services.product_index import product_index
 from main import db
 import json
 from datetime import datetime
@@ -96,6 +99,8 @@ def add_product(current_user):
         
         db.session.add(product)
         db.session.commit()
+        trend_store.refresh_product(product)
+        product_index.refresh_product(product)
         
         return jsonify({
             'message': 'Product added successfully!',
@@ -116,6 +121,10 @@ def update_product(current_user, product_id):
     product = Product.query.get_or_404(product_id)
     data = request.get_json()
     
+    if 'historical_sales' in data:
+        # Replaced history invalidates the product's demand profile
+        anomaly_detector.reset(product_id)
+    
     # Update fields
     for field in data:
         if field == 'historical_sales':
@@ -124,6 +133,8 @@ def update_product(current_user, product_id):
             setattr(product, field, data[field])
     
     db.session.commit()
+    trend_store.refresh_product(product)
+    product_index.refresh_product(product)
     
     return jsonify({
         'message': 'Product updated successfully!',
@@ -156,25 +167,36 @@ def delete_product(current_user, product_id):
                 
                 # First delete all transactions for each product
                 for p in products_to_delete:
-                    # Delete related transactions
+                    # Delete related transactions and anomalies
                     Transaction.query.filter_by(product_id=p.id).delete()
+                    Anomaly.query.filter_by(product_id=p.id).delete()
                 
-                # Then delete the products
+                # Then delete the products, logging each for delta exports
                 for p in products_to_delete:
                     db.session.delete(p)
+                    db.session.add(ProductDeletion(product_id=p.id))
                 
                 db.session.commit()
+                for p in products_to_delete:
+                    trend_store.remove_product(p.id)
+                    product_index.remove_product(p.id)
+                    anomaly_detector.reset(p.id)
                 return jsonify({
                     'message': f'Supplier {supplier_name} and all associated products deleted successfully!',
                     'deleted_count': len(products_to_delete)
                 }), 200
             else:
-                # First delete all transactions for this product
+                # First delete all transactions and anomalies for this product
                 Transaction.query.filter_by(product_id=product.id).delete()
+                Anomaly.query.filter_by(product_id=product.id).delete()
                 
-                # Then delete the product
+                # Then delete the product, logging it for delta exports
                 db.session.delete(product)
+                db.session.add(ProductDeletion(product_id=product.id))
                 db.session.commit()
+                trend_store.remove_product(product.id)
+                product_index.remove_product(product.id)
+                anomaly_detector.reset(product.id)
                 
                 return jsonify({
                     'message': 'Product deleted successfully!',
@@ -230,6 +252,7 @@ def restock_product(current_user):
         
         db.session.add(transaction)
         db.session.commit()
+        trend_store.update_stock(product)
         
         return jsonify({
             'message': f'Product restocked successfully!',
@@ -266,6 +289,8 @@ def record_transaction(current_user):
             return jsonify({'message': f'Product not found: {data["product_id"]}'}), 404
         
         quantity = int(data['quantity'])
+        sale_day = None
+        anomalies = []
         
         # Update product stock based on transaction type
         if data['transaction_type'] == 'sale':
@@ -286,6 +311,8 @@ def record_transaction(current_user):
                 today = datetime.utcnow().strftime('Day-%j')  # Day of year
                 historical_sales[today] = historical_sales.get(today, 0) + quantity
                 product.historical_sales = json.dumps(historical_sales)
+                sale_day = today
+                day_total = historical_sales[today]
                 print(f'Updated historical sales for {today}')
             except Exception as e:
                 print(f'Error updating historical sales: {e}')
@@ -303,11 +330,44 @@ def record_transaction(current_user):
             quantity=quantity
         )
         
+        if sale_day is not None:
+            # Check the day's running total against the product's demand profile, so the
+            # anomalies are saved in the same commit as the sale; a detection failure
+            # only loses the anomalies
+            try:
+                for event in anomaly_detector.record_sale(product, sale_day, day_total):
+                    anomalies.append(Anomaly(product_id=product.id, **event))
+                    print(f'Detected sales {event["kind"]} for {product.id} on {sale_day}')
+            except Exception as e:
+                print(f'Error detecting sales anomalies for {product.id}: {e}')
+                anomalies = []
+                # Re-seed the detector from the saved history on the next sale
+                anomaly_detector.reset(product.id)
+        
         print('Saving changes to database...')
         db.session.add(transaction)
-        db.session.commit()
+        db.session.add_all(anomalies)
+        # Taken before the commit, so a trend rebuild that already read this sale is detected
+        trend_generation = trend_store.generation
+        try:
+            db.session.commit()
+        except Exception:
+            if sale_day is not None:
+                # The detector has counted a sale that was not saved
+                anomaly_detector.reset(product.id)
+            raise
         print('Transaction recorded successfully!')
         
+        # Keep trend aggregates current without re-reading every history
+        if sale_day is not None:
+            trend_store.record_sale(product, sale_day, quantity, trend_generation)
+        elif data['transaction_type'] == 'sale':
+            # Sales history was reset, so re-read this product
+            trend_store.refresh_product(product)
+            anomaly_detector.reset(product.id)
+        else:
+            trend_store.update_stock(product)
+        
         return jsonify({
             'message': 'Transaction recorded successfully!',
             'transaction': {
@@ -317,7 +377,8 @@ def record_transaction(current_user):
                 'quantity': transaction.quantity,
                 'transaction_date': transaction.transaction_date.isoformat() if transaction.transaction_date else None
             },
-            'updated_stock': product.current_stock
+            'updated_stock': product.current_stock,
+            'anomalies': [anomaly.to_dict() for anomaly in anomalies]
         }), 201
         
     except Exception as e:
@@ -1,9 +1,11 @@
 from flask import Blueprint, request, jsonify
 import json
-from app.models.inventory import Product
+from datetime import datetime
+from app.models.inventory import Product, Anomaly
 from app.routes.auth import token_required
 from app.services.ml_service import forecast_demand, recommend_restock, get_trend_data
 from app.services.llm_service import get_llm_insights
+from app.services.trend_store import trend_store, parse_window
 
 predictions_bp = Blueprint('predictions', __name__)
 
@@ -15,11 +17,15 @@ def get_demand_forecast(current_user, product_id):
     # Get forecast days from query params or default to 30
     days = request.args.get('days', default=30, type=int)
     
-    forecast = forecast_demand(product, days)
+    # Forecasting method: 'prophet' (default), 'prophet_fast', 'lstm' or 'simple'
+    method = request.args.get('method', default='prophet')
+    
+    forecast = forecast_demand(product, days, method)
     
     return jsonify({
         'product_id': product_id,
         'forecast_days': days,
+        'method': method,
         'forecast': forecast
     }), 200
 
@@ -59,12 +65,78 @@ def get_insights(current_user):
         'insights': insights
     }), 200
 
+@predictions_bp.route('/top-sellers', methods=['GET'])
+@token_required
+def get_top_sellers(current_user):
+    k = request.args.get('k', default=10, type=int)
+    metric = request.args.get('metric', default='total')
+    window = request.args.get('window', default='all')
+    category = request.args.get('category')
+    
+    try:
+        window_days = None if window == 'all' else parse_window(window)
+        products = trend_store.top_sellers(max(1, k), metric=metric, window_days=window_days, category=category)
+        return jsonify({
+            'metric': metric,
+            'window': window,
+            'category': category,
+            'products': products
+        }), 200
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        print(f'Error getting top sellers: {str(e)}')
+        return jsonify({'message': f'Error getting top sellers: {str(e)}'}), 500
+
+@predictions_bp.route('/anomalies', methods=['GET'])
+@token_required
+def get_anomalies(current_user):
+    query = Anomaly.query
+    
+    product_id = request.args.get('product_id')
+    if product_id:
+        query = query.filter_by(product_id=product_id)
+    
+    kind = request.args.get('kind')
+    if kind:
+        query = query.filter_by(kind=kind)
+    
+    since = request.args.get('since')
+    if since:
+        try:
+            query = query.filter(Anomaly.detected_at >= datetime.fromisoformat(since))
+        except ValueError:
+            return jsonify({'message': f'Invalid since timestamp: {since}'}), 400
+    
+    limit = min(max(request.args.get('limit', default=100, type=int), 1), 1000)
+    anomalies = query.order_by(Anomaly.detected_at.desc(), Anomaly.id.desc()).limit(limit).all()
+    
+    return jsonify({
+        'count': len(anomalies),
+        'anomalies': [anomaly.to_dict() for anomaly in anomalies]
+    }), 200
+
 @predictions_bp.route('/trends', methods=['GET'])
 @token_required
 def get_trends(current_user):
+    window = request.args.get('window')
+    bucket = request.args.get('bucket')
+    
     try:
-        trend_data = get_trend_data()
+        if window is None and bucket is None:
+            trend_data = get_trend_data()
+        else:
+            # Windowed view served from the precomputed day/week/month rollups
+            trend_data = trend_store.get_windowed_trends(
+                parse_window(window or '30d'),
+                bucket=(bucket or 'day').lower(),
+                product_id=request.args.get('product_id')
+            )
         return jsonify(trend_data), 200
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    except KeyError as e:
+        return jsonify({'message': f'Product not found: {e.args[0]}'}), 404
     except Exception as e:
         print(f'Error getting trend data: {str(e)}')
         return jsonify({'message': f'Error getting trend data: {str(e)}'}), 500
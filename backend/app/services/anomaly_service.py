@@ -0,0 +1,195 @@
+import math
+import threading
+import logging
+from datetime import date
+from app.services.settings import app_settings
+from app.services.trend_store import parse_historical_sales, sales_date
+
+logger = logging.getLogger(__name__)
+
+# Detector settings read from the app config; defaults live in config.Config
+SETTINGS = (
+    'ANOMALY_EWMA_ALPHA',
+    'ANOMALY_SIGMA_LIMIT',
+    'ANOMALY_CUSUM_K',
+    'ANOMALY_CUSUM_H',
+    'ANOMALY_MIN_DAYS'
+)
+
+class SalesDetector:
+    """
+    Online EWMA control chart and two-sided CUSUM over one product's daily sales.
+
+    Holds O(1) state: the running mean and variance, the CUSUM sums and the
+    total for the day currently being recorded.
+    """
+
+    __slots__ = ('day', 'today', 'mean', 'var', 'cusum_pos', 'cusum_neg',
+                 'observations', 'spiked_today')
+
+    def __init__(self):
+        self.day = None
+        self.today = 0.0
+        self.mean = 0.0
+        self.var = 0.0
+        self.cusum_pos = 0.0
+        self.cusum_neg = 0.0
+        self.observations = 0
+        self.spiked_today = False
+
+    def restart(self):
+        """Drop the statistics so the next days warm the detector up again."""
+        self.mean = 0.0
+        self.var = 0.0
+        self.cusum_pos = 0.0
+        self.cusum_neg = 0.0
+        self.observations = 0
+        self.spiked_today = False
+
+    def sigma(self):
+        # Floor at one unit so perfectly steady sellers do not flag on +/-1 sales
+        return max(math.sqrt(self.var), 1.0)
+
+    def _event(self, kind, observed, score):
+        return {
+            'kind': kind,
+            'day': f'Day-{date.fromordinal(self.day).timetuple().tm_yday}',
+            'observed': observed,
+            'expected': self.mean,
+            'score': score
+        }
+
+    def close_day(self, value, settings, emit=True):
+        """Fold a finished day into the statistics, returning any anomalies."""
+        events = []
+        armed = emit and self.observations >= settings['ANOMALY_MIN_DAYS']
+
+        if self.observations == 0:
+            self.mean = value
+        else:
+            sigma = self.sigma()
+            z = (value - self.mean) / sigma
+            if armed and z < -settings['ANOMALY_SIGMA_LIMIT']:
+                events.append(self._event('drop', value, z))
+            elif armed and z > settings['ANOMALY_SIGMA_LIMIT'] and not self.spiked_today:
+                events.append(self._event('spike', value, z))
+
+            # A single extreme day is a spike or drop; only sustained deviation accumulates into a shift
+            capped = min(max(z, -settings['ANOMALY_SIGMA_LIMIT']), settings['ANOMALY_SIGMA_LIMIT'])
+            k = settings['ANOMALY_CUSUM_K']
+            self.cusum_pos = max(0.0, self.cusum_pos + capped - k)
+            self.cusum_neg = max(0.0, self.cusum_neg - capped - k)
+            if self.cusum_pos > settings['ANOMALY_CUSUM_H']:
+                if armed:
+                    events.append(self._event('shift_up', value, self.cusum_pos))
+                self.cusum_pos = self.cusum_neg = 0.0
+            elif self.cusum_neg > settings['ANOMALY_CUSUM_H']:
+                if armed:
+                    events.append(self._event('shift_down', value, -self.cusum_neg))
+                self.cusum_pos = self.cusum_neg = 0.0
+
+            # Winsorize at the control limits so one outlier does not blow up the baseline
+            limit = settings['ANOMALY_SIGMA_LIMIT'] * sigma
+            alpha = settings['ANOMALY_EWMA_ALPHA']
+            diff = min(max(value - self.mean, -limit), limit)
+            self.mean += alpha * diff
+            self.var = (1 - alpha) * (self.var + alpha * diff * diff)
+
+        self.observations += 1
+        return events
+
+    def observe(self, number, total, settings, emit=True):
+        """
+        Record that day ``number`` (a date ordinal) has a running total of ``total`` units.
+
+        Moving to a later day closes the previous one and folds any days
+        without sales in as zeros. A quiet stretch longer than the EWMA span
+        is reported as one drop and then restarts the warm-up instead: that
+        many zeros would pull the mean to nothing and flag the first normal
+        sale as a spike. A running total that crosses the upper control
+        limit is flagged immediately, once per day.
+        """
+        events = []
+        if self.day is not None and number < self.day:
+            # Late correction to an already closed day; leave the statistics alone
+            return events
+
+        if self.day is not None and number > self.day:
+            events.extend(self.close_day(self.today, settings, emit))
+            gap = number - self.day - 1
+            # Days an EWMA with this weight effectively averages over
+            span = 2 / settings['ANOMALY_EWMA_ALPHA'] - 1
+            # Past the span only the first empty day is folded in, to report the drop
+            for offset in range(gap if gap <= span else 1):
+                self.day += 1
+                # Report at most one drop for a run of empty days
+                gap_events = self.close_day(0.0, settings, emit and offset == 0)
+                events.extend(gap_events)
+            if gap > span:
+                self.restart()
+            self.spiked_today = False
+        self.day = number
+        self.today = total
+
+        if emit and self.observations >= settings['ANOMALY_MIN_DAYS'] and not self.spiked_today:
+            z = (total - self.mean) / self.sigma()
+            if z > settings['ANOMALY_SIGMA_LIMIT']:
+                self.spiked_today = True
+                events.append(self._event('spike', total, z))
+        return events
+
+class AnomalyDetector:
+    """Per-product streaming detectors, seeded lazily from each product's history."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._detectors = {}
+
+    def reset(self, product_id=None):
+        """Forget detector state for one product, or for all of them."""
+        with self._lock:
+            if product_id is None:
+                self._detectors = {}
+            else:
+                self._detectors.pop(product_id, None)
+
+    def _seed(self, product, current, settings):
+        """Replay a product's days before the date ``current`` without emitting anomalies."""
+        detector = SalesDetector()
+        daily = {}
+        for day, quantity in parse_historical_sales(product.historical_sales).items():
+            value = sales_date(day, current)
+            try:
+                qty = float(quantity)
+            except (ValueError, TypeError):
+                continue
+            if value is not None and value < current:
+                number = value.toordinal()
+                daily[number] = daily.get(number, 0) + qty
+        for number in sorted(daily):
+            detector.observe(number, daily[number], settings, emit=False)
+        return detector
+
+    def record_sale(self, product, day, day_total, today=None):
+        """
+        Update a product's detector with the new running total for ``day``.
+
+        'Day-N' keys are resolved to dates relative to ``today`` (default:
+        the current UTC date), so the detector keeps advancing across the
+        new year.
+
+        Returns a list of anomaly dicts (kind, day, observed, expected, score)
+        detected by this sale.
+        """
+        current = sales_date(day, today)
+        if current is None:
+            return []
+        settings = app_settings(*SETTINGS)
+        with self._lock:
+            detector = self._detectors.get(product.id)
+            if detector is None:
+                detector = self._detectors[product.id] = self._seed(product, current, settings)
+            return detector.observe(current.toordinal(), float(day_total), settings)
+
+# Process-wide detector shared by the inventory routes
+anomaly_detector = AnomalyDetector()
@@ -0,0 +1,44 @@
+from app.services.anomaly_service import AnomalyDetector
+from datetime import date, timedelta
+from types import SimpleNamespace
+import json
+
+# Steady December sales up to (not including) ``end_day``
+def create_test_product(end_day=364):
+    historical_sales = {f'Day-{day}': 20 + day % 3 for day in range(330, end_day)}
+    return SimpleNamespace(id='P0001', historical_sales=json.dumps(historical_sales))
+
+def test_detector_advances_across_new_year():
+    product = create_test_product()
+    detector = AnomalyDetector()
+    start = date(2025, 12, 30)
+
+    events = []
+    for offset, (day, quantity) in enumerate([('Day-364', 21), ('Day-365', 20), ('Day-001', 22), ('Day-002', 200)]):
+        today = start + timedelta(days=offset)
+        events.extend(detector.record_sale(product, day, quantity, today=today))
+        # Each sale moves the detector onto its own date, January included
+        assert detector._detectors[product.id].day == today.toordinal()
+
+    spikes = [event for event in events if event['kind'] == 'spike']
+    assert [event['day'] for event in spikes] == ['Day-2']
+    print(f"Events across the new year: {events}")
+    return events
+
+def test_seed_in_january_keeps_december():
+    product = create_test_product(end_day=366)
+    detector = AnomalyDetector()
+
+    # First sale of the year: December's history still warms the detector up
+    detector.record_sale(product, 'Day-1', 21, today=date(2026, 1, 1))
+    seeded = detector._detectors[product.id]
+    assert seeded.observations >= 30
+    assert 19 < seeded.mean < 23
+    print(f"Seeded from {seeded.observations} December days, mean {seeded.mean:.1f}")
+    return seeded
+
+if __name__ == "__main__":
+    print("Testing sales anomaly detection...")
+    test_detector_advances_across_new_year()
+    test_seed_in_january_keeps_december()
+    print("\nTest completed.")
@@ -0,0 +1,155 @@
+import time
+import threading
+from app.services.settings import app_settings
+
+# Breaker settings read from the app config; defaults live in config.Config
+SETTINGS = (
+    'OLLAMA_BREAKER_FAILURES',
+    'OLLAMA_BREAKER_BASE_INTERVAL',
+    'OLLAMA_BREAKER_MAX_INTERVAL',
+    'OLLAMA_BREAKER_TRIAL_TIMEOUT'
+)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+class CircuitOpen(Exception):
+    """The backend is failing; the call was not attempted."""
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open circuit breaker for one backend.
+
+    Closed: calls go through and consecutive failures are counted. Open:
+    calls are refused at once until the probe interval has passed. Half-open:
+    exactly one trial call goes through; success closes the breaker, failure
+    re-opens it with the interval doubled, up to a maximum. A trial that
+    never reports back (e.g. it was rejected by the LLM queue) is released
+    or expires after a timeout, so the breaker cannot stay half-open.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.failures = 0
+        self.interval = None
+        self.opened_at = None
+        self.next_trial = None
+        self.trial_started = None
+        self.trips = 0
+        self.refused = 0
+
+    def _trial_due(self, settings):
+        now = time.monotonic()
+        if self.state == OPEN:
+            return now >= self.next_trial
+        # A trial that has run too long no longer holds off the next one
+        return self.state == HALF_OPEN and now - self.trial_started >= settings['OLLAMA_BREAKER_TRIAL_TIMEOUT']
+
+    def is_open(self, settings=None):
+        """True, and counted as a refusal, while calls would be refused; does not start a trial."""
+        settings = settings or app_settings(*SETTINGS)
+        with self._lock:
+            refused = self.state != CLOSED and not self._trial_due(settings)
+            if refused:
+                self.refused += 1
+            return refused
+
+    def trial_due(self, settings=None):
+        """True once an open breaker's wait is over and the next call is its trial."""
+        settings = settings or app_settings(*SETTINGS)
+        with self._lock:
+            return self.state != CLOSED and self._trial_due(settings)
+
+    def before_call(self, settings=None):
+        """
+        Admit a call or raise CircuitOpen.
+
+        Returns True when the call is the half-open trial, which should
+        check the backend directly instead of trusting cached state.
+        """
+        settings = settings or app_settings(*SETTINGS)
+        with self._lock:
+            if self.state == CLOSED:
+                return False
+            if self._trial_due(settings):
+                self.state = HALF_OPEN
+                self.trial_started = time.monotonic()
+                return True
+            self.refused += 1
+            raise CircuitOpen(f"{self.name} is unavailable; retrying in {self._retry_in():.0f}s")
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self.interval = None
+            self.opened_at = None
+            self.next_trial = None
+            self.trial_started = None
+
+    def release_trial(self):
+        """
+        Give back a trial that never reached the backend, e.g. rejected by the LLM queue.
+
+        The breaker re-opens with the same interval, so it neither closes
+        without evidence nor stays half-open with no trial running.
+        """
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self.state = OPEN
+                self.trial_started = None
+                self.next_trial = time.monotonic() + self.interval
+
+    def record_failure(self, settings=None):
+        """Count a failure; one seen while a trial is due counts as the failed trial."""
+        settings = settings or app_settings(*SETTINGS)
+        with self._lock:
+            self.failures += 1
+            trial_failed = self.state == HALF_OPEN or (
+                self.state == OPEN and time.monotonic() >= self.next_trial)
+            self.trial_started = None
+            if trial_failed:
+                self.interval = min(self.interval * 2, settings['OLLAMA_BREAKER_MAX_INTERVAL'])
+            elif self.state == CLOSED and self.failures >= settings['OLLAMA_BREAKER_FAILURES']:
+                self.interval = settings['OLLAMA_BREAKER_BASE_INTERVAL']
+                self.trips += 1
+            else:
+                return
+            self.state = OPEN
+            self.opened_at = time.time()
+            self.next_trial = time.monotonic() + self.interval
+
+    def _retry_in(self):
+        return max(0.0, self.next_trial - time.monotonic()) if self.next_trial else 0.0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self.failures,
+                'probe_interval_s': self.interval,
+                'next_trial_in_s': round(self._retry_in(), 2) if self.state == OPEN else None,
+                'opened_at': self.opened_at,
+                'trips': self.trips,
+                'refused': self.refused
+            }
+
+_breakers_lock = threading.Lock()
+_breakers = {}
+
+def get_breaker(name):
+    """Process-wide breaker for a backend, e.g. an Ollama base URL."""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name)
+        return breaker
+
+def breaker_stats():
+    """State of every breaker, by name."""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.stats() for breaker in breakers}
@@ -0,0 +1,178 @@
+import re
+
+# Default size of the inventory context embedded in LLM prompts, in tokens
+DEFAULT_CONTEXT_TOKENS = 1024
+
+# Tokens kept back per section for its "... N more" line
+TRUNCATION_RESERVE = 6
+
+# Sales days of a single product's history shown in its details
+PRODUCT_HISTORY_DAYS = 14
+
+# Query words that make a section more relevant
+SECTION_KEYWORDS = {
+    'low_stock': {'low', 'stock', 'restock', 'reorder', 'critical', 'running', 'out', 'shortage', 'urgent'},
+    'trending': {'trend', 'trending', 'popular', 'best', 'top', 'selling', 'seller', 'sellers', 'sales', 'sold', 'demand'},
+    'categories': {'category', 'categories', 'breakdown', 'department', 'distribution', 'mix'}
+}
+
+# Base priority of each section when the query does not point at any of them
+SECTION_PRIORITY = {'low_stock': 2, 'trending': 1, 'categories': 1}
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+def estimate_tokens(text):
+    """
+    Rough token count of ``text``: one per word or punctuation mark.
+
+    Close enough to BPE tokenizers for budgeting English prompts and
+    product data without loading a tokenizer.
+    """
+    return len(_TOKEN_RE.findall(text))
+
+def _query_terms(query):
+    return set(re.findall(r"\w+", (query or '').lower()))
+
+def _cell(value):
+    # Keep the pipe-separated table unambiguous
+    text = f"{value:g}" if isinstance(value, float) else str(value)
+    return text.replace('|', '/').replace('\n', ' ')
+
+def _row(values):
+    return '|'.join(_cell(value) for value in values)
+
+def _matches(terms, *values):
+    """Number of query terms found in a row's text fields."""
+    if not terms:
+        return 0
+    words = set(re.findall(r"\w+", ' '.join(str(value) for value in values).lower()))
+    return len(terms & words)
+
+def _product_lines(product):
+    """Compact description of one product, history reduced to its recent days."""
+    sales = product.get('historical_sales') or {}
+    quantities = []
+    for quantity in sales.values():
+        try:
+            quantities.append(float(quantity))
+        except (ValueError, TypeError):
+            continue
+    recent = quantities[-PRODUCT_HISTORY_DAYS:]
+
+    lines = [
+        f"PRODUCT {product.get('id')}: {_cell(product.get('name'))} | category={_cell(product.get('category'))} | "
+        f"supplier={_cell(product.get('supplier'))}",
+        f"stock={product.get('current_stock')} reorder={product.get('reorder_level')} "
+        f"lead_time={product.get('lead_time')}d buy={_cell(product.get('purchase_price'))} "
+        f"sell={_cell(product.get('selling_price'))}"
+    ]
+    if quantities:
+        lines.append(f"sales: {len(quantities)} days, total={_cell(sum(quantities))}, "
+                     f"last {len(recent)} days={' '.join(_cell(q) for q in recent)}")
+    return lines
+
+def _sections(summary, terms):
+    """Tabular sections of the summary, rows ranked most relevant first."""
+    sections = {}
+
+    low_stock = summary.get('low_stock_items') or []
+    sections['low_stock'] = {
+        'header': f"LOW STOCK {len(low_stock)} items (id|name|category|stock|reorder):",
+        # Query matches first, then the emptiest shelves relative to their reorder level
+        'rows': [_row((item['id'], item['name'], item['category'], item['current_stock'], item['reorder_level']))
+                 for item in sorted(low_stock, key=lambda item: (
+                     -_matches(terms, item['id'], item['name'], item['category']),
+                     item['current_stock'] / max(item['reorder_level'], 1)))]
+    }
+
+    trending = summary.get('trending_products') or []
+    sections['trending'] = {
+        'header': "TOP SELLERS (id|name|category|units sold):",
+        'rows': [_row((item['id'], item['name'], item['category'], item['total_sales']))
+                 for item in sorted(trending, key=lambda item: (
+                     -_matches(terms, item['id'], item['name'], item['category']), -item['total_sales']))]
+    }
+
+    categories = summary.get('categories') or {}
+    sections['categories'] = {
+        'header': f"CATEGORIES {len(categories)} (name|products):",
+        'rows': [_row((category, count))
+                 for category, count in sorted(categories.items(), key=lambda entry: (
+                     -_matches(terms, entry[0]), -entry[1]))]
+    }
+    return sections
+
+def build_inventory_context(summary, query=None, product_details=None, budget=DEFAULT_CONTEXT_TOKENS):
+    """
+    Render an inventory summary as compact prompt context within a token budget.
+
+    Sections (low stock, top sellers, categories) are ordered by how well
+    the query's words match them, and rows within a section by how well
+    they match the query. Every section first gets its header and best row,
+    then the remaining budget is filled section by section; rows that do
+    not fit are counted rather than sent.
+
+    Args:
+        summary: Dict from prepare_inventory_summary()
+        query: The user's question, used to rank facts
+        product_details: Optional Product.to_dict() of a product in focus, or a list of them
+        budget: Maximum tokens of context to produce
+
+    Returns:
+        Dict with the context 'text', the 'tokens' it uses, the 'budget'
+        and how many rows were 'omitted'.
+    """
+    terms = _query_terms(query)
+
+    overview = (f"Products: {summary.get('total_products', 0)} | "
+                f"Low stock: {summary.get('low_stock_count', len(summary.get('low_stock_items') or []))} | "
+                f"Out of stock: {summary.get('out_of_stock_count', 0)}")
+    fixed = [overview]
+    if isinstance(product_details, dict):
+        product_details = [product_details]
+    for product in product_details or ():
+        fixed.extend(_product_lines(product))
+    used = sum(estimate_tokens(line) + 1 for line in fixed)
+
+    sections = _sections(summary, terms)
+    order = sorted(
+        (name for name, section in sections.items() if section['rows']),
+        key=lambda name: (-(len(terms & SECTION_KEYWORDS[name]) * 10 + SECTION_PRIORITY[name]), name)
+    )
+
+    kept = {name: 0 for name in order}
+
+    def fits(line):
+        return used + estimate_tokens(line) + 1 + TRUNCATION_RESERVE * len(order) <= budget
+
+    # Pass 1: every section gets its header and best row
+    for name in list(order):
+        section = sections[name]
+        first = section['header'] + '\n' + section['rows'][0]
+        if fits(first):
+            used += estimate_tokens(first) + 2
+            kept[name] = 1
+        else:
+            order.remove(name)
+
+    # Pass 2: fill the rest of the budget in order of relevance
+    for name in order:
+        rows = sections[name]['rows']
+        while kept[name] < len(rows) and fits(rows[kept[name]]):
+            used += estimate_tokens(rows[kept[name]]) + 1
+            kept[name] += 1
+
+    lines = list(fixed)
+    omitted = 0
+    for name in order:
+        section = sections[name]
+        lines.append(section['header'])
+        lines.extend(section['rows'][:kept[name]])
+        remaining = len(section['rows']) - kept[name]
+        if remaining:
+            lines.append(f"... {remaining} more")
+            omitted += remaining
+    omitted += sum(len(section['rows']) for name, section in sections.items() if name not in order)
+
+    text = '\n'.join(lines)
+    return {'text': text, 'tokens': estimate_tokens(text) + len(lines), 'budget': budget, 'omitted': omitted}
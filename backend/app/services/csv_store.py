@@ -0,0 +1,440 @@
+import io
+import os
+import csv
+import json
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+from app.services.settings import app_settings
+from app.services.trend_store import parse_historical_sales
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory file locks, only in-process locking
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Columns of the inventory CSV
+FIELDNAMES = ['product_id', 'name', 'category', 'supplier', 'current_stock',
+              'reorder_level', 'purchase_price', 'selling_price', 'lead_time', 'historical_sales']
+
+# Journal entries are CSV rows of an operation followed by the product's columns
+JOURNAL_FIELDNAMES = ['op'] + FIELDNAMES
+UPSERT = 'U'
+DELETE = 'D'
+
+# Where the latest version of a product lives
+MAIN = 'main'
+JOURNAL = 'journal'
+
+def product_row(product_data):
+    """The CSV row of a product posted as JSON (``id`` or ``product_id``)."""
+    return {
+        'product_id': product_data.get('id') or product_data.get('product_id'),
+        'name': product_data.get('name', ''),
+        'category': product_data.get('category', ''),
+        'supplier': product_data.get('supplier', ''),
+        'current_stock': str(product_data.get('current_stock', 0)),
+        'reorder_level': str(product_data.get('reorder_level', 0)),
+        'purchase_price': str(product_data.get('purchase_price', 0)),
+        'selling_price': str(product_data.get('selling_price', 0)),
+        'lead_time': str(product_data.get('lead_time', 0)),
+        'historical_sales': json.dumps(product_data.get('historical_sales', {}))
+    }
+
+def _format_row(values):
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator='\n').writerow(values)
+    return buffer.getvalue().encode('utf-8')
+
+def _parse_record(record):
+    return next(csv.reader([record.decode('utf-8')]))
+
+def _first_field(record):
+    """First column of a raw record, parsing the CSV only when it is quoted."""
+    if record.startswith(b'"'):
+        return _parse_record(record)[0]
+    return record.split(b',', 1)[0].rstrip(b'\r\n').decode('utf-8')
+
+def _records(handle, start=0):
+    """
+    Yield (offset, raw record) for each complete CSV record from ``start``.
+
+    Records end at a newline outside quotes, so quoted fields may span
+    lines. A torn last record (no trailing newline) is not yielded.
+    """
+    handle.seek(start)
+    offset = record_start = start
+    parts = []
+    quotes = 0
+    for line in handle:
+        if not parts:
+            record_start = offset
+        parts.append(line)
+        quotes += line.count(b'"')
+        offset += len(line)
+        if quotes % 2 == 0 and line.endswith(b'\n'):
+            yield record_start, b''.join(parts)
+            parts = []
+            quotes = 0
+
+def _read_record(handle, offset):
+    for _, record in _records(handle, offset):
+        return record
+    raise ValueError(f"No complete CSV record at offset {offset}")
+
+@contextmanager
+def _file_lock(path, exclusive):
+    """Advisory lock shared between processes; a no-op where fcntl is unavailable."""
+    if fcntl is None:
+        yield
+        return
+    with open(path, 'a') as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+def _signature(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+class CsvStore:
+    """
+    Inventory CSV with an append-only change journal.
+
+    A product update appends one row to ``<csv>.journal`` instead of
+    rewriting the CSV, and an in-memory index maps each product id to the
+    file and byte offset of its latest row. Once the journal holds
+    CSV_JOURNAL_COMPACT_ENTRIES entries it is compacted: the merged rows are
+    written to a temporary file that atomically replaces the CSV, then the
+    journal is removed. Replaying a journal over the CSV is idempotent, so a
+    crash between those two steps loses nothing.
+
+    Writers hold an exclusive fcntl lock on ``<csv>.lock`` and readers a
+    shared one, so several worker processes can use the same files; each
+    notices the others' appends and compactions from the file sizes and
+    inodes before touching its index.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.journal_path = f"{path}.journal"
+        self.lock_path = f"{path}.lock"
+        self._lock = threading.RLock()
+        self._holding = False
+        self._reset()
+        self.appends = 0
+        self.compactions = 0
+        self.rebuilds = 0
+        # (file signatures, parsed rows, product id -> position) of the last parse
+        self._parsed = None
+        self.parses = 0
+
+    def _reset(self):
+        # product id -> (MAIN or JOURNAL, byte offset of its latest row, deleted)
+        self._index = {}
+        self._main_signature = None
+        self._journal_inode = None
+        self._journal_end = 0
+        self._journal_entries = 0
+
+    @contextmanager
+    def _locked(self, exclusive):
+        with self._lock:
+            if self._holding:
+                # Nested in exclusive(), which already holds the file lock
+                self._sync()
+                yield
+                return
+            with _file_lock(self.lock_path, exclusive):
+                self._holding = True
+                try:
+                    self._sync()
+                    yield
+                finally:
+                    self._holding = False
+
+    @contextmanager
+    def exclusive(self):
+        """
+        Hold the store's write lock across several reads and writes.
+
+        Other threads and processes can neither read nor write the CSV
+        until the block ends, e.g. while a sync compares and applies rows.
+        """
+        with self._locked(exclusive=True):
+            yield self
+
+    def _sync(self):
+        """Bring the index up to date with the files, reading only what changed."""
+        main_signature = _signature(self.path)
+        journal_signature = _signature(self.journal_path)
+        if main_signature != self._main_signature:
+            self._rebuild(main_signature)
+            return
+        if journal_signature is None:
+            if self._journal_inode is not None:
+                self._rebuild(main_signature)
+            return
+        inode, size, _ = journal_signature
+        if self._journal_inode is not None and (inode != self._journal_inode or size < self._journal_end):
+            self._rebuild(main_signature)
+        elif size > self._journal_end:
+            self._scan_journal(inode)
+
+    def _rebuild(self, main_signature):
+        self._reset()
+        self.rebuilds += 1
+        if main_signature is not None:
+            with open(self.path, 'rb') as handle:
+                for offset, record in _records(handle):
+                    if offset:  # offset 0 is the header
+                        self._index.setdefault(_first_field(record), (MAIN, offset, False))
+        self._main_signature = main_signature
+        journal_signature = _signature(self.journal_path)
+        if journal_signature is not None:
+            self._scan_journal(journal_signature[0])
+
+    def _scan_journal(self, inode):
+        with open(self.journal_path, 'rb') as handle:
+            for offset, record in _records(handle, self._journal_end):
+                if offset:  # offset 0 is the header
+                    op, product_id = _parse_record(record)[:2]
+                    self._index[product_id] = (JOURNAL, offset, op == DELETE)
+                    self._journal_entries += 1
+                self._journal_end = offset + len(record)
+        self._journal_inode = inode
+
+    def _append(self, entries):
+        """Append journal entries in one write; returns their offsets."""
+        with open(self.journal_path, 'ab') as handle:
+            size = os.fstat(handle.fileno()).st_size
+            if size > self._journal_end:
+                # A writer died mid-append; drop its torn entry
+                handle.truncate(self._journal_end)
+                size = self._journal_end
+            chunks = []
+            if size == 0:
+                chunks.append(_format_row(JOURNAL_FIELDNAMES))
+                size = len(chunks[0])
+            offsets = []
+            for values in entries:
+                offsets.append(size)
+                chunks.append(_format_row(values))
+                size += len(chunks[-1])
+            handle.write(b''.join(chunks))
+            handle.flush()
+            self._journal_inode = os.fstat(handle.fileno()).st_ino
+        self._journal_end = size
+        self._journal_entries += len(offsets)
+        self.appends += len(offsets)
+        return offsets
+
+    def _exists(self, product_id):
+        entry = self._index.get(product_id)
+        return entry is not None and not entry[2]
+
+    def upsert(self, row, settings=None):
+        """
+        Record the latest version of a product; one append, whatever the CSV's size.
+
+        ``row`` maps FIELDNAMES to values. Returns 'updated' or 'added'.
+        """
+        settings = settings or app_settings('CSV_JOURNAL_COMPACT_ENTRIES')
+        with self._locked(exclusive=True):
+            existed = self._exists(str(row['product_id']))
+            self._apply([row], (), settings)
+        return 'updated' if existed else 'added'
+
+    def delete(self, product_id, settings=None):
+        """Record that a product was removed; returns whether it was present."""
+        settings = settings or app_settings('CSV_JOURNAL_COMPACT_ENTRIES')
+        with self._locked(exclusive=True):
+            if not self._exists(str(product_id)):
+                return False
+            self._apply((), [product_id], settings)
+        return True
+
+    def apply_changes(self, rows, deleted_ids, settings=None):
+        """Upsert ``rows`` and delete ``deleted_ids`` with a single journal write."""
+        settings = settings or app_settings('CSV_JOURNAL_COMPACT_ENTRIES')
+        with self._locked(exclusive=True):
+            self._apply(rows, [product_id for product_id in deleted_ids if self._exists(str(product_id))],
+                        settings)
+
+    def _apply(self, rows, deleted_ids, settings):
+        entries = [[UPSERT] + [row.get(field, '') for field in FIELDNAMES] for row in rows]
+        entries += [[DELETE, product_id] + [''] * (len(FIELDNAMES) - 1) for product_id in deleted_ids]
+        if not entries:
+            return
+        for values, offset in zip(entries, self._append(entries)):
+            self._index[str(values[1])] = (JOURNAL, offset, values[0] == DELETE)
+        self._maybe_compact(settings)
+
+    def get(self, product_id):
+        """Latest row of a product as a dict, or None."""
+        with self._locked(exclusive=False):
+            entry = self._index.get(str(product_id))
+            if entry is None or entry[2]:
+                return None
+            source, offset, _ = entry
+            path = self.journal_path if source == JOURNAL else self.path
+            with open(path, 'rb') as handle:
+                values = _parse_record(_read_record(handle, offset))
+        if source == JOURNAL:
+            values = values[1:]
+        return dict(zip(FIELDNAMES, values))
+
+    def rows(self):
+        """Every product's latest row, as dicts in CSV order with new products last."""
+        with self._locked(exclusive=False):
+            return list(self._merged())
+
+    def _merged(self):
+        # Journal entries that are still the latest version, by offset
+        latest = {offset for source, offset, _ in self._index.values() if source == JOURNAL}
+        journal = {}
+        if latest:
+            with open(self.journal_path, 'rb') as handle:
+                for offset, record in _records(handle):
+                    if offset in latest:
+                        journal[offset] = _parse_record(record)
+
+        seen = set()
+        if self._main_signature is not None:
+            with open(self.path, 'r', newline='', encoding='utf-8') as handle:
+                for row in csv.DictReader(handle):
+                    product_id = row['product_id']
+                    if product_id in seen:
+                        continue
+                    seen.add(product_id)
+                    source, offset, deleted = self._index.get(product_id, (MAIN, None, False))
+                    if deleted:
+                        continue
+                    yield dict(zip(FIELDNAMES, journal[offset][1:])) if source == JOURNAL else row
+        for product_id, (source, offset, deleted) in self._index.items():
+            if product_id not in seen and not deleted:
+                yield dict(zip(FIELDNAMES, journal[offset][1:]))
+
+    def _version(self):
+        return _signature(self.path), _signature(self.journal_path)
+
+    def snapshot(self):
+        """
+        Parsed rows and a product id -> position map, as of the files' current state.
+
+        historical_sales is parsed into a dict. The result is cached against
+        the inode, size and mtime of the CSV and its journal, so repeated
+        reads of unchanged files cost two stat calls. Callers must not
+        modify it.
+        """
+        parsed = self._parsed
+        if parsed is not None and parsed[0] == self._version():
+            return parsed[1], parsed[2]
+        with self._locked(exclusive=False):
+            version = self._version()
+            parsed = self._parsed
+            if parsed is not None and parsed[0] == version:
+                return parsed[1], parsed[2]
+            rows = list(self._merged())
+            for row in rows:
+                row['historical_sales'] = parse_historical_sales(row['historical_sales'])
+            positions = {row['product_id']: position for position, row in enumerate(rows)}
+            self._parsed = (version, rows, positions)
+            self.parses += 1
+        return rows, positions
+
+    def _maybe_compact(self, settings):
+        if self._journal_entries >= settings['CSV_JOURNAL_COMPACT_ENTRIES']:
+            self._compact()
+
+    def compact(self):
+        """Fold the journal into the main CSV now."""
+        with self._locked(exclusive=True):
+            if self._journal_inode is not None:
+                self._compact()
+
+    def _compact(self):
+        """
+        Write the merged rows to a new CSV and swap it in.
+
+        Rows are copied as raw records, journal entries minus their op
+        column, so nothing is parsed; the new index is built while writing.
+        """
+        latest = {offset for source, offset, deleted in self._index.values() if source == JOURNAL and not deleted}
+        with open(self.journal_path, 'rb') as handle:
+            journal = {offset: record[record.index(b',') + 1:]
+                       for offset, record in _records(handle) if offset in latest}
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, temp_path = tempfile.mkstemp(prefix='.inventory-', suffix='.csv', dir=directory)
+        index = {}
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                position = out.write(_format_row(FIELDNAMES))
+
+                def write(product_id, record):
+                    nonlocal position
+                    index[product_id] = (MAIN, position, False)
+                    position += out.write(record)
+
+                if self._main_signature is not None:
+                    with open(self.path, 'rb') as handle:
+                        for offset, record in _records(handle):
+                            if not offset:  # the old header
+                                continue
+                            product_id = _first_field(record)
+                            source, latest_offset, deleted = self._index[product_id]
+                            if deleted or product_id in index:
+                                continue
+                            write(product_id, journal[latest_offset] if source == JOURNAL else record)
+                for product_id, (source, offset, deleted) in self._index.items():
+                    if source == JOURNAL and not deleted and product_id not in index:
+                        write(product_id, journal[offset])
+                out.flush()
+                os.fsync(out.fileno())
+            if os.path.exists(self.path):
+                os.chmod(temp_path, os.stat(self.path).st_mode & 0o777)
+            os.replace(temp_path, self.path)
+        except Exception:
+            os.unlink(temp_path)
+            raise
+        entries = self._journal_entries
+        os.unlink(self.journal_path)
+        self.compactions += 1
+        self._reset()
+        self._index = index
+        self._main_signature = _signature(self.path)
+        logger.info(f"Compacted {entries} journal entries into {self.path}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                'products': sum(1 for entry in self._index.values() if not entry[2]),
+                'journal_entries': self._journal_entries,
+                'journal_bytes': self._journal_end,
+                'appends': self.appends,
+                'compactions': self.compactions,
+                'rebuilds': self.rebuilds,
+                'parses': self.parses,
+                'file_locking': fcntl is not None
+            }
+
+_stores_lock = threading.Lock()
+_stores = {}
+
+def get_csv_store(path):
+    """Process-wide store for a CSV file."""
+    path = os.path.abspath(path)
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = CsvStore(path)
+        return store
@@ -0,0 +1,108 @@
+from app.services.csv_store import CsvStore, FIELDNAMES
+import csv
+import json
+import os
+import tempfile
+
+SETTINGS = {'CSV_JOURNAL_COMPACT_ENTRIES': 1000}
+
+def create_test_row(product_id, current_stock=10):
+    return {
+        'product_id': product_id,
+        'name': f'Product {product_id}',
+        'category': 'Test',
+        'supplier': 'Supplier A',
+        'current_stock': str(current_stock),
+        'reorder_level': '5',
+        'purchase_price': '1.50',
+        'selling_price': '2.50',
+        'lead_time': '3',
+        'historical_sales': json.dumps({'Day-1': 4, 'Day-2': 6})
+    }
+
+# A fresh inventory CSV with ``count`` products P0001...
+def create_test_csv(count=3):
+    path = os.path.join(tempfile.mkdtemp(), 'inventory.csv')
+    with open(path, 'w', newline='', encoding='utf-8') as handle:
+        writer = csv.DictWriter(handle, fieldnames=FIELDNAMES)
+        writer.writeheader()
+        for number in range(1, count + 1):
+            writer.writerow(create_test_row(f'P{number:04d}'))
+    return path
+
+def test_upsert_then_get():
+    store = CsvStore(create_test_csv())
+
+    assert store.upsert(create_test_row('P0002', current_stock=42), settings=SETTINGS) == 'updated'
+    assert store.upsert(create_test_row('P0009', current_stock=7), settings=SETTINGS) == 'added'
+    assert store.get('P0002')['current_stock'] == '42'
+    assert store.get('P0009') == create_test_row('P0009', current_stock=7)
+    # Updated rows keep their CSV position; new products come last
+    assert [row['product_id'] for row in store.rows()] == ['P0001', 'P0002', 'P0003', 'P0009']
+    print(f"Store after upserts: {store.stats()}")
+    return store
+
+def test_delete_leaves_tombstone():
+    store = CsvStore(create_test_csv())
+
+    assert store.delete('P0001', settings=SETTINGS)
+    assert not store.delete('P0001', settings=SETTINGS)
+    assert store.get('P0001') is None
+    assert [row['product_id'] for row in store.rows()] == ['P0002', 'P0003']
+    # The main CSV still has the row; the journal's tombstone hides it
+    with open(store.path, newline='', encoding='utf-8') as handle:
+        assert 'P0001' in [row['product_id'] for row in csv.DictReader(handle)]
+    with open(store.journal_path, newline='', encoding='utf-8') as handle:
+        assert [(row['op'], row['product_id']) for row in csv.DictReader(handle)] == [('D', 'P0001')]
+    print(f"Store after delete: {store.stats()}")
+    return store
+
+def test_reopen_replays_journal():
+    path = create_test_csv()
+    store = CsvStore(path)
+    store.upsert(create_test_row('P0003', current_stock=0), settings=SETTINGS)
+    store.upsert(create_test_row('P0004'), settings=SETTINGS)
+    store.delete('P0001', settings=SETTINGS)
+    store.upsert(create_test_row('P0003', current_stock=8), settings=SETTINGS)
+
+    reopened = CsvStore(path)
+    assert reopened.rows() == store.rows()
+    assert reopened.get('P0003')['current_stock'] == '8'
+    assert reopened.get('P0001') is None
+    assert reopened.stats()['journal_entries'] == 4
+    print(f"Reopened store: {reopened.stats()}")
+    return reopened
+
+def test_compaction_keeps_every_row():
+    path = create_test_csv(count=5)
+    store = CsvStore(path)
+    store.upsert(create_test_row('P0002', current_stock=1), settings=SETTINGS)
+    store.delete('P0004', settings=SETTINGS)
+    store.upsert(create_test_row('P0006'), settings=SETTINGS)
+    expected = store.rows()
+
+    # The fourth journal entry reaches the threshold and folds the journal in
+    store.upsert(create_test_row('P0007'), settings={'CSV_JOURNAL_COMPACT_ENTRIES': 4})
+    expected.append(create_test_row('P0007'))
+    assert store.compactions == 1
+    assert not os.path.exists(store.journal_path)
+    assert store.rows() == expected
+
+    # The compacted CSV alone holds the same rows
+    with open(path, newline='', encoding='utf-8') as handle:
+        assert list(csv.DictReader(handle)) == expected
+    assert CsvStore(path).rows() == expected
+
+    # Compacting an empty journal leaves the file alone
+    store.compact()
+    assert store.compactions == 1
+    print(f"Compacted store: {store.stats()}")
+    return store
+
+if __name__ == "__main__":
+    print("Testing CSV journal store...")
+    test_upsert_then_get()
+    test_delete_leaves_tombstone()
+    test_reopen_replays_journal()
+    test_compaction_keeps_every_row()
+    print("\nTest completed.")
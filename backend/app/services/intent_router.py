@@ -0,0 +1,151 @@
+import re
+import time
+from app.services.settings import app_setting
+from app.models.export_data import ExportData, smalltalk_kind
+from app.services.inventory_snapshot import get_inventory_frame
+from app.services.trend_store import trend_store
+from app.services.latency_metrics import RouteMetrics
+
+# Route taken by questions the local handlers cannot answer
+LLM_ROUTE = 'llm'
+
+# Cues for each data intent, as (pattern, weight); weights combine as independent evidence
+INTENT_CUES = {
+    'low_stock': [
+        (r"\blow\b.*\b(stock|inventory|quantity|quantities)\b", 0.8),
+        (r"\brunning[\s-](low|out)\b", 0.8),
+        (r"\b(restock|reorder|replenish)\w*\b", 0.6),
+        (r"\bshort(age)?s?\b", 0.4)
+    ],
+    'out_of_stock': [
+        (r"\bout[\s-]of[\s-]stock\b", 0.9),
+        (r"\b(stock[\s-]?outs?|sold[\s-]out)\b", 0.8),
+        (r"\b(critical|empty|zero[\s-]stock)\b", 0.5)
+    ],
+    'categories': [
+        (r"\bcategor(y|ies)\b", 0.7),
+        (r"\bneeds? (the most )?attention\b", 0.5),
+        (r"\bbreakdown\b", 0.4)
+    ],
+    'top_sellers': [
+        (r"\b(top|best)([\s-]+\d+)?[\s-]*sell(ing|ers?)\b", 0.9),
+        (r"\b(trending|popular|most sold|selling the most)\b", 0.8),
+        (r"\btop[\s-]+\d+\b", 0.4)
+    ],
+    'totals': [
+        (r"\b(total|overall)\b.*\b(value|worth|products|items|units|quantity|stock|inventory)\b", 0.8),
+        (r"\bhow many (products|items)\b", 0.8),
+        (r"\b(inventory|stock) (health|summary|overview|status)\b", 0.8),
+        (r"\b(summary|overview|health)\b", 0.4)
+    ]
+}
+
+# Open-ended questions need reasoning rather than a lookup
+OPEN_ENDED_RE = re.compile(
+    r"\b(why|should|recommend\w*|suggest\w*|predict\w*|forecast\w*|explain|strateg\w*|plan\w*|"
+    r"compare|improve|optimi[sz]\w*|what if|analy[sz]\w*|advice|advise|impact|trade-?offs?|root cause)\b"
+)
+OPEN_ENDED_PENALTY = 0.4
+
+# Longer conversational-looking questions usually carry a real request for the LLM
+SMALLTALK_MAX_WORDS = 5
+SMALLTALK_LONG_CONFIDENCE = 0.5
+
+_COMPILED_CUES = {
+    intent: [(re.compile(pattern), weight) for pattern, weight in cues]
+    for intent, cues in INTENT_CUES.items()
+}
+
+def is_open_ended(query):
+    """Whether a question asks for reasoning (why, recommend, forecast, ...) rather than a lookup."""
+    return bool(OPEN_ENDED_RE.search((query or '').lower()))
+
+def classify_intent(query):
+    """
+    Score a question against the local intents.
+
+    Returns ``(intent, confidence)``. Confidence combines the matched cue
+    weights of the best intent, is reduced when a second intent matches
+    nearly as well, and is cut for open-ended questions. Conversational
+    questions (greetings, thanks, questions about the assistant) are
+    'smalltalk' when no data intent matches, confidently only when short.
+    """
+    query_lower = (query or '').lower()
+    scores = {}
+    for intent, cues in _COMPILED_CUES.items():
+        miss = 1.0
+        for pattern, weight in cues:
+            if pattern.search(query_lower):
+                miss *= 1 - weight
+        if miss < 1.0:
+            scores[intent] = 1 - miss
+
+    if not scores:
+        if not smalltalk_kind(query_lower):
+            return LLM_ROUTE, 0.0
+        short = len(query_lower.split()) <= SMALLTALK_MAX_WORDS
+        return 'smalltalk', 1.0 if short else SMALLTALK_LONG_CONFIDENCE
+
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    intent, best = ranked[0]
+    runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+    confidence = best * (1 - runner_up / 2)
+    if is_open_ended(query_lower):
+        confidence *= OPEN_ENDED_PENALTY
+    return intent, confidence
+
+def _top_sellers_answer(query):
+    match = re.search(r"\btop[\s-]+(\d+)\b", query.lower())
+    k = min(int(match.group(1)), 50) if match else 5
+    top = trend_store.top_sellers(k, metric='total')
+    if not top:
+        return "I don't have enough sales data to determine top-selling products yet."
+    lines = [f"- {item['name']} ({item['category']}): {item['total_sales']:g} units sold" for item in top]
+    return f"Top {len(top)} best-selling products:\n\n" + '\n'.join(lines)
+
+def _totals_answer(df):
+    total_value = float((df['current_stock'] * df['purchase_price']).sum()) if not df.empty else 0.0
+    total_units = int(df['current_stock'].sum()) if not df.empty else 0
+    return (f"Total inventory value: ${total_value:,.2f} across {total_units:,} units in stock.\n\n" +
+            ExportData.generate_rule_based_insights(df, 'inventory health'))
+
+# Structured handlers for the intents answerable straight from the data
+INTENT_HANDLERS = {
+    'low_stock': lambda query, df: ExportData.generate_rule_based_insights(df, 'low stock'),
+    'out_of_stock': lambda query, df: ExportData.generate_rule_based_insights(df, 'out of stock'),
+    'categories': lambda query, df: ExportData.generate_rule_based_insights(df, 'which categories need attention'),
+    'top_sellers': lambda query, df: _top_sellers_answer(query),
+    'totals': lambda query, df: _totals_answer(df),
+    'smalltalk': lambda query, df: ExportData.generate_rule_based_insights(df, query)
+}
+
+class IntentRouter:
+    """Answers data questions locally and escalates the rest to the LLM."""
+
+    def __init__(self):
+        self.metrics = RouteMetrics()
+
+    def route(self, query, product_id=None):
+        """
+        Pick a route for a question: a local intent, or LLM_ROUTE.
+
+        Questions about a specific product always go to the LLM, which gets
+        the product's details as context.
+        """
+        if product_id:
+            return LLM_ROUTE, 0.0
+        intent, confidence = classify_intent(query)
+        if intent == LLM_ROUTE or confidence < app_setting('INTENT_CONFIDENCE_THRESHOLD'):
+            return LLM_ROUTE, confidence
+        return intent, confidence
+
+    def answer(self, intent, query):
+        """Answer a question with the structured handler of a local intent."""
+        return INTENT_HANDLERS[intent](query, get_inventory_frame())
+
+    def record(self, route, started):
+        """Record the latency of a request that began at ``started`` (time.perf_counter())."""
+        self.metrics.record(route, time.perf_counter() - started, app_setting('INTENT_METRICS_WINDOW'))
+
+# Process-wide router used by the assistant
+intent_router = IntentRouter()
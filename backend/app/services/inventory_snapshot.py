@@ -0,0 +1,56 @@
+import threading
+import logging
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+from app.extensions import db
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_snapshot = {'version': None, 'df': None}
+
+def _load_inventory_frame():
+    """Read the products table straight into a DataFrame."""
+    from app.models.inventory import Product
+
+    query = select(
+        Product.id, Product.name, Product.category, Product.supplier,
+        Product.current_stock, Product.reorder_level,
+        Product.purchase_price, Product.selling_price, Product.lead_time
+    ).order_by(Product.id)
+    df = pd.read_sql(query, db.session.connection())
+
+    df['stock_status'] = np.select(
+        [df['current_stock'] <= 0, df['current_stock'] <= df['reorder_level']],
+        ['OUT_OF_STOCK', 'LOW_STOCK'],
+        default='IN_STOCK'
+    )
+    return df
+
+def get_inventory_snapshot():
+    """
+    Return ``(version, df)`` for the current inventory.
+
+    The DataFrame has one row per product (id, name, category, supplier,
+    current_stock, reorder_level, purchase_price, selling_price, lead_time,
+    stock_status) and is rebuilt only when Product.inventory_version()
+    changes. It is shared between callers, so treat it as read-only.
+    """
+    from app.models.inventory import Product
+
+    version = Product.inventory_version()
+    with _lock:
+        if _snapshot['version'] == version and _snapshot['df'] is not None:
+            return version, _snapshot['df']
+
+    df = _load_inventory_frame()
+    with _lock:
+        _snapshot['version'] = version
+        _snapshot['df'] = df
+    logger.info(f"Inventory snapshot rebuilt for version {version} ({len(df)} products)")
+    return version, df
+
+def get_inventory_frame():
+    """Shared read-only DataFrame of the current inventory."""
+    return get_inventory_snapshot()[1]
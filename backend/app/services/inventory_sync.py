@@ -0,0 +1,314 @@
+import os
+import json
+import time
+import hashlib
+import logging
+from operator import itemgetter
+from datetime import datetime
+from app.services.settings import app_settings
+from app.extensions import db
+from app.models.inventory import Product, Transaction, Anomaly, ProductDeletion, bump_inventory_version
+from app.services.csv_store import get_csv_store
+from app.services.trend_store import parse_historical_sales
+
+logger = logging.getLogger(__name__)
+
+# Conflict resolutions: the database wins, the CSV wins, or the row is left alone and reported
+PREFER_CHOICES = ('db', 'csv', 'skip')
+
+# Product columns compared between the two sides, in CSV order
+SYNC_COLUMNS = ('name', 'category', 'supplier', 'current_stock', 'reorder_level',
+                'purchase_price', 'selling_price', 'lead_time', 'historical_sales')
+_sync_values = itemgetter(*SYNC_COLUMNS)
+INT_COLUMNS = ('current_stock', 'reorder_level', 'lead_time')
+PRICE_COLUMNS = ('purchase_price', 'selling_price')
+
+# Baseline entries: [row hash, CSV fingerprint, database fingerprint] as of the last sync
+BASELINE_HASH, BASELINE_CSV, BASELINE_DB = range(3)
+
+def baseline_path(csv_path):
+    """Where the row hashes of the last sync are kept."""
+    return f"{csv_path}.sync.json"
+
+def _load_baseline(path):
+    try:
+        with open(path) as baseline_file:
+            return json.load(baseline_file)
+    except FileNotFoundError:
+        return None
+    except ValueError:
+        logger.warning(f"Unreadable sync baseline {path}; syncing as if for the first time")
+        return None
+
+def _save_baseline(path, baseline):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as baseline_file:
+        baseline_file.write(json.dumps(baseline, separators=(',', ':')))
+    os.replace(tmp_path, path)
+
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return int(float(value))
+
+def canonical(values):
+    """
+    A product's columns in one comparable form, whichever side they came from.
+
+    Numbers are parsed from the CSV's strings, prices are rounded to cents
+    (MySQL FLOAT columns do not round-trip exactly) and historical_sales is
+    parsed from JSON or a Python literal. Raises ValueError for bad numbers.
+    """
+    row = {column: values[column] for column in SYNC_COLUMNS}
+    for column in INT_COLUMNS:
+        row[column] = _int(row[column])
+    for column in PRICE_COLUMNS:
+        row[column] = round(float(row[column]), 2)
+    for column in ('name', 'category', 'supplier'):
+        row[column] = str(row[column] if row[column] is not None else '')
+    row['historical_sales'] = parse_historical_sales(row['historical_sales'])
+    return row
+
+def row_hash(row):
+    """Hash of a canonical row; equal hashes mean the two sides agree."""
+    data = json.dumps([row[column] for column in SYNC_COLUMNS], separators=(',', ':'))
+    return hashlib.blake2b(data.encode('utf-8'), digest_size=16).hexdigest()
+
+def fingerprint(values):
+    """Cheap digest of one side's raw values; a row whose fingerprint is unchanged needs no parsing."""
+    data = '\x1f'.join(map(str, _sync_values(values)))
+    return hashlib.blake2b(data.encode('utf-8'), digest_size=8).hexdigest()
+
+def _hash_side(raw_rows, baseline, slot, side):
+    """
+    Row hashes and fingerprints of one side.
+
+    Rows whose fingerprint matches the one recorded at the last sync reuse
+    that sync's hash, so a periodic sync only parses the rows that changed.
+    """
+    hashes, fingerprints, errors = {}, {}, {}
+    for product_id, values in raw_rows.items():
+        fingerprints[product_id] = current = fingerprint(values)
+        entry = baseline.get(product_id)
+        if entry is not None and entry[slot] == current:
+            hashes[product_id] = entry[BASELINE_HASH]
+            continue
+        try:
+            hashes[product_id] = row_hash(canonical(values))
+        except (TypeError, ValueError) as e:
+            errors[product_id] = (side, f"Invalid {'CSV' if side == 'csv' else 'database'} row: {e}")
+    return hashes, fingerprints, errors
+
+def _db_rows():
+    columns = [getattr(Product, column) for column in SYNC_COLUMNS]
+    return {product[0]: dict(zip(SYNC_COLUMNS, product[1:]))
+            for product in db.session.query(Product.id, *columns)}
+
+def _to_db_mapping(product_id, row, now, created=False):
+    mapping = dict(row, id=product_id, historical_sales=json.dumps(row['historical_sales']), updated_at=now)
+    if created:
+        mapping['created_at'] = now
+    return mapping
+
+def _to_csv_row(product_id, row):
+    csv_row = {column: str(row[column]) for column in SYNC_COLUMNS}
+    csv_row['product_id'] = product_id
+    csv_row['historical_sales'] = json.dumps(row['historical_sales'])
+    return csv_row
+
+def _batches(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+class SyncPlan:
+    """Changes a sync applies to each side, and what it could not decide."""
+
+    def __init__(self):
+        self.to_db = {'insert': [], 'update': [], 'delete': []}
+        self.to_csv = {'upsert': [], 'delete': []}
+        self.conflicts = []
+        self.errors = []
+        self.unchanged = 0
+        # product id -> (hash both sides share after the sync or None once deleted,
+        #                side copied from or None when they already agreed)
+        self.settled = {}
+
+    def report(self):
+        return {
+            'to_db': {action: len(ids) for action, ids in self.to_db.items()},
+            'to_csv': {action: len(ids) for action, ids in self.to_csv.items()},
+            'unchanged': self.unchanged,
+            'conflicts': self.conflicts,
+            'errors': self.errors,
+            'changes': {'to_db': self.to_db, 'to_csv': self.to_csv}
+        }
+
+def plan_sync(csv_hashes, db_hashes, baseline, prefer, errors=None):
+    """
+    Decide which rows move in which direction.
+
+    Each side's row hash is compared with the baseline, the hashes both
+    sides agreed on after the last sync, to tell which side changed:
+
+    - only one side changed: copy it across
+    - on one side only: delete it there too if that side still has the
+      last synced version, otherwise (new, re-created or edited) copy it
+      across
+    - both sides changed differently: a conflict, resolved by ``prefer``
+      ('db', 'csv' or 'skip')
+
+    Without a baseline (the first sync) nothing counts as deleted and every
+    difference between two existing rows is a conflict. ``csv_hashes`` and ``db_hashes`` map product
+    ids to row hashes, ``baseline`` maps them to the last sync's hash and
+    ``errors`` maps rows that could not be parsed to (side, message); those
+    are reported and left alone.
+    """
+    plan = SyncPlan()
+    errors = errors or {}
+
+    def take(source, product_id):
+        """Make ``source``'s version ('csv' or 'db') of the product the one both sides keep."""
+        if source == 'csv':
+            if product_id not in csv_hashes:
+                plan.to_db['delete'].append(product_id)
+            else:
+                plan.to_db['update' if product_id in db_hashes else 'insert'].append(product_id)
+            plan.settled[product_id] = (csv_hashes.get(product_id), source)
+        else:
+            if product_id not in db_hashes:
+                plan.to_csv['delete'].append(product_id)
+            else:
+                plan.to_csv['upsert'].append(product_id)
+            plan.settled[product_id] = (db_hashes.get(product_id), source)
+
+    for product_id, (side, message) in errors.items():
+        plan.errors.append({'product_id': product_id, 'side': side, 'message': message})
+
+    for product_id in list(csv_hashes) + [product_id for product_id in db_hashes if product_id not in csv_hashes]:
+        if product_id in errors:
+            continue
+        csv_hash = csv_hashes.get(product_id)
+        db_hash = db_hashes.get(product_id)
+        base = baseline.get(product_id)
+        if csv_hash == db_hash:
+            plan.unchanged += 1
+            plan.settled[product_id] = (csv_hash, None)
+        elif csv_hash is None or db_hash is None:
+            present, missing = ('csv', 'db') if db_hash is None else ('db', 'csv')
+            if base is not None and (csv_hash if present == 'csv' else db_hash) == base:
+                # Unchanged where it is left, so the other side deleted it
+                take(missing, product_id)
+            else:
+                take(present, product_id)
+        elif db_hash == base:
+            take('csv', product_id)
+        elif csv_hash == base:
+            take('db', product_id)
+        else:
+            plan.conflicts.append({'product_id': product_id, 'kind': 'both_changed', 'resolution': prefer})
+            if prefer != 'skip':
+                take(prefer, product_id)
+    return plan
+
+def _apply_to_db(plan, csv_rows, batch_size):
+    now = datetime.utcnow()
+    for batch in _batches(plan.to_db['insert'], batch_size):
+        db.session.bulk_insert_mappings(Product, [
+            _to_db_mapping(product_id, canonical(csv_rows[product_id]), now, created=True) for product_id in batch])
+    for batch in _batches(plan.to_db['update'], batch_size):
+        db.session.bulk_update_mappings(Product, [
+            _to_db_mapping(product_id, canonical(csv_rows[product_id]), now) for product_id in batch])
+    for batch in _batches(plan.to_db['delete'], batch_size):
+        # As in the delete route: dependent rows first, then the products, logged for delta exports
+        Transaction.query.filter(Transaction.product_id.in_(batch)).delete(synchronize_session=False)
+        Anomaly.query.filter(Anomaly.product_id.in_(batch)).delete(synchronize_session=False)
+        Product.query.filter(Product.id.in_(batch)).delete(synchronize_session=False)
+        db.session.bulk_insert_mappings(ProductDeletion, [
+            {'product_id': product_id, 'deleted_at': now} for product_id in batch])
+    # Bulk writes skip the flush hook that counts inventory writes
+    if plan.to_db['insert'] or plan.to_db['update'] or plan.to_db['delete']:
+        bump_inventory_version()
+    db.session.commit()
+
+def _refresh_derived_state(product_ids):
+    """Rebuild what is derived from products after a sync changed some of them."""
+    from app.services.trend_store import trend_store
+    from app.services.product_index import product_index
+    from app.services.anomaly_service import anomaly_detector
+
+    trend_store.invalidate()
+    product_index.invalidate()
+    for product_id in product_ids:
+        anomaly_detector.reset(product_id)
+
+def sync_inventory(csv_path, dry_run=False, prefer=None, settings=None):
+    """
+    Reconcile the products table with an inventory CSV, copying only rows that differ.
+
+    Rows are compared by hash against the previous sync (kept in
+    ``<csv>.sync.json``) to tell which side changed; see plan_sync for the
+    rules. Database changes go out as batched bulk statements in one
+    transaction, CSV changes as one journal write to the CSV store. The CSV
+    is locked for the whole sync, so concurrent CSV updates wait for it.
+
+    With ``dry_run`` nothing is written. Returns a report with the number
+    of rows copied each way, the ids behind them, conflicts and rows that
+    could not be parsed.
+    """
+    settings = settings or app_settings('INVENTORY_SYNC_PREFER', 'INVENTORY_SYNC_BATCH_SIZE')
+    prefer = prefer or settings['INVENTORY_SYNC_PREFER']
+    if prefer not in PREFER_CHOICES:
+        raise ValueError(f"Invalid conflict rule '{prefer}'. Use one of: {', '.join(PREFER_CHOICES)}")
+
+    started = time.perf_counter()
+    store = get_csv_store(csv_path)
+    state_path = baseline_path(store.path)
+    baseline = _load_baseline(state_path)
+
+    with store.exclusive():
+        csv_rows = {row['product_id']: row for row in store.rows()}
+        db_rows = _db_rows()
+        known = baseline or {}
+        csv_hashes, csv_fingerprints, errors = _hash_side(csv_rows, known, BASELINE_CSV, 'csv')
+        db_hashes, db_fingerprints, db_errors = _hash_side(db_rows, known, BASELINE_DB, 'db')
+        for product_id, error in db_errors.items():
+            errors.setdefault(product_id, error)
+
+        base_hashes = {product_id: entry[BASELINE_HASH] for product_id, entry in known.items()}
+        plan = plan_sync(csv_hashes, db_hashes, base_hashes, prefer, errors)
+
+        if not dry_run:
+            changed_in_db = [product_id for ids in plan.to_db.values() for product_id in ids]
+            if changed_in_db:
+                try:
+                    _apply_to_db(plan, csv_rows, settings['INVENTORY_SYNC_BATCH_SIZE'])
+                except Exception:
+                    db.session.rollback()
+                    raise
+                _refresh_derived_state(changed_in_db)
+            store.apply_changes([_to_csv_row(product_id, canonical(db_rows[product_id]))
+                                 for product_id in plan.to_csv['upsert']], plan.to_csv['delete'])
+
+            # Rows left in conflict or in error keep their old baseline, so they come up again.
+            # A side that was just written has no fingerprint yet; its rows are parsed next time.
+            # Products gone from both sides are forgotten, so a re-created one counts as new.
+            new_baseline = {product_id: entry for product_id, entry in known.items()
+                            if product_id in csv_rows or product_id in db_rows}
+            for product_id, (settled_hash, source) in plan.settled.items():
+                if settled_hash is None:
+                    new_baseline.pop(product_id, None)
+                else:
+                    new_baseline[product_id] = [settled_hash,
+                                                csv_fingerprints.get(product_id) if source != 'db' else None,
+                                                db_fingerprints.get(product_id) if source != 'csv' else None]
+            if new_baseline != baseline:
+                _save_baseline(state_path, new_baseline)
+
+    report = plan.report()
+    report.update(dry_run=dry_run, prefer=prefer, first_sync=baseline is None,
+                  csv_rows=len(csv_rows), db_rows=len(db_rows),
+                  seconds=round(time.perf_counter() - started, 3))
+    logger.info(f"Inventory sync{' (dry run)' if dry_run else ''}: to_db {report['to_db']}, "
+                f"to_csv {report['to_csv']}, {len(plan.conflicts)} conflicts, {len(plan.errors)} errors")
+    return report
@@ -0,0 +1,129 @@
+from app.services.inventory_sync import plan_sync, _apply_to_db
+from app.extensions import db
+from app.models.inventory import Product, ProductDeletion
+from flask import Flask
+import json
+
+# Hashes of the last sync, when both sides held the same three products
+BASELINE = {'P0001': 'h1', 'P0002': 'h2', 'P0003': 'h3'}
+
+def create_test_app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    return app
+
+def create_test_row(current_stock=10):
+    return {
+        'name': 'Test Product',
+        'category': 'Test',
+        'supplier': 'Supplier A',
+        'current_stock': str(current_stock),
+        'reorder_level': '5',
+        'purchase_price': '1.50',
+        'selling_price': '2.50',
+        'lead_time': '3',
+        'historical_sales': json.dumps({'Day-1': 4, 'Day-2': 6})
+    }
+
+def test_first_sync_never_deletes():
+    # No baseline: rows on one side only are copied across, differing rows are conflicts
+    plan = plan_sync({'P0001': 'h1', 'P0002': 'csv'}, {'P0002': 'db', 'P0003': 'h3'}, {}, 'db')
+    assert plan.to_db == {'insert': ['P0001'], 'update': [], 'delete': []}
+    assert plan.to_csv == {'upsert': ['P0002', 'P0003'], 'delete': []}
+    assert [conflict['product_id'] for conflict in plan.conflicts] == ['P0002']
+    print(f"First sync: {plan.report()}")
+    return plan
+
+def test_one_sided_edit():
+    csv_edit = plan_sync(dict(BASELINE, P0001='csv'), BASELINE, BASELINE, 'skip')
+    assert csv_edit.to_db['update'] == ['P0001']
+    assert csv_edit.to_csv == {'upsert': [], 'delete': []}
+    assert csv_edit.unchanged == 2
+
+    db_edit = plan_sync(BASELINE, dict(BASELINE, P0002='db'), BASELINE, 'skip')
+    assert db_edit.to_csv['upsert'] == ['P0002']
+    assert db_edit.to_db == {'insert': [], 'update': [], 'delete': []}
+    assert not csv_edit.conflicts and not db_edit.conflicts
+    print(f"One-sided edits: {csv_edit.report()['to_db']}, {db_edit.report()['to_csv']}")
+    return csv_edit, db_edit
+
+def test_one_sided_delete():
+    csv_rows = {product_id: row_hash for product_id, row_hash in BASELINE.items() if product_id != 'P0001'}
+    plan = plan_sync(csv_rows, BASELINE, BASELINE, 'skip')
+    assert plan.to_db['delete'] == ['P0001']
+    assert plan.settled['P0001'] == (None, 'csv')
+
+    # Edited on the side that still has it: copied back rather than deleted
+    plan = plan_sync(csv_rows, dict(BASELINE, P0001='db'), BASELINE, 'skip')
+    assert plan.to_db['delete'] == []
+    assert plan.to_csv['upsert'] == ['P0001']
+    print(f"One-sided delete: {plan.report()}")
+    return plan
+
+def test_conflict_resolutions():
+    csv_hashes = dict(BASELINE, P0003='csv')
+    db_hashes = dict(BASELINE, P0003='db')
+
+    plans = {prefer: plan_sync(csv_hashes, db_hashes, BASELINE, prefer) for prefer in ('db', 'csv', 'skip')}
+    for prefer, plan in plans.items():
+        assert plan.conflicts == [{'product_id': 'P0003', 'kind': 'both_changed', 'resolution': prefer}]
+    assert plans['db'].to_csv['upsert'] == ['P0003'] and plans['db'].to_db['update'] == []
+    assert plans['csv'].to_db['update'] == ['P0003'] and plans['csv'].to_csv['upsert'] == []
+    assert plans['skip'].to_db['update'] == [] and plans['skip'].to_csv['upsert'] == []
+    assert 'P0003' not in plans['skip'].settled
+    print(f"Conflict resolutions: { {prefer: plan.report()['to_db'] for prefer, plan in plans.items()} }")
+    return plans
+
+def test_unparseable_row_left_alone():
+    errors = {'P0002': ('csv', 'Invalid CSV row: bad stock')}
+    # Missing from the database and edited in the CSV, yet neither copied nor deleted
+    db_hashes = {product_id: row_hash for product_id, row_hash in BASELINE.items() if product_id != 'P0002'}
+    plan = plan_sync({'P0001': 'h1', 'P0003': 'h3'}, db_hashes, BASELINE, 'csv', errors)
+    assert plan.errors == [{'product_id': 'P0002', 'side': 'csv', 'message': 'Invalid CSV row: bad stock'}]
+    assert plan.to_db == {'insert': [], 'update': [], 'delete': []}
+    assert plan.to_csv == {'upsert': [], 'delete': []}
+    assert 'P0002' not in plan.settled
+    print(f"Unparseable row: {plan.report()}")
+    return plan
+
+def test_bulk_writes_bump_inventory_version():
+    app = create_test_app()
+    with app.app_context():
+        db.create_all()
+        db.session.add(Product(id='P0001', **dict(create_test_row(1), name='Old Name')))
+        db.session.add(Product(id='P0002', **create_test_row(1)))
+        db.session.commit()
+        before = Product.inventory_version()
+
+        # An update alone goes out as bulk_update_mappings, which skips the flush hook
+        plan = plan_sync({'P0001': 'csv', 'P0002': 'h2'}, {'P0001': 'h1', 'P0002': 'h2'},
+                         {'P0001': 'h1', 'P0002': 'h2'}, 'skip')
+        assert plan.to_db == {'insert': [], 'update': ['P0001'], 'delete': []}
+        _apply_to_db(plan, {'P0001': create_test_row(42)}, batch_size=1)
+        updated = Product.inventory_version()
+        assert int(updated.split(':')[0]) > int(before.split(':')[0])
+        assert db.session.get(Product, 'P0001').current_stock == 42
+
+        plan = plan_sync({'P0001': 'csv', 'P0003': 'h3'}, {'P0001': 'csv', 'P0002': 'h2'},
+                         {'P0001': 'csv', 'P0002': 'h2'}, 'skip')
+        assert plan.to_db == {'insert': ['P0003'], 'update': [], 'delete': ['P0002']}
+        _apply_to_db(plan, {'P0003': create_test_row()}, batch_size=1)
+
+        after = Product.inventory_version()
+        assert int(after.split(':')[0]) > int(updated.split(':')[0])
+        assert db.session.get(Product, 'P0002') is None
+        assert db.session.get(Product, 'P0003').name == 'Test Product'
+        assert [deletion.product_id for deletion in ProductDeletion.query.all()] == ['P0002']
+        print(f"Inventory version {before} -> {after}")
+        return after
+
+if __name__ == "__main__":
+    print("Testing inventory sync...")
+    test_first_sync_never_deletes()
+    test_one_sided_edit()
+    test_one_sided_delete()
+    test_conflict_resolutions()
+    test_unparseable_row_left_alone()
+    test_bulk_writes_bump_inventory_version()
+    print("\nTest completed.")
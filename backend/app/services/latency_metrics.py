@@ -0,0 +1,45 @@
+import threading
+from collections import deque
+
+# Recent latencies kept per route unless the caller asks otherwise
+DEFAULT_WINDOW = 1000
+
+class RouteMetrics:
+    """Request counts and latency percentiles per assistant route."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def record(self, route, seconds, window=DEFAULT_WINDOW):
+        with self._lock:
+            stats = self._routes.get(route)
+            if stats is None:
+                stats = self._routes[route] = {'count': 0, 'total': 0.0, 'recent': deque(maxlen=window)}
+            stats['count'] += 1
+            stats['total'] += seconds
+            stats['recent'].append(seconds)
+
+    def snapshot(self):
+        """Per-route count, mean and recent p50/p95/max latency in milliseconds."""
+        with self._lock:
+            routes = {route: (stats['count'], stats['total'], sorted(stats['recent']))
+                      for route, stats in self._routes.items()}
+
+        def percentile(values, fraction):
+            return values[min(len(values) - 1, int(fraction * len(values)))] * 1000
+
+        return {
+            route: {
+                'count': count,
+                'mean_ms': round(total / count * 1000, 2),
+                'p50_ms': round(percentile(recent, 0.5), 2),
+                'p95_ms': round(percentile(recent, 0.95), 2),
+                'max_ms': round(recent[-1] * 1000, 2)
+            }
+            for route, (count, total, recent) in routes.items()
+        }
+
+    def reset(self):
+        with self._lock:
+            self._routes = {}
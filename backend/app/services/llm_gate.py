@@ -0,0 +1,168 @@
+import math
+import time
+import threading
+from collections import deque
+from app.services.settings import app_settings
+
+# Back-pressure settings read from the app config; defaults live in config.Config
+SETTINGS = (
+    'LLM_MAX_CONCURRENCY',
+    'LLM_MAX_QUEUE',
+    'LLM_QUEUE_TIMEOUT'
+)
+
+# Recent queue waits kept for percentiles
+WAIT_SAMPLES = 1000
+
+class LLMOverloaded(Exception):
+    """The LLM queue is full; retry after ``retry_after`` seconds."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"The assistant is busy. Please retry in {retry_after} seconds.")
+        self.retry_after = retry_after
+
+class _Flight:
+    __slots__ = ('done', 'result', 'error', 'followers')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+class LLMGate:
+    """
+    Back-pressure in front of Ollama generations.
+
+    Identical requests in flight at the same time share one generation
+    (single-flight). Distinct generations take one of a bounded number of
+    slots; a bounded queue waits for a slot, and anything beyond it is
+    rejected at once with LLMOverloaded instead of piling up timeouts.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._flights = {}
+        self._active = 0
+        self._waiting = 0
+        self._waits = deque(maxlen=WAIT_SAMPLES)
+        self._avg_generation = None
+        self.completed = 0
+        self.coalesced = 0
+        self.rejected = 0
+
+    def _retry_after(self, max_concurrency):
+        # Time for the work ahead of a new request to drain, at the observed generation speed
+        per_generation = self._avg_generation or 1.0
+        return max(1, math.ceil(per_generation * (self._waiting + 1) / max(max_concurrency, 1)))
+
+    def _acquire(self, settings):
+        max_concurrency = settings['LLM_MAX_CONCURRENCY']
+        with self._cond:
+            if self._active >= max_concurrency and self._waiting >= settings['LLM_MAX_QUEUE']:
+                self.rejected += 1
+                raise LLMOverloaded(self._retry_after(max_concurrency))
+
+            started = time.monotonic()
+            deadline = started + settings['LLM_QUEUE_TIMEOUT']
+            self._waiting += 1
+            try:
+                while self._active >= max_concurrency:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.rejected += 1
+                        raise LLMOverloaded(self._retry_after(max_concurrency))
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+            self._active += 1
+            self._waits.append(time.monotonic() - started)
+
+    def _release(self, seconds):
+        with self._cond:
+            self._active -= 1
+            self.completed += 1
+            self._avg_generation = seconds if self._avg_generation is None else \
+                0.8 * self._avg_generation + 0.2 * seconds
+            self._cond.notify()
+
+    def slot(self):
+        """Context manager holding one generation slot, e.g. for a streamed answer."""
+        return _Slot(self, app_settings(*SETTINGS))
+
+    def run(self, key, generate):
+        """
+        Run ``generate()`` in a slot, sharing the result with identical calls.
+
+        Calls with the same ``key`` that arrive while one is running wait
+        for it and get its result (or its error) instead of generating again.
+        """
+        with self._cond:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                flight.followers += 1
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            with self.slot():
+                flight.result = generate()
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._cond:
+                del self._flights[key]
+            flight.done.set()
+
+    def stats(self):
+        """Queue depth, slot usage and queue wait times."""
+        settings = app_settings(*SETTINGS)
+        with self._cond:
+            waits = sorted(self._waits)
+            stats = {
+                'active': self._active,
+                'queue_depth': self._waiting,
+                'max_concurrency': settings['LLM_MAX_CONCURRENCY'],
+                'max_queue': settings['LLM_MAX_QUEUE'],
+                'in_flight_prompts': len(self._flights),
+                'completed': self.completed,
+                'coalesced': self.coalesced,
+                'rejected': self.rejected,
+                'avg_generation_ms': round(self._avg_generation * 1000, 2) if self._avg_generation else None
+            }
+        if waits:
+            stats['wait_ms'] = {
+                'mean': round(sum(waits) / len(waits) * 1000, 2),
+                'p50': round(waits[len(waits) // 2] * 1000, 2),
+                'p95': round(waits[min(len(waits) - 1, int(0.95 * len(waits)))] * 1000, 2),
+                'max': round(waits[-1] * 1000, 2)
+            }
+        return stats
+
+class _Slot:
+    def __init__(self, gate, settings):
+        self._gate = gate
+        self._settings = settings
+        self._started = None
+
+    def __enter__(self):
+        self._gate._acquire(self._settings)
+        self._started = time.monotonic()
+        return self
+
+    def __exit__(self, *exc):
+        self._gate._release(time.monotonic() - self._started)
+        return False
+
+# Process-wide gate shared by every Ollama generation
+llm_gate = LLMGate()
@@ -1,39 +1,27 @@
 import json
+import time
 from flask import current_app
 from app.models.inventory import Product, Transaction
 from app.models.export_data import ExportData
 import pandas as pd
-from .ollama_service import get_ollama_insights
+from .ollama_service import get_ollama_insights, get_products_details
+from .trend_store import trend_store
+from .inventory_snapshot import get_inventory_frame
+from .intent_router import intent_router, LLM_ROUTE
+from .llm_gate import LLMOverloaded
+from .product_index import product_index
+
+# Route taken by questions about products they name
+PRODUCT_ROUTE = 'product'
 
 def prepare_inventory_summary():
     """Prepare a summary of inventory data for the LLM context."""
-    products = Product.query.all()
-    
-    # Convert to dataframe for easier analysis
-    products_data = []
-    for p in products:
-        product_data = {
-            'id': p.id,
-            'name': p.name,
-            'category': p.category,
-            'supplier': p.supplier,
-            'current_stock': p.current_stock,
-            'reorder_level': p.reorder_level,
-            'purchase_price': p.purchase_price,
-            'selling_price': p.selling_price
-        }
-        
-        # Add historical sales data if available
-        if hasattr(p, 'historical_sales') and p.historical_sales:
-            product_data['historical_sales'] = p.historical_sales
-            
-        products_data.append(product_data)
-        
-    df = pd.DataFrame(products_data)
+    # Shared DataFrame snapshot, rebuilt only when the inventory changes
+    df = get_inventory_frame()
     
     # Create summary stats
     summary = {
-        'total_products': len(products),
+        'total_products': len(df),
         'categories': df['category'].value_counts().to_dict() if not df.empty else {},
         'low_stock_items': []
     }
@@ -47,29 +35,16 @@ def prepare_inventory_summary():
         # Add detailed low stock items
         summary['low_stock_items'] = low_stock_df[['id', 'name', 'category', 'current_stock', 'reorder_level']].to_dict('records')
         
-        # Add trending products based on historical sales if available
-        if 'historical_sales' in df.columns and not df['historical_sales'].isna().all():
-            # Process historical sales to identify trending products
-            trending_products = []
-            for _, row in df.iterrows():
-                if row.get('historical_sales'):
-                    # Calculate total sales from historical data
-                    try:
-                        sales_data = row['historical_sales']
-                        if isinstance(sales_data, dict):
-                            total_sales = sum(sales_data.values())
-                            trending_products.append({
-                                'id': row['id'],
-                                'name': row['name'],
-                                'category': row['category'],
-                                'total_sales': total_sales
-                            })
-                    except (TypeError, AttributeError):
-                        pass
-            
-            # Sort by total sales and get top trending products
-            trending_products.sort(key=lambda x: x.get('total_sales', 0), reverse=True)
-            summary['trending_products'] = trending_products[:5]  # Top 5 trending products
+        # Add trending products from the best-seller leaderboard
+        summary['trending_products'] = [
+            {
+                'id': item['id'],
+                'name': item['name'],
+                'category': item['category'],
+                'total_sales': item['total_sales']
+            }
+            for item in trend_store.top_sellers(5, metric='total')
+        ]
     
     return summary
 
@@ -81,7 +56,41 @@ def get_product_details(product_id):
         
     return product.to_dict()
 
+def route_query(query, product_id=None):
+    """
+    Pick a route for a question and resolve the products it names.
+    
+    Returns ``(route, product_ids)``: PRODUCT_ROUTE with the products found
+    in the product index, or the intent router's route and no products.
+    """
+    mentioned = [] if product_id else product_index.resolve(query)
+    if mentioned:
+        return PRODUCT_ROUTE, mentioned
+    route, _ = intent_router.route(query, product_id)
+    return route, []
+
 def get_llm_insights(query, product_id=None):
+    """
+    Answer a user query, locally when the intent router is confident it is
+    a data question, otherwise with the LLM. Questions naming products get
+    those products' details as the LLM context.
+    """
+    started = time.perf_counter()
+    route, product_ids = route_query(query, product_id)
+    try:
+        if route == PRODUCT_ROUTE:
+            return generate_product_insights(query, product_ids)
+        if route != LLM_ROUTE:
+            try:
+                return intent_router.answer(route, query)
+            except Exception as e:
+                current_app.logger.error(f"Error answering '{route}' intent locally: {str(e)}")
+                route = LLM_ROUTE
+        return generate_llm_insights(query, product_id)
+    finally:
+        intent_router.record(route, started)
+
+def generate_llm_insights(query, product_id=None):
     """Generate insights using LLM based on user query."""
     # Check if we should use Ollama or fallback to rule-based insights
     use_ollama = current_app.config.get('USE_OLLAMA', True)
@@ -91,6 +100,8 @@ def get_llm_insights(query, product_id=None):
         export_data = ExportData()
         result = export_data.get_inventory_insights(query)
         return result['insights']
+    except LLMOverloaded:
+        raise
     except Exception as e:
         current_app.logger.error(f"Error using export data insights: {str(e)}")
         
@@ -99,6 +110,8 @@ def get_llm_insights(query, product_id=None):
             try:
                 # Use Ollama for generating insights
                 return get_ollama_insights(query, product_id)
+            except LLMOverloaded:
+                raise
             except Exception as e:
                 current_app.logger.error(f"Error using Ollama: {str(e)}")
                 # Fallback to mock responses if Ollama fails
@@ -106,6 +119,75 @@ def get_llm_insights(query, product_id=None):
         else:
             return provide_fallback_response(query, product_id)
 
+def generate_product_insights(query, product_ids):
+    """Answer a question about the given products, with the LLM when possible."""
+    if current_app.config.get('USE_OLLAMA', True):
+        try:
+            return get_ollama_insights(query, product_ids=product_ids)
+        except LLMOverloaded:
+            raise
+        except Exception as e:
+            current_app.logger.error(f"Error using Ollama for product insights: {str(e)}")
+    return describe_products(product_ids)
+
+def describe_products(product_ids):
+    """Rule-based summary of the stock situation of the given products."""
+    lines = []
+    for product in get_products_details(product_ids):
+        if product['current_stock'] <= 0:
+            status = 'out of stock'
+        elif product['current_stock'] <= product['reorder_level']:
+            status = 'low stock, reorder soon'
+        else:
+            status = 'in stock'
+        lines.append(f"- {product['name']} ({product['id']}, {product['category']}): "
+                     f"{product['current_stock']} units, reorder level {product['reorder_level']}, "
+                     f"lead time {product['lead_time']} days - {status}")
+    if not lines:
+        return "I couldn't find those products in the inventory."
+    return "Here's what I found:\n\n" + '\n'.join(lines)
+
+def stream_llm_insights(query, product_id=None):
+    """
+    Yield insights for ``query`` piece by piece as they are generated.
+    
+    Uses the same routing as get_llm_insights: local and product answers
+    are yielded whole, LLM answers as they stream. If the LLM path fails before
+    anything was produced, the fallback response is yielded instead.
+    """
+    started = time.perf_counter()
+    route, product_ids = route_query(query, product_id)
+    try:
+        if route == PRODUCT_ROUTE:
+            yield generate_product_insights(query, product_ids)
+            return
+        if route != LLM_ROUTE:
+            try:
+                answer = intent_router.answer(route, query)
+            except Exception as e:
+                current_app.logger.error(f"Error answering '{route}' intent locally: {str(e)}")
+                route = LLM_ROUTE
+            else:
+                yield answer
+                return
+        
+        produced = False
+        try:
+            for piece in ExportData.stream_inventory_insights(query):
+                produced = True
+                yield piece
+            return
+        except LLMOverloaded:
+            raise
+        except Exception as e:
+            current_app.logger.error(f"Error streaming export data insights: {str(e)}")
+            if produced:
+                raise
+        
+        yield provide_fallback_response(query, product_id)
+    finally:
+        intent_router.record(route, started)
+
 def provide_fallback_response(query, product_id=None):
     """Provide fallback responses when all other methods fail"""
     # Prepare context for mock responses
@@ -1,6 +1,8 @@
 import json
+import threading
 import numpy as np
 import pandas as pd
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from sklearn.preprocessing import MinMaxScaler
 from keras.models import Sequential
@@ -153,6 +155,13 @@ def forecast_with_lstm(product, days=30):
         logger.error(f"Error in LSTM forecast for product {getattr(product, 'id', 'unknown')}: {str(e)}")
         return simple_forecast(product, days)
 
+def prepare_prophet_frame(df):
+    """Convert a prepared time series into Prophet's ds/y frame."""
+    return pd.DataFrame({
+        'ds': pd.to_datetime(df['day'].str.replace('Day-', ''), format='%d-%m-%Y', errors='coerce'),
+        'y': df['quantity']
+    }).dropna()
+
 def forecast_with_prophet(product, days=30):
     """Forecast demand using Facebook Prophet."""
     try:
@@ -162,10 +171,7 @@ def forecast_with_prophet(product, days=30):
             return simple_forecast(product, days)
         
         # Prepare data for Prophet
-        prophet_df = pd.DataFrame({
-            'ds': pd.to_datetime(df['day'].str.replace('Day-', ''), format='%d-%m-%Y', errors='coerce'),
-            'y': df['quantity']
-        }).dropna()
+        prophet_df = prepare_prophet_frame(df)
         
         if len(prophet_df) < 14:  # Minimum data points needed
             return simple_forecast(product, days)
@@ -194,6 +200,104 @@ def forecast_with_prophet(product, days=30):
         logger.error(f"Error in Prophet forecast for product {getattr(product, 'id', 'unknown')}: {str(e)}")
         return simple_forecast(product, days)
 
+# Iteration budget for warm-started MAP fits in prophet_fast mode
+PROPHET_FAST_MAX_ITER = 200
+
+# Number of distinct date ranges whose seasonality features are kept
+SEASONALITY_CACHE_SIZE = 64
+
+# Last fitted Prophet parameters per product id, used to warm-start refits
+_prophet_warm_starts = {}
+
+# Seasonality feature frames keyed by date range, shared across products
+_seasonality_features = OrderedDict()
+_seasonality_lock = threading.Lock()
+
+class FastProphet(Prophet):
+    """Prophet model that reuses seasonality features for identical date ranges.
+
+    The Fourier features only depend on the ``ds`` column and the seasonality
+    configuration, so every product covering the same days can share them.
+    """
+    
+    def make_all_seasonality_features(self, df):
+        ds = df['ds'].values
+        key = (self.seasonality_mode, len(ds), ds.tobytes())
+        
+        with _seasonality_lock:
+            cached = _seasonality_features.get(key)
+            if cached is not None:
+                _seasonality_features.move_to_end(key)
+        
+        if cached is None:
+            cached = super().make_all_seasonality_features(df)
+            with _seasonality_lock:
+                _seasonality_features[key] = cached
+                while len(_seasonality_features) > SEASONALITY_CACHE_SIZE:
+                    _seasonality_features.popitem(last=False)
+        
+        seasonal_features, prior_scales, component_cols, modes = cached
+        # Align the shared frame with the caller's index and hand out fresh containers
+        seasonal_features = seasonal_features.set_axis(df.index)
+        return seasonal_features, list(prior_scales), component_cols, {mode: list(names) for mode, names in modes.items()}
+
+def get_warm_start(model):
+    """Extract Stan initial values from a fitted Prophet model."""
+    return {
+        'k': model.params['k'][0][0],
+        'm': model.params['m'][0][0],
+        'sigma_obs': model.params['sigma_obs'][0][0],
+        'delta': model.params['delta'][0],
+        'beta': model.params['beta'][0]
+    }
+
+def forecast_with_prophet_fast(product, days=30):
+    """
+    Forecast demand with a warm-started Prophet fit.
+    
+    Uses the same model configuration as forecast_with_prophet, but initializes
+    the optimizer from the product's previously fitted k, m, delta and beta,
+    caps the MAP iteration budget and skips uncertainty sampling. Refits after
+    a few new days of sales converge in a handful of iterations.
+    """
+    try:
+        df = prepare_time_series(product)
+        if len(df) < 30:  # Need sufficient data for Prophet
+            logger.warning(f"Insufficient data for Prophet model for product {product.id}. Using simple forecast.")
+            return simple_forecast(product, days)
+        
+        prophet_df = prepare_prophet_frame(df)
+        
+        if len(prophet_df) < 14:  # Minimum data points needed
+            return simple_forecast(product, days)
+        
+        model = FastProphet(
+            yearly_seasonality=True,
+            weekly_seasonality=True,
+            daily_seasonality=False,
+            seasonality_mode='multiplicative',
+            uncertainty_samples=0
+        )
+        
+        fit_kwargs = {'iter': PROPHET_FAST_MAX_ITER}
+        warm_start = _prophet_warm_starts.get(product.id)
+        if warm_start is not None:
+            # Prophet validates the shapes and falls back to its default init on mismatch
+            fit_kwargs['init'] = warm_start
+        model.fit(prophet_df, **fit_kwargs)
+        
+        _prophet_warm_starts[product.id] = get_warm_start(model)
+        
+        future_dates = model.make_future_dataframe(periods=days)
+        forecast = model.predict(future_dates)
+        forecast_values = forecast['yhat'][-days:].values
+        
+        return [max(0, round(x)) for x in forecast_values]
+    
+    except Exception as e:
+        logger.error(f"Error in fast Prophet forecast for product {getattr(product, 'id', 'unknown')}: {str(e)}")
+        return simple_forecast(product, days)
+
 def forecast_demand(product, days=30, method='prophet'):
     """
     Forecast demand using the specified method.
@@ -201,7 +305,7 @@ def forecast_demand(product, days=30, method='prophet'):
     Args:
         product: Product object with historical sales data
         days: Number of days to forecast
-        method: 'prophet' (default), 'lstm', or 'simple'
+        method: 'prophet' (default), 'prophet_fast', 'lstm', or 'simple'
     
     Returns:
         List of forecasted demand values
@@ -209,6 +313,8 @@ def forecast_demand(product, days=30, method='prophet'):
     try:
         if method.lower() == 'prophet':
             return forecast_with_prophet(product, days)
+        elif method.lower() == 'prophet_fast':
+            return forecast_with_prophet_fast(product, days)
         elif method.lower() == 'lstm':
             return forecast_with_lstm(product, days)
         else:
@@ -252,121 +358,7 @@ def recommend_restock(product, is_trending=False):
     return order_quantity
 
 def get_trend_data():
-    """Get trend data for all products."""
-    from app.models.inventory import Product
-    
-    products = Product.query.all()
-    trend_data = []
+    """Get trend data for all products from the running trend aggregates."""
+    from app.services.trend_store import trend_store
     
-    # Track daily sales across all products
-    total_daily_sales = {}
-    category_sales = {}
-    
-    for product in products:
-        try:
-            # Parse historical sales
-            try:
-                historical_sales = json.loads(product.historical_sales) if product.historical_sales else {}
-            except json.JSONDecodeError:
-                historical_sales = {}
-            
-            if not isinstance(historical_sales, dict):
-                historical_sales = {}
-            
-            # Calculate metrics based on historical sales
-            if historical_sales:
-                # Get all sales quantities
-                sales_quantities = []
-                for day, quantity in historical_sales.items():
-                    try:
-                        qty = float(quantity)
-                        sales_quantities.append(qty)
-                        
-                        # Add to total daily sales
-                        if day not in total_daily_sales:
-                            total_daily_sales[day] = 0
-                        total_daily_sales[day] += qty
-                        
-                        # Add to category sales
-                        if product.category not in category_sales:
-                            category_sales[product.category] = {
-                                'name': product.category,
-                                'total_sales': 0,
-                                'avg_growth': 0,
-                                'product_count': 0
-                            }
-                        category_sales[product.category]['total_sales'] += qty
-                    except (ValueError, TypeError):
-                        continue
-                
-                # Calculate average daily sales
-                avg_daily_sales = sum(sales_quantities) / len(sales_quantities) if sales_quantities else 0
-                
-                # Calculate growth rate
-                if len(sales_quantities) >= 5:
-                    last_5_days = sum(sales_quantities[-5:]) / 5
-                    prev_5_days = sum(sales_quantities[-10:-5]) / 5 if len(sales_quantities) >= 10 else sum(sales_quantities[:5]) / 5
-                    growth_rate = ((last_5_days - prev_5_days) / prev_5_days * 100) if prev_5_days > 0 else 0
-                    
-                    # Add growth rate to category
-                    category_sales[product.category]['avg_growth'] += growth_rate
-                    category_sales[product.category]['product_count'] += 1
-                else:
-                    growth_rate = 0
-            else:
-                avg_daily_sales = 0
-                growth_rate = 0
-            
-            # Add product to trend data
-            trend_data.append({
-                'id': product.id,
-                'name': product.name,
-                'category': product.category,
-                'current_stock': product.current_stock,
-                'growth_rate': round(growth_rate, 2),
-                'avg_daily_sales': round(avg_daily_sales, 2),
-                'stock_status': 'Low' if product.current_stock < product.reorder_level else 'Good',
-                'has_sales_data': bool(historical_sales)
-            })
-            
-        except Exception as e:
-            print(f'Error calculating trends for product {product.id}: {str(e)}')
-            # Include product with default values on error
-            trend_data.append({
-                'id': product.id,
-                'name': product.name,
-                'category': product.category,
-                'current_stock': product.current_stock,
-                'growth_rate': 0,
-                'avg_daily_sales': 0,
-                'stock_status': 'Low' if product.current_stock < product.reorder_level else 'Good',
-                'has_sales_data': False
-            })
-    
-    # Calculate average growth rate for each category
-    for category in category_sales.values():
-        if category['product_count'] > 0:
-            category['avg_growth'] = round(category['avg_growth'] / category['product_count'], 2)
-    
-    # Convert total daily sales to sorted list
-    sales_trend = []
-    if total_daily_sales:
-        sorted_days = sorted(total_daily_sales.keys(), key=lambda x: int(x.split('-')[1]))
-        sales_trend = [
-            {'day': day, 'sales': total_daily_sales[day]}
-            for day in sorted_days
-        ]
-    
-    # Sort category trends by total sales
-    category_trends = list(category_sales.values())
-    category_trends.sort(key=lambda x: x['total_sales'], reverse=True)
-    
-    # Sort products by average daily sales for top selling products
-    trend_data.sort(key=lambda x: x['avg_daily_sales'], reverse=True)
-    top_selling = trend_data[:10]  # Get top 10
-    
-    return {
-        'topSellingProducts': top_selling,
-        'salesTrend': sales_trend,
-        'categoryTrends': category_trends
-    }
+    return trend_store.get_trend_data()
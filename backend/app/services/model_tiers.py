@@ -0,0 +1,90 @@
+import time
+import threading
+from flask import current_app
+from app.services.settings import app_setting, app_settings
+from app.services.latency_metrics import RouteMetrics
+
+def model_ladder():
+    """Configured models, smallest first; OLLAMA_MODEL alone when no tiers are set."""
+    tiers = app_setting('OLLAMA_MODEL_TIERS')
+    if isinstance(tiers, str):
+        tiers = [model.strip() for model in tiers.split(',')]
+    ladder = [model for model in tiers or () if model]
+    return ladder or [current_app.config.get('OLLAMA_MODEL', 'llama3')]
+
+def ladder_key(ladder):
+    """Identity of a ladder in cache keys; answers from another ladder are not reused."""
+    return '>'.join(ladder)
+
+def query_complexity(query, context_tokens=None, settings=None):
+    """
+    Count the signals that a question needs a larger model.
+
+    One point each for an open-ended question, as the intent router judges
+    it (why, recommend, forecast, ...), for a long question and for a large
+    prompt context.
+    """
+    from app.services.intent_router import is_open_ended
+
+    settings = settings or app_settings('LLM_SMALL_TIER_MAX_WORDS', 'LLM_SMALL_TIER_MAX_CONTEXT')
+    query_lower = (query or '').lower()
+    complexity = 0
+    if is_open_ended(query_lower):
+        complexity += 1
+    if len(query_lower.split()) > settings['LLM_SMALL_TIER_MAX_WORDS']:
+        complexity += 1
+    if context_tokens is not None and context_tokens > settings['LLM_SMALL_TIER_MAX_CONTEXT']:
+        complexity += 1
+    return complexity
+
+def choose_tier(query, ladder, context_tokens=None):
+    """Index of the first tier to try: one rung up the ladder per complexity signal."""
+    if len(ladder) == 1:
+        return 0
+    return min(query_complexity(query, context_tokens), len(ladder) - 1)
+
+def acceptable(answer):
+    """Whether a tier's answer is good enough to return instead of asking the next tier."""
+    text = (answer or '').strip()
+    return len(text) >= app_setting('LLM_MIN_ANSWER_CHARS')
+
+class TierMetrics:
+    """Usage, outcomes and latency per model tier."""
+
+    OUTCOMES = ('ok', 'rejected', 'error')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latency = RouteMetrics()
+        self._counts = {}
+
+    def record(self, model, started, outcome, first_choice):
+        """
+        Record a call to ``model`` that began at ``started`` (time.perf_counter()).
+
+        ``outcome`` is 'ok', 'rejected' (empty or too short) or 'error';
+        ``first_choice`` is False when the call escalated from a smaller tier.
+        """
+        self._latency.record(model, time.perf_counter() - started, app_setting('LLM_TIER_METRICS_WINDOW'))
+        with self._lock:
+            counts = self._counts.setdefault(model, dict({name: 0 for name in self.OUTCOMES}, escalated_to=0))
+            counts[outcome] += 1
+            if not first_choice:
+                counts['escalated_to'] += 1
+
+    def snapshot(self):
+        latency = self._latency.snapshot()
+        with self._lock:
+            return {model: dict(counts, **latency.get(model, {})) for model, counts in self._counts.items()}
+
+    def reset(self):
+        self._latency.reset()
+        with self._lock:
+            self._counts = {}
+
+# Process-wide tier metrics shared by every LLM insight path
+tier_metrics = TierMetrics()
+
+def tier_stats():
+    """The current ladder and each tier's metrics."""
+    return {'ladder': model_ladder(), 'tiers': tier_metrics.snapshot()}
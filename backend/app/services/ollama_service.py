@@ -1,87 +1,556 @@
+import os
+import time
+import hashlib
+import threading
 import requests
+from requests.adapters import HTTPAdapter
 import json
 from flask import current_app
+from config import Config
+from app.services.settings import app_settings
 from app.models.inventory import Product, Transaction
 import pandas as pd
+from app.services.trend_store import trend_store
+from app.services.inventory_snapshot import get_inventory_frame
+from app.services.response_cache import insight_cache, cache_key
+from app.services.context_builder import build_inventory_context, estimate_tokens, DEFAULT_CONTEXT_TOKENS
+from app.services.llm_gate import llm_gate, LLMOverloaded
+from app.services.circuit_breaker import get_breaker, CircuitOpen
+from app.services.model_tiers import model_ladder, ladder_key, choose_tier, acceptable, tier_metrics
+
+# Keep-warm settings read from the app config; defaults live in config.Config
+SETTINGS = (
+    'OLLAMA_WARMUP',
+    'OLLAMA_KEEP_WARM_INTERVAL',
+    'OLLAMA_KEEP_WARM_IDLE'
+)
+
+# System prompt of the assistant's LLM answers; kept static so Ollama can reuse its processed prefix
+ASSISTANT_SYSTEM_PROMPT = """You are an intelligent inventory management assistant for InventIQ system. 
+    Your role is to provide accurate, helpful insights about inventory data.
+    When asked about low stock items or trending products, always include specific product names and quantities.
+    For restock recommendations, include a 30% buffer for trending or fast-moving products.
+    Be concise but informative."""
+
+def keep_alive_value(value):
+    """
+    Ollama's ``keep_alive`` from a config value.
+    
+    Durations like '30m' are passed through; plain numbers are seconds
+    (-1 keeps the model loaded indefinitely). Empty means Ollama's default.
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    try:
+        return int(str(value).strip())
+    except ValueError:
+        return str(value).strip()
+
+_session_lock = threading.Lock()
+_session = {'pid': None, 'session': None}
+
+def get_session(pool_size=Config.OLLAMA_POOL_SIZE):
+    """
+    Keep-alive HTTP session shared by every Ollama call in this process.
+    
+    A forked worker gets its own session rather than sharing the parent's
+    sockets.
+    """
+    with _session_lock:
+        if _session['pid'] != os.getpid():
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _session['pid'] = os.getpid()
+            _session['session'] = session
+        return _session['session']
+
+class OllamaProbe:
+    """
+    Cached availability and model list for each Ollama server.
+    
+    The first check of a server blocks; after that the last result is
+    served and, once older than the TTL, refreshed on a background thread
+    so requests never wait on a probe.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = {}
+    
+    def _fetch(self, base_url, timeout, pool_size):
+        # /api/tags answers both "is it up" and "which models are pulled"
+        try:
+            response = get_session(pool_size).get(f"{base_url}/api/tags", timeout=timeout)
+            if response.status_code != 200:
+                return False, frozenset()
+            return True, frozenset(model.get('name', '') for model in response.json().get('models', []))
+        except (requests.exceptions.RequestException, ValueError):
+            return False, frozenset()
+    
+    def _refresh(self, base_url, timeout, pool_size):
+        available, models = self._fetch(base_url, timeout, pool_size)
+        state = {'available': available, 'models': models, 'checked_at': time.monotonic(), 'refreshing': False}
+        with self._lock:
+            self._state[base_url] = state
+        return dict(state)
+    
+    def status(self, base_url, ttl, timeout, pool_size=Config.OLLAMA_POOL_SIZE, fresh=False):
+        """
+        Return the server's state as a dict with 'available' and 'models'.
+        
+        With ``fresh`` the server is checked now, ignoring the cached result.
+        """
+        if fresh:
+            return self._refresh(base_url, timeout, pool_size)
+        with self._lock:
+            state = self._state.get(base_url)
+            if state is not None:
+                if state['refreshing'] or time.monotonic() - state['checked_at'] < ttl:
+                    return dict(state)
+                state['refreshing'] = True
+        
+        if state is None:
+            return self._refresh(base_url, timeout, pool_size)
+        threading.Thread(target=self._refresh, args=(base_url, timeout, pool_size), daemon=True).start()
+        return dict(state)
+    
+    def mark_unavailable(self, base_url):
+        """Record a failed call so later requests fall back without waiting on a timeout"""
+        with self._lock:
+            state = self._state.get(base_url)
+            if state is not None and not state['refreshing']:
+                state['available'] = False
+                state['checked_at'] = time.monotonic()
+    
+    def reset(self):
+        with self._lock:
+            self._state = {}
+
+# Process-wide probe cache shared by every OllamaService
+ollama_probe = OllamaProbe()
 
 class OllamaService:
-    def __init__(self, base_url="http://localhost:11434", model="llama3"):
-        """Initialize the Ollama service with base URL and model."""
+    def __init__(self, base_url="http://localhost:11434", model="llama3", connect_timeout=None,
+                 read_timeout=None, probe_timeout=None, probe_ttl=None, pool_size=None, keep_alive=None):
+        """Initialize the Ollama service with base URL, model, HTTP client and residency settings."""
         self.base_url = base_url
         self.model = model
         self.api_endpoint = f"{self.base_url}/api/generate"
+        self.connect_timeout = connect_timeout if connect_timeout is not None else Config.OLLAMA_CONNECT_TIMEOUT
+        self.read_timeout = read_timeout if read_timeout is not None else Config.OLLAMA_READ_TIMEOUT
+        self.probe_timeout = probe_timeout if probe_timeout is not None else Config.OLLAMA_PROBE_TIMEOUT
+        self.probe_ttl = probe_ttl if probe_ttl is not None else Config.OLLAMA_PROBE_TTL
+        self.pool_size = pool_size if pool_size is not None else Config.OLLAMA_POOL_SIZE
+        self.keep_alive = keep_alive_value(keep_alive)
+        self.breaker = get_breaker(self.base_url)
     
-    def generate(self, prompt, system_prompt=None, temperature=0.7, max_tokens=500):
-        """Generate a response using Ollama."""
+    @classmethod
+    def from_config(cls, model=None):
+        """Build a service from the current app's OLLAMA_* settings."""
+        config = current_app.config
+        return cls(
+            base_url=config.get('OLLAMA_BASE_URL', 'http://localhost:11434'),
+            model=model or config.get('OLLAMA_MODEL', 'llama3'),
+            connect_timeout=config.get('OLLAMA_CONNECT_TIMEOUT'),
+            read_timeout=config.get('OLLAMA_READ_TIMEOUT'),
+            probe_timeout=config.get('OLLAMA_PROBE_TIMEOUT'),
+            probe_ttl=config.get('OLLAMA_PROBE_TTL'),
+            pool_size=config.get('OLLAMA_POOL_SIZE'),
+            keep_alive=config.get('OLLAMA_KEEP_ALIVE', Config.OLLAMA_KEEP_ALIVE)
+        )
+    
+    @property
+    def session(self):
+        return get_session(self.pool_size)
+    
+    def probe(self, fresh=False):
+        """Cached availability and model list of this service's server."""
+        return ollama_probe.status(self.base_url, self.probe_ttl,
+                                   (self.connect_timeout, self.probe_timeout), self.pool_size, fresh)
+    
+    def is_available(self):
+        """
+        Whether the server should be called now.
+        
+        Answers False at once while the circuit breaker is open. Otherwise
+        uses the cached probe, except when the breaker's trial is due: then
+        the server is checked itself, and the trial call is left to the
+        generation if it answers.
+        """
+        if self.breaker.is_open():
+            return False
+        
+        available = self.probe(fresh=self.breaker.trial_due())['available']
+        if not available:
+            self.breaker.record_failure()
+        return available
+    
+    def _payload(self, prompt, system_prompt, temperature, max_tokens, stream):
         payload = {
             "model": self.model,
             "prompt": prompt,
             "temperature": temperature,
             "max_tokens": max_tokens,
+            "stream": stream,
         }
         
         if system_prompt:
             payload["system"] = system_prompt
-            
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        return payload
+    
+    def load_model(self, system_prompt=None):
+        """
+        Load the model and keep it resident for ``keep_alive``.
+        
+        With no system prompt Ollama only loads the model. With one, a single
+        token is generated so the runner also holds the processed system
+        prompt, which later requests starting with the same prompt reuse.
+        Returns True when the server answered.
+        """
+        payload = {"model": self.model, "prompt": "", "stream": False}
+        if system_prompt:
+            payload["system"] = system_prompt
+            payload["options"] = {"num_predict": 1}
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
         try:
-            # Try to connect to Ollama server first
-            health_check = requests.get(f"{self.base_url}/api/health", timeout=5)
-            if health_check.status_code != 200:
-                raise Exception("Ollama server is not running. Please start Ollama first.")
-                
-            # Check if model exists
-            models = requests.get(f"{self.base_url}/api/tags", timeout=5).json()
-            if not any(self.model in model.get('name', '') for model in models.get('models', [])):
-                raise Exception(f"Model {self.model} is not downloaded. Please run: ollama pull {self.model}")
-            
-            # Generate response with timeout
-            response = requests.post(self.api_endpoint, json=payload, timeout=30)
+            response = self.session.post(self.api_endpoint, json=payload,
+                                         timeout=(self.connect_timeout, self.read_timeout))
             response.raise_for_status()
-            return response.json()["response"]
+            return True
+        except requests.exceptions.RequestException as e:
+            current_app.logger.warning(f"Could not load Ollama model {self.model}: {str(e)}")
+            return False
+    
+    def _check_ready(self, fresh=False):
+        # Check the cached probe instead of hitting the server first
+        status = self.probe(fresh)
+        if not status['available']:
+            raise Exception("Ollama server is not running. Please start Ollama first.")
             
-        except requests.exceptions.Timeout:
+        # Check if model exists
+        if not any(self.model in name for name in status['models']):
+            raise Exception(f"Model {self.model} is not downloaded. Please run: ollama pull {self.model}")
+    
+    def _raise_request_error(self, error):
+        """Log a failed Ollama call and re-raise it with a user-facing message."""
+        if isinstance(error, requests.exceptions.Timeout):
             error_msg = "Request to Ollama timed out. Please check if the server is responding."
             current_app.logger.error(error_msg)
             raise Exception(error_msg)
-            
-        except requests.exceptions.ConnectionError:
+        
+        if isinstance(error, requests.exceptions.ConnectionError):
+            ollama_probe.mark_unavailable(self.base_url)
             error_msg = "Could not connect to Ollama. Please make sure Ollama is running."
             current_app.logger.error(error_msg)
             raise Exception(error_msg)
+        
+        current_app.logger.error(f"Error calling Ollama API: {str(error)}")
+        raise Exception(f"Error generating insights: {str(error)}")
+    
+    def generate(self, prompt, system_prompt=None, temperature=0.7, max_tokens=500):
+        """Generate a response using Ollama."""
+        payload = self._payload(prompt, system_prompt, temperature, max_tokens, stream=False)
+        model_residency.touch()
+            
+        trial = False
+        try:
+            # Refuse at once while the breaker is open
+            trial = self.breaker.before_call()
+            try:
+                self._check_ready(fresh=trial)
+            except Exception:
+                self.breaker.record_failure()
+                raise
             
+            def post():
+                # Generate response over the pooled keep-alive connection; only the
+                # caller that runs the generation reports it to the breaker
+                try:
+                    response = self.session.post(self.api_endpoint, json=payload,
+                                                 timeout=(self.connect_timeout, self.read_timeout))
+                    response.raise_for_status()
+                    result = response.json()["response"]
+                except Exception:
+                    self.breaker.record_failure()
+                    raise
+                self.breaker.record_success()
+                return result
+            
+            # Identical prompts in flight share one generation; others queue for a slot
+            key = hashlib.sha256(f"{self.base_url}\n{json.dumps(payload, sort_keys=True)}".encode('utf-8')).hexdigest()
+            return llm_gate.run(key, post)
+            
+        except LLMOverloaded:
+            # The call never reached Ollama, so a trial it held proves nothing
+            if trial:
+                self.breaker.release_trial()
+            raise
+        except CircuitOpen:
+            raise
         except Exception as e:
-            current_app.logger.error(f"Error calling Ollama API: {str(e)}")
-            raise Exception(f"Error generating insights: {str(e)}")
-
-def prepare_inventory_summary():
-    """Prepare a summary of inventory data for the LLM context."""
-    products = Product.query.all()
-    
-    # Convert to dataframe for easier analysis
-    products_data = []
-    for p in products:
-        product_data = {
-            'id': p.id,
-            'name': p.name,
-            'category': p.category,
-            'supplier': p.supplier,
-            'current_stock': p.current_stock,
-            'reorder_level': p.reorder_level,
-            'purchase_price': p.purchase_price,
-            'selling_price': p.selling_price
-        }
+            self._raise_request_error(e)
+    
+    def generate_stream(self, prompt, system_prompt=None, temperature=0.7, max_tokens=500):
+        """
+        Generate a response using Ollama, yielding text as it is produced.
+        
+        Ollama streams one JSON object per line; the read timeout applies to
+        the gap between lines rather than to the whole answer.
+        """
+        payload = self._payload(prompt, system_prompt, temperature, max_tokens, stream=True)
+        model_residency.touch()
         
-        # Add historical sales data if available
-        if hasattr(p, 'historical_sales') and p.historical_sales:
-            product_data['historical_sales'] = p.historical_sales
+        trial = False
+        try:
+            # Refuse at once while the breaker is open
+            trial = self.breaker.before_call()
+            self._check_ready(fresh=trial)
             
-        products_data.append(product_data)
+            # The slot is held until the stream ends or the consumer goes away
+            with llm_gate.slot(), self.session.post(self.api_endpoint, json=payload, stream=True,
+                                                    timeout=(self.connect_timeout, self.read_timeout)) as response:
+                response.raise_for_status()
+                self.breaker.record_success()
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get('error'):
+                        raise Exception(chunk['error'])
+                    if chunk.get('response'):
+                        yield chunk['response']
+                    if chunk.get('done'):
+                        break
+                    
+        except LLMOverloaded:
+            # The call never reached Ollama, so a trial it held proves nothing
+            if trial:
+                self.breaker.release_trial()
+            raise
+        except CircuitOpen:
+            raise
+        except Exception as e:
+            self.breaker.record_failure()
+            self._raise_request_error(e)
+
+class ModelResidency:
+    """
+    Keeps the Ollama models loaded while the assistant is in use.
+    
+    At app start a background thread loads every model tier and primes it
+    with the assistant's static system prompts. While LLM calls keep
+    arriving it pings the models whenever they have gone unused for the
+    keep-warm interval, so a pause in traffic does not let Ollama unload
+    them; once the assistant has been idle for longer, they are left to
+    expire.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        # Set once the start-up warm-up has been attempted
+        self.ready = threading.Event()
+        self._last_used = None
+        self._last_activity = None
+        self.warmed = False
+        self.warmups = 0
+        self.pings = 0
+        self.failures = 0
+    
+    def touch(self):
+        """Note an LLM call; it also refreshes Ollama's keep_alive."""
+        now = time.monotonic()
+        with self._lock:
+            self._last_used = now
+            self._last_activity = now
+    
+    def start(self, app):
+        """Start the warm-up and keep-warm thread for ``app``, once per process."""
+        with app.app_context():
+            settings = app_settings(*SETTINGS)
+            enabled = current_app.config.get('USE_OLLAMA', True)
+        if not enabled or not (settings['OLLAMA_WARMUP'] or settings['OLLAMA_KEEP_WARM_INTERVAL'] > 0):
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, args=(app, settings), daemon=True,
+                                            name='ollama-keep-warm')
+            self._thread.start()
+    
+    def stop(self):
+        self._stop.set()
+    
+    def warm_up(self):
+        """Load the model and prime it with the static system prompts."""
+        from app.models.export_data import INSIGHTS_SYSTEM_PROMPT
+        
+        if not OllamaService.from_config().probe(fresh=True)['available']:
+            current_app.logger.info("Ollama is not reachable; skipping model warm-up")
+            return False
         
-    df = pd.DataFrame(products_data)
+        started = time.perf_counter()
+        ladder = model_ladder()
+        results = [OllamaService.from_config(model=model).load_model(system_prompt)
+                   for model in ladder
+                   for system_prompt in (ASSISTANT_SYSTEM_PROMPT, INSIGHTS_SYSTEM_PROMPT)]
+        ok = all(results)
+        with self._lock:
+            self.warmups += 1
+            if ok:
+                self.warmed = True
+                self._last_used = time.monotonic()
+            else:
+                self.failures += 1
+        current_app.logger.info(f"Ollama warm-up of {', '.join(ladder)} {'finished' if ok else 'failed'} "
+                                f"in {time.perf_counter() - started:.1f}s")
+        return ok
+    
+    def ping(self, settings):
+        """Keep the model loaded if calls were recent but it has not been used for a while."""
+        now = time.monotonic()
+        with self._lock:
+            last_activity, last_used = self._last_activity, self._last_used
+        if last_activity is None or now - last_activity > settings['OLLAMA_KEEP_WARM_IDLE']:
+            return False
+        if last_used is not None and now - last_used < settings['OLLAMA_KEEP_WARM_INTERVAL']:
+            return False
+        
+        if OllamaService.from_config().breaker.is_open():
+            return False
+        ok = all([OllamaService.from_config(model=model).load_model() for model in model_ladder()])
+        with self._lock:
+            if ok:
+                self.pings += 1
+                self._last_used = time.monotonic()
+            else:
+                self.failures += 1
+        return ok
+    
+    def _run(self, app, settings):
+        if settings['OLLAMA_WARMUP']:
+            with app.app_context():
+                try:
+                    self.warm_up()
+                except Exception as e:
+                    current_app.logger.error(f"Ollama model warm-up failed: {str(e)}")
+        self.ready.set()
+        
+        interval = settings['OLLAMA_KEEP_WARM_INTERVAL']
+        if interval <= 0:
+            return
+        # Check several times per interval so a ping is never much later than due
+        while not self._stop.wait(max(interval / 4, 1.0)):
+            with app.app_context():
+                try:
+                    self.ping(app_settings(*SETTINGS))
+                except Exception as e:
+                    current_app.logger.error(f"Ollama keep-warm ping failed: {str(e)}")
+    
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            return {
+                'warmed': self.warmed,
+                'warmups': self.warmups,
+                'pings': self.pings,
+                'failures': self.failures,
+                'running': self._thread is not None and self._thread.is_alive(),
+                'idle_s': round(now - self._last_activity, 1) if self._last_activity is not None else None
+            }
+
+# Process-wide model residency manager, started by the app factory
+model_residency = ModelResidency()
+
+def generate_tiered(query, prompt, system_prompt=None, context_tokens=None, temperature=0.7, max_tokens=500):
+    """
+    Generate with the smallest model tier suited to the question.
+    
+    The starting tier is picked from the question's complexity and the
+    prompt's context size. An error, or an empty or too short answer, moves
+    the question up to the next tier. If every tier fails, the last error is
+    raised; if they only answered too briefly, the longest answer is returned.
+    """
+    ladder = model_ladder()
+    if context_tokens is None:
+        context_tokens = estimate_tokens(prompt)
+    first = choose_tier(query, ladder, context_tokens)
+    best, last_error = '', None
+    for model in ladder[first:]:
+        service = OllamaService.from_config(model=model)
+        started = time.perf_counter()
+        try:
+            answer = service.generate(prompt, system_prompt, temperature, max_tokens)
+        except (LLMOverloaded, CircuitOpen):
+            # Every tier shares the server's queue and breaker
+            raise
+        except Exception as e:
+            tier_metrics.record(model, started, 'error', model == ladder[first])
+            last_error = e
+            continue
+        ok = acceptable(answer)
+        tier_metrics.record(model, started, 'ok' if ok else 'rejected', model == ladder[first])
+        if ok:
+            return answer
+        if len((answer or '').strip()) > len(best.strip()):
+            best = answer
+    
+    if best.strip():
+        return best
+    raise last_error or Exception("Every model tier returned an empty response")
+
+def stream_tiered(query, prompt, system_prompt=None, context_tokens=None, temperature=0.7, max_tokens=500):
+    """
+    Stream from the smallest model tier suited to the question.
+    
+    A tier that fails or ends without any output hands over to the next;
+    once a tier has produced output, its errors are raised to the caller.
+    """
+    ladder = model_ladder()
+    if context_tokens is None:
+        context_tokens = estimate_tokens(prompt)
+    first = choose_tier(query, ladder, context_tokens)
+    last_error = None
+    for model in ladder[first:]:
+        service = OllamaService.from_config(model=model)
+        started = time.perf_counter()
+        produced = False
+        try:
+            for piece in service.generate_stream(prompt, system_prompt, temperature, max_tokens):
+                if piece:
+                    produced = True
+                    yield piece
+        except (LLMOverloaded, CircuitOpen):
+            raise
+        except Exception as e:
+            tier_metrics.record(model, started, 'error', model == ladder[first])
+            if produced:
+                raise
+            last_error = e
+            continue
+        tier_metrics.record(model, started, 'ok' if produced else 'rejected', model == ladder[first])
+        if produced:
+            return
+    
+    raise last_error or Exception("Every model tier returned an empty response")
+
+def prepare_inventory_summary():
+    """Prepare a summary of inventory data for the LLM context."""
+    # Shared DataFrame snapshot, rebuilt only when the inventory changes
+    df = get_inventory_frame()
     
     # Create summary stats
     summary = {
-        'total_products': len(products),
+        'total_products': len(df),
         'categories': df['category'].value_counts().to_dict() if not df.empty else {},
         'low_stock_items': []
     }
@@ -95,11 +564,16 @@ def prepare_inventory_summary():
         # Add detailed low stock items
         summary['low_stock_items'] = low_stock_df[['id', 'name', 'category', 'current_stock', 'reorder_level']].to_dict('records')
         
-        # Add trending products based on historical sales if available
-        if 'historical_sales' in df.columns and not df['historical_sales'].isna().all():
-            # This would need to be implemented based on your historical_sales data structure
-            # For now, we'll just include a placeholder
-            summary['trending_products'] = []
+        # Add trending products from the best-seller leaderboard
+        summary['trending_products'] = [
+            {
+                'id': item['id'],
+                'name': item['name'],
+                'category': item['category'],
+                'total_sales': item['total_sales']
+            }
+            for item in trend_store.top_sellers(5, metric='total')
+        ]
     
     return summary
 
@@ -111,44 +585,67 @@ def get_product_details(product_id):
         
     return product.to_dict()
 
-def get_ollama_insights(query, product_id=None):
-    """Generate insights using Ollama based on user query."""
-    ollama_service = OllamaService(
-        base_url=current_app.config.get('OLLAMA_BASE_URL', 'http://localhost:11434'),
-        model=current_app.config.get('OLLAMA_MODEL', 'llama3')
-    )
+def get_products_details(product_ids):
+    """Details of several products, in the order of ``product_ids``."""
+    products = {product.id: product for product in Product.query.filter(Product.id.in_(product_ids))}
+    return [products[product_id].to_dict() for product_id in product_ids if product_id in products]
+
+def get_ollama_insights(query, product_id=None, product_ids=None):
+    """
+    Generate insights using Ollama based on user query.
+    
+    With ``product_ids``, the products a question mentions, the prompt holds
+    their details and the inventory totals instead of the catalog tables.
+    """
+    # Reuse the answer while the question, product, models and inventory are unchanged
+    focus = tuple(product_ids) if product_ids else product_id
+    key = cache_key(query, focus, ladder_key(model_ladder()), Product.inventory_version())
+    cached = insight_cache.get(key)
+    if cached is not None:
+        return cached
     
     # Prepare context for the LLM
     inventory_summary = prepare_inventory_summary()
     
     # Add specific product details if provided
     product_details = None
-    if product_id:
+    if product_ids:
+        product_details = get_products_details(product_ids)
+        inventory_summary = {
+            field: inventory_summary.get(field, 0)
+            for field in ('total_products', 'low_stock_count', 'out_of_stock_count')
+        }
+    elif product_id:
         product_details = get_product_details(product_id)
     
-    # Create the system prompt
-    system_prompt = """You are an intelligent inventory management assistant for InventIQ system. 
-    Your role is to provide accurate, helpful insights about inventory data.
-    When asked about low stock items or trending products, always include specific product names and quantities.
-    For restock recommendations, include a 30% buffer for trending or fast-moving products.
-    Be concise but informative."""
+    # Compact, query-ranked inventory context that fits the token budget
+    context = build_inventory_context(
+        inventory_summary,
+        query,
+        product_details,
+        budget=current_app.config.get('LLM_CONTEXT_TOKENS', DEFAULT_CONTEXT_TOKENS)
+    )
+    current_app.logger.info(
+        f"LLM context uses {context['tokens']}/{context['budget']} tokens ({context['omitted']} rows omitted)"
+    )
     
     # Create the user prompt with inventory data
-    user_prompt = f"""Inventory Summary:
-{json.dumps(inventory_summary, indent=2)}
-
-{"Product Details:\n" + json.dumps(product_details, indent=2) if product_details else ""}
+    user_prompt = f"""Inventory data (tables are pipe-separated):
+{context['text']}
 
 User Query: {query}
 
 Provide a helpful response addressing the user's query based on the inventory data provided above."""
     
-    # Generate response using Ollama
-    insight = ollama_service.generate(
+    # Generate response using the model tier the question and context call for
+    insight = generate_tiered(
+        query,
         prompt=user_prompt,
-        system_prompt=system_prompt,
+        system_prompt=ASSISTANT_SYSTEM_PROMPT,
+        context_tokens=context['tokens'],
         temperature=0.7,
         max_tokens=500
     )
     
+    insight_cache.set(key, insight)
     return insight
@@ -0,0 +1,297 @@
+import re
+import math
+import logging
+import threading
+from app.services.settings import app_settings
+
+logger = logging.getLogger(__name__)
+
+# Matching settings read from the app config; defaults live in config.Config
+SETTINGS = (
+    'PRODUCT_MATCH_MIN_COVERAGE',
+    'PRODUCT_MATCH_LIMIT',
+    'PRODUCT_FUZZY_SIMILARITY'
+)
+
+# Weight of a word by the field it was indexed from
+FIELD_WEIGHTS = {'name': 3.0, 'category': 1.0, 'supplier': 1.0}
+
+# Question words that never identify a product
+STOPWORDS = frozenset((
+    'a', 'an', 'and', 'any', 'are', 'as', 'at', 'be', 'by', 'can', 'do', 'does', 'for', 'from', 'have',
+    'how', 'i', 'in', 'is', 'it', 'its', 'many', 'me', 'much', 'my', 'of', 'on', 'or', 'our', 'should',
+    'tell', 'that', 'the', 'there', 'this', 'to', 'us', 'we', 'what', 'when', 'where', 'which', 'who',
+    'why', 'will', 'with', 'you', 'your', 'about', 'doing', 'left', 'sell', 'selling', 'stock'
+))
+
+# Words shorter than this are only matched exactly
+FUZZY_MIN_LENGTH = 4
+
+# Score of a product whose id appears in the question
+ID_MATCH_SCORE = 10.0
+
+# Words in more than this share of products (and this many) never pick candidates on their own
+COMMON_WORD_SHARE = 0.05
+COMMON_WORD_MIN_PRODUCTS = 50
+
+# Resolved products must cover at least this share of the best match's coverage
+RELATIVE_COVERAGE = 0.75
+
+_WORD_RE = re.compile(r"\w+")
+
+def tokenize(text):
+    """Lower-case words of ``text``."""
+    return _WORD_RE.findall(str(text or '').lower())
+
+def trigrams(word):
+    """Character trigrams of a word, padded so its start and end count."""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class ProductIndex:
+    """
+    In-memory inverted index over product names, categories and suppliers.
+
+    Words map to the products they appear in, and a trigram index over the
+    vocabulary finds misspelt words. Like the trend store it is built once
+    from the products table and then kept current by applying each product
+    write, so resolving the products a question mentions never touches the
+    database.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._reset()
+
+    def _reset(self):
+        # product id -> {'id', 'name', 'words': {word: field weight}, 'name_words': set}
+        self._products = {}
+        # word -> {product id: field weight}
+        self._postings = {}
+        # trigram -> words containing it, and each word's trigram count
+        self._grams = {}
+        self._gram_counts = {}
+        # lower-cased product id -> product id
+        self._ids = {}
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    def ensure_loaded(self):
+        """Build the index from the database on first use."""
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            from app.models.inventory import Product
+            self._reset()
+            for product in Product.query.with_entities(Product.id, Product.name, Product.category,
+                                                       Product.supplier):
+                self._add_product(product)
+            self._loaded = True
+            logger.info(f"Product index built for {len(self._products)} products "
+                        f"({len(self._postings)} words)")
+
+    def invalidate(self):
+        """Drop the index; it is rebuilt on the next search."""
+        with self._lock:
+            self._reset()
+            self._loaded = False
+
+    def _add_word(self, word):
+        if word in self._gram_counts:
+            return
+        grams = trigrams(word)
+        self._gram_counts[word] = len(grams)
+        for gram in grams:
+            self._grams.setdefault(gram, set()).add(word)
+
+    def _drop_word(self, word):
+        for gram in trigrams(word):
+            words = self._grams.get(gram)
+            if words is not None:
+                words.discard(word)
+                if not words:
+                    del self._grams[gram]
+        self._gram_counts.pop(word, None)
+
+    def _add_product(self, product):
+        words = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            for word in tokenize(getattr(product, field)):
+                words[word] = max(words.get(word, 0.0), weight)
+        name_words = set(tokenize(product.name))
+
+        self._products[product.id] = {'id': product.id, 'name': product.name,
+                                      'words': words, 'name_words': name_words}
+        self._ids[str(product.id).lower()] = product.id
+        for word, weight in words.items():
+            self._postings.setdefault(word, {})[product.id] = weight
+            self._add_word(word)
+
+    def _remove_product(self, product_id):
+        entry = self._products.pop(product_id, None)
+        if entry is None:
+            return
+        self._ids.pop(str(product_id).lower(), None)
+        for word in entry['words']:
+            postings = self._postings.get(word)
+            if postings is None:
+                continue
+            postings.pop(product_id, None)
+            if not postings:
+                del self._postings[word]
+                self._drop_word(word)
+
+    def _apply(self, method, *args):
+        """Apply an update, invalidating the index if it cannot be applied."""
+        with self._lock:
+            # Checked under the lock: a build in progress may have read the row before
+            # this change was committed, so the update waits for it and is applied after
+            if not self._loaded:
+                return
+            try:
+                method(*args)
+            except Exception as e:
+                logger.error(f"Product index update failed, scheduling rebuild: {str(e)}")
+                self.invalidate()
+
+    def refresh_product(self, product):
+        """Re-index a product after it was added or edited."""
+        self._apply(self._refresh_product, product)
+
+    def _refresh_product(self, product):
+        self._remove_product(product.id)
+        self._add_product(product)
+
+    def remove_product(self, product_id):
+        """Forget a deleted product."""
+        self._apply(self._remove_product, product_id)
+
+    def _idf(self, word):
+        return math.log(1 + len(self._products) / len(self._postings.get(word) or (None,)))
+
+    def _similar_words(self, word, threshold):
+        """Indexed words whose trigrams overlap ``word``'s by at least ``threshold`` (Jaccard)."""
+        grams = trigrams(word)
+        shared = {}
+        for gram in grams:
+            for candidate in self._grams.get(gram, ()):
+                shared[candidate] = shared.get(candidate, 0) + 1
+        similar = []
+        for candidate, common in shared.items():
+            similarity = common / (len(grams) + self._gram_counts[candidate] - common)
+            if similarity >= threshold:
+                similar.append((candidate, similarity))
+        return similar
+
+    def _query_matches(self, query, settings):
+        """Indexed words matched by the question, each with its best similarity."""
+        matched = {}
+        for word in tokenize(query):
+            if word in STOPWORDS:
+                continue
+            if word in self._postings:
+                matched[word] = 1.0
+            elif len(word) >= FUZZY_MIN_LENGTH:
+                for candidate, similarity in self._similar_words(word, settings['PRODUCT_FUZZY_SIMILARITY']):
+                    matched[candidate] = max(matched.get(candidate, 0.0), similarity)
+        return matched
+
+    def _is_common(self, word):
+        return len(self._postings[word]) > max(COMMON_WORD_MIN_PRODUCTS, COMMON_WORD_SHARE * len(self._products))
+
+    def search(self, query, limit=10):
+        """
+        Rank products by how well ``query`` matches them.
+
+        Returns up to ``limit`` dicts with the product 'id' and 'name', a
+        'score' (matched words weighted by field, rarity and similarity) and
+        'coverage', the share of the product name's weight that matched.
+        A product id written in the question matches with coverage 1; numbers
+        alone never cover a name.
+
+        Candidates come from the question's distinctive words; words shared
+        by a large part of the catalog (e.g. "product") only add to the
+        scores of those candidates, so they never cost a scan of the catalog.
+        """
+        self.ensure_loaded()
+        settings = app_settings(*SETTINGS)
+        with self._lock:
+            scores = {}
+            name_hits = {}
+            named_by_id = set()
+            # Products with a matched name word that is not just a number, like the "5" of "top 5"
+            named_by_word = set()
+            for word in tokenize(query):
+                product_id = self._ids.get(word)
+                if product_id is not None:
+                    scores[product_id] = scores.get(product_id, 0.0) + ID_MATCH_SCORE
+                    named_by_id.add(product_id)
+
+            matches = self._query_matches(query, settings)
+            common = {word for word in matches if self._is_common(word)}
+
+            def hit(product_id, word, weight, similarity):
+                idf = self._idf(word)
+                scores[product_id] = scores.get(product_id, 0.0) + weight * idf * similarity
+                if word in self._products[product_id]['name_words']:
+                    # A close enough misspelling covers the word fully; only the score is discounted
+                    name_hits[product_id] = name_hits.get(product_id, 0.0) + idf
+                    if not word.isdigit():
+                        named_by_word.add(product_id)
+
+            for word, similarity in matches.items():
+                if word not in common:
+                    for product_id, weight in self._postings[word].items():
+                        hit(product_id, word, weight, similarity)
+            for word in common:
+                postings = self._postings[word]
+                for product_id in list(scores):
+                    if product_id in postings:
+                        hit(product_id, word, postings[product_id], matches[word])
+
+            # Best scores first; coverage only needs working out for those
+            ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:max(limit, 1) * 4]
+            results = []
+            for product_id, score in ranked:
+                entry = self._products[product_id]
+                if product_id in named_by_id:
+                    coverage = 1.0
+                elif product_id in named_by_word:
+                    total = sum(self._idf(word) for word in entry['name_words'])
+                    coverage = min(1.0, name_hits[product_id] / total) if total else 0.0
+                else:
+                    coverage = 0.0
+                results.append({'id': product_id, 'name': entry['name'],
+                                'score': round(score, 4), 'coverage': round(coverage, 4)})
+
+        results.sort(key=lambda result: (-result['coverage'], -result['score'], result['id']))
+        return results[:limit]
+
+    def resolve(self, query):
+        """
+        Ids of the products a question mentions, best match first.
+
+        A product counts as mentioned when the question names it by id, or
+        matches enough of its name and nearly as much as the best match;
+        category or supplier words alone never resolve a product.
+        """
+        settings = app_settings(*SETTINGS)
+        results = [result for result in self.search(query, settings['PRODUCT_MATCH_LIMIT'])
+                   if result['coverage'] >= settings['PRODUCT_MATCH_MIN_COVERAGE']]
+        if not results:
+            return []
+        best = results[0]['coverage']
+        return [result['id'] for result in results if result['coverage'] >= best * RELATIVE_COVERAGE]
+
+    def stats(self):
+        with self._lock:
+            return {'loaded': self._loaded, 'products': len(self._products),
+                    'words': len(self._postings), 'trigrams': len(self._grams)}
+
+# Process-wide index used to resolve products mentioned in assistant questions
+product_index = ProductIndex()
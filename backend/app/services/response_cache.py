@@ -0,0 +1,63 @@
+import re
+import time
+import threading
+from collections import OrderedDict
+from app.services.settings import app_setting
+
+def normalize_query(query):
+    """Lower-case a question and drop punctuation and extra whitespace."""
+    return ' '.join(re.sub(r"[^\w\s']", ' ', (query or '').lower()).split())
+
+def cache_key(query, product_id, model, inventory_version):
+    """Key of a generated answer; a new inventory version makes old answers unreachable."""
+    return (normalize_query(query), product_id or None, model, inventory_version)
+
+class ResponseCache:
+    """
+    Thread-safe LRU cache of generated answers with a time-to-live.
+
+    Size and TTL are read from the app config on each call, so they can be
+    tuned per app without rebuilding the cache.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Return the cached answer for ``key``, or None."""
+        ttl = app_setting('LLM_CACHE_TTL')
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[1] > ttl:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, answer):
+        """Store an answer, evicting the least recently used ones over the size limit."""
+        size = app_setting('LLM_CACHE_SIZE')
+        if size <= 0 or not answer:
+            return
+        with self._lock:
+            self._entries[key] = (answer, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+# Process-wide cache shared by every LLM insight path
+insight_cache = ResponseCache()
@@ -0,0 +1,16 @@
+from flask import current_app, has_app_context
+from config import Config
+
+def app_setting(key):
+    """
+    A setting from the current app's config.
+
+    Defaults are kept only on config.Config; they apply when the app's
+    config leaves the setting out and outside an app context.
+    """
+    default = getattr(Config, key)
+    return current_app.config.get(key, default) if has_app_context() else default
+
+def app_settings(*keys):
+    """Several settings at once, as a dict keyed by name."""
+    return {key: app_setting(key) for key in keys}
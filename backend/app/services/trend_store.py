@@ -0,0 +1,716 @@
+import ast
+import json
+import heapq
+import threading
+import logging
+from datetime import date, datetime, timedelta
+from itertools import islice
+
+logger = logging.getLogger(__name__)
+
+def parse_historical_sales(raw):
+    """
+    Parse a product's historical_sales string into a dict.
+
+    Accepts JSON and the Python-literal dicts with single quotes found in
+    the inventory CSV. A literal without double quotes or backslashes only
+    uses single quotes as string delimiters, so swapping them makes it JSON
+    and it parses as fast; anything else falls back to ast.literal_eval.
+    """
+    if not raw or not isinstance(raw, str):
+        return {}
+    text = raw
+    if "'" in text and '"' not in text and '\\' not in text:
+        text = text.replace("'", '"')
+    try:
+        historical_sales = json.loads(text)
+    except json.JSONDecodeError:
+        try:
+            historical_sales = ast.literal_eval(raw.strip())
+        except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+            return {}
+    return historical_sales if isinstance(historical_sales, dict) else {}
+
+def day_number(day):
+    """Return the numeric part of a 'Day-N' key, or None if it has none."""
+    try:
+        return int(str(day).split('-')[1])
+    except (IndexError, ValueError):
+        return None
+
+def sales_date(day, today=None):
+    """
+    Calendar date of a 'Day-N' key, or None if it has no day number.
+
+    Sales are keyed by day of the year, which restarts every January, so a
+    key means the most recent day numbered N that is not after ``today``
+    (default: the current UTC date). Late last year's days therefore come
+    before this January's.
+    """
+    number = day_number(day)
+    if number is None:
+        return None
+    today = today or datetime.utcnow().date()
+    year = today.year if number <= today.timetuple().tm_yday else today.year - 1
+    return date(year, 1, 1) + timedelta(days=number - 1)
+
+# Rollup granularities served by the windowed trends API
+BUCKETS = ('day', 'week', 'month')
+
+def parse_window(window):
+    """Convert a window such as '30d' or '4w' into a number of days."""
+    window = str(window).strip().lower()
+    units = {'d': 1, 'w': 7}
+    if len(window) < 2 or window[-1] not in units or not window[:-1].isdigit():
+        raise ValueError(f"Invalid window '{window}'. Use a number of days or weeks, e.g. 30d or 4w.")
+    days = int(window[:-1]) * units[window[-1]]
+    if days <= 0:
+        raise ValueError('Window must be at least one day')
+    return days
+
+# Trailing windows, in days, that get their own best-seller leaderboards
+DEFAULT_LEADERBOARD_WINDOWS = (7, 30, 90)
+
+# Leaderboard ranking metrics: units sold, or all-time average units per recorded day
+LEADERBOARD_METRICS = ('total', 'avg_daily')
+
+class ProductTrend:
+    """Running sales aggregates for a single product."""
+
+    __slots__ = ('id', 'name', 'category', 'current_stock', 'reorder_level',
+                 'daily', 'total', 'has_sales_data', 'growth_rate')
+
+    def __init__(self, product):
+        self.id = product.id
+        self.daily = {}
+        self.total = 0.0
+        self.growth_rate = 0.0
+        self.has_sales_data = False
+        self.update_metadata(product)
+
+    def update_metadata(self, product):
+        self.name = product.name
+        self.category = product.category
+        self.current_stock = product.current_stock
+        self.reorder_level = product.reorder_level
+
+    @property
+    def avg_daily_sales(self):
+        return self.total / len(self.daily) if self.daily else 0
+
+    @property
+    def counts_for_growth(self):
+        return len(self.daily) >= 5
+
+    def compute_growth_rate(self):
+        """Compare the last 5 recorded days against the 5 before them.
+
+        Days are taken in recording order, so only the head and tail of the
+        history are touched.
+        """
+        count = len(self.daily)
+        if count < 5:
+            return 0
+
+        tail = list(islice(reversed(self.daily.values()), 10))
+        last_5_days = sum(tail[:5]) / 5
+        if count >= 10:
+            prev_5_days = sum(tail[5:10]) / 5
+        else:
+            prev_5_days = sum(islice(self.daily.values(), 5)) / 5
+        return ((last_5_days - prev_5_days) / prev_5_days * 100) if prev_5_days > 0 else 0
+
+    def to_trend(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'category': self.category,
+            'current_stock': self.current_stock,
+            'growth_rate': round(self.growth_rate, 2),
+            'avg_daily_sales': round(self.avg_daily_sales, 2),
+            'stock_status': 'Low' if self.current_stock < self.reorder_level else 'Good',
+            'has_sales_data': self.has_sales_data
+        }
+
+class Leaderboard:
+    """
+    Top-K ranking of scored keys.
+
+    Scores live in a dict and every change pushes a new entry onto a max-heap
+    in O(log n). Superseded heap entries are skipped when reading the top and
+    the heap is rebuilt once stale entries outnumber live ones.
+    """
+
+    def __init__(self):
+        self._scores = {}
+        self._heap = []
+
+    def __len__(self):
+        return len(self._scores)
+
+    def get(self, key, default=0):
+        return self._scores.get(key, default)
+
+    def set(self, key, score):
+        self._scores[key] = score
+        heapq.heappush(self._heap, (-score, key))
+        if len(self._heap) > 2 * len(self._scores) + 64:
+            self._compact()
+
+    def add(self, key, delta):
+        self.set(key, self._scores.get(key, 0) + delta)
+
+    def remove(self, key):
+        self._scores.pop(key, None)
+
+    def top(self, k):
+        """Return up to ``k`` (key, score) pairs, highest score first."""
+        result = []
+        seen = set()
+        while self._heap and len(result) < k:
+            neg_score, key = heapq.heappop(self._heap)
+            if key in seen or self._scores.get(key) != -neg_score:
+                continue
+            seen.add(key)
+            result.append((key, -neg_score))
+        for key, score in result:
+            heapq.heappush(self._heap, (-score, key))
+        return result
+
+    def _compact(self):
+        self._heap = [(-score, key) for key, score in self._scores.items()]
+        heapq.heapify(self._heap)
+
+class TrendStore:
+    """
+    In-memory aggregate store backing the trends endpoint.
+
+    Daily totals, category totals and per-product growth windows are built
+    once from the products table and then kept current by applying each
+    product change as it is written, so reading trends never re-parses
+    sales histories.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._products = {}
+        self._daily_totals = {}
+        self._daily_counts = {}
+        self._categories = {}
+        self._rollups = {}
+        self._last_day = None
+        self._base_year = datetime.utcnow().year
+        self._day_numbers = {}
+        self._day_products = {}
+        self._leaderboard_windows = DEFAULT_LEADERBOARD_WINDOWS
+        self._leaderboards = {}
+        self._ranking = False
+        self._generation = 0
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    @property
+    def generation(self):
+        """
+        Counter bumped each time the store is rebuilt or dropped.
+
+        Read under the lock, so it is never taken halfway through a build.
+        """
+        with self._lock:
+            return self._generation
+
+    def ensure_loaded(self):
+        """Build the store from the database on first use."""
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            from flask import current_app
+            from app.models.inventory import Product
+            self._reset()
+            self._leaderboard_windows = tuple(current_app.config.get(
+                'LEADERBOARD_WINDOWS', DEFAULT_LEADERBOARD_WINDOWS
+            ))
+            for product in Product.query.all():
+                self._add_product(product)
+            # Rank once the anchor day is known instead of re-ranking per product
+            self._ranking = True
+            for state in self._products.values():
+                self._rank(state)
+            self._loaded = True
+            logger.info(f"Trend store built for {len(self._products)} products")
+
+    def invalidate(self):
+        """Drop all aggregates; they are rebuilt on the next read."""
+        with self._lock:
+            self._reset()
+            self._loaded = False
+
+    def _reset(self):
+        self._generation += 1
+        self._products = {}
+        self._daily_totals = {}
+        self._daily_counts = {}
+        self._categories = {}
+        # Rollups per scope ('all', ('category', name) or ('product', id)),
+        # each holding day, week and month buckets keyed by bucket index
+        self._rollups = {}
+        self._last_day = None
+        # Sales are recorded as 'Day-%j', which restarts every January; each key is
+        # resolved once to a day number counted from January 1 of the base year
+        self._base_year = datetime.utcnow().year
+        self._day_numbers = {}
+        # Product ids with sales on each day number, used to expire window scores
+        self._day_products = {}
+        # Leaderboards keyed by (metric, window_days, category); None means all time / all categories
+        self._leaderboards = {}
+        self._ranking = False
+
+    def _number(self, day):
+        """
+        Absolute day number of a 'Day-N' key.
+
+        The key is resolved with sales_date() when first seen, so days
+        recorded late last year sort before (and expire ahead of) this
+        January's. Numbers are 1 on January 1 of the base year, below 1
+        before it and above 365 after.
+        """
+        number = self._day_numbers.get(day)
+        if number is None and day not in self._day_numbers:
+            value = sales_date(day)
+            number = self._day_of(value) if value is not None else None
+            self._day_numbers[day] = number
+        return number
+
+    def _day_sort_key(self, day):
+        number = self._number(day)
+        return (number is None, number if number is not None else 0, str(day))
+
+    def _day_label(self, number):
+        return f'Day-{self._date_of(number).timetuple().tm_yday}'
+
+    def _date_of(self, number):
+        return date(self._base_year, 1, 1) + timedelta(days=number - 1)
+
+    def _day_of(self, value):
+        return (value - date(self._base_year, 1, 1)).days + 1
+
+    def _bucket_index(self, number, bucket):
+        if bucket == 'day':
+            return number
+        if bucket == 'week':
+            return (number - 1) // 7
+        value = self._date_of(number)
+        return (value.year - self._base_year) * 12 + value.month - 1
+
+    def _bucket_bounds(self, index, bucket):
+        """First and last day number covered by a bucket."""
+        if bucket == 'day':
+            return index, index
+        if bucket == 'week':
+            return index * 7 + 1, index * 7 + 7
+        year, month = self._base_year + index // 12, index % 12 + 1
+        first = date(year, month, 1)
+        following = date(year + month // 12, month % 12 + 1, 1)
+        return self._day_of(first), self._day_of(following) - 1
+
+    def _bucket_label(self, index, bucket):
+        if bucket == 'day':
+            return self._day_label(index)
+        first, _ = self._bucket_bounds(index, bucket)
+        if bucket == 'week':
+            return f'Week-{(self._date_of(first).timetuple().tm_yday - 1) // 7 + 1}'
+        return self._date_of(first).strftime('%Y-%m')
+
+    def _add_rollups(self, state, day, qty):
+        """Add ``qty`` to every rollup bucket the day falls into."""
+        number = self._number(day)
+        if number is None:
+            return
+        if self._last_day is None or number > self._last_day:
+            self._advance(number)
+        if qty > 0:
+            self._day_products.setdefault(number, set()).add(state.id)
+        elif qty < 0 and number in self._day_products:
+            self._day_products[number].discard(state.id)
+        indexes = {bucket: self._bucket_index(number, bucket) for bucket in BUCKETS}
+        for scope in ('all', ('category', state.category), ('product', state.id)):
+            rollup = self._rollups.get(scope)
+            if rollup is None:
+                rollup = self._rollups[scope] = {bucket: {} for bucket in BUCKETS}
+            for bucket, index in indexes.items():
+                rollup[bucket][index] = rollup[bucket].get(index, 0) + qty
+
+    def _advance(self, number):
+        """Move the anchor day forward, expiring sales that left each window."""
+        previous, self._last_day = self._last_day, number
+        if not self._ranking or previous is None:
+            return
+        for window in self._leaderboard_windows:
+            for expired in range(previous - window + 1, min(previous, number - window) + 1):
+                for product_id in self._day_products.get(expired, ()):
+                    state = self._products.get(product_id)
+                    rollup = self._rollups.get(('product', product_id))
+                    if state is None or rollup is None:
+                        continue
+                    qty = rollup['day'].get(expired, 0)
+                    for board in self._boards(state, 'total', window):
+                        board.add(product_id, -qty)
+
+    def _board(self, metric, window, category):
+        key = (metric, window, category)
+        board = self._leaderboards.get(key)
+        if board is None:
+            board = self._leaderboards[key] = Leaderboard()
+        return board
+
+    def _boards(self, state, metric, window):
+        """The overall and category leaderboards a product ranks on."""
+        return (self._board(metric, window, None), self._board(metric, window, state.category))
+
+    def _in_window(self, number, window):
+        return number is not None and self._last_day - window < number <= self._last_day
+
+    def _rank(self, state):
+        """Place a product on every leaderboard from its full history."""
+        if not self._ranking:
+            return
+        for board in self._boards(state, 'avg_daily', None):
+            board.set(state.id, state.avg_daily_sales)
+        for board in self._boards(state, 'total', None):
+            board.set(state.id, state.total)
+        for window in self._leaderboard_windows:
+            score = sum(qty for day, qty in state.daily.items() if self._in_window(self._number(day), window))
+            for board in self._boards(state, 'total', window):
+                board.set(state.id, score)
+
+    def _unrank(self, state):
+        for (metric, window, category), board in self._leaderboards.items():
+            if category is None or category == state.category:
+                board.remove(state.id)
+
+    def _category(self, name):
+        category = self._categories.get(name)
+        if category is None:
+            category = self._categories[name] = {
+                'total_sales': 0.0,
+                'growth_sum': 0.0,
+                'product_count': 0,
+                'contributors': 0
+            }
+        return category
+
+    def _detach(self, state):
+        """Remove a product's contributions from the shared aggregates."""
+        self._unrank(state)
+        for day, qty in state.daily.items():
+            self._daily_totals[day] -= qty
+            self._daily_counts[day] -= 1
+            if self._daily_counts[day] <= 0:
+                del self._daily_totals[day]
+                del self._daily_counts[day]
+            self._add_rollups(state, day, -qty)
+        self._rollups.pop(('product', state.id), None)
+
+        category = self._categories.get(state.category)
+        if category is not None and state.daily:
+            category['total_sales'] -= state.total
+            category['contributors'] -= 1
+            if state.counts_for_growth:
+                category['growth_sum'] -= state.growth_rate
+                category['product_count'] -= 1
+            if category['contributors'] <= 0:
+                del self._categories[state.category]
+
+    def _attach(self, state):
+        """Add a product's contributions to the shared aggregates."""
+        for day, qty in state.daily.items():
+            self._daily_totals[day] = self._daily_totals.get(day, 0) + qty
+            self._daily_counts[day] = self._daily_counts.get(day, 0) + 1
+            self._add_rollups(state, day, qty)
+
+        if state.daily:
+            category = self._category(state.category)
+            category['total_sales'] += state.total
+            category['contributors'] += 1
+            if state.counts_for_growth:
+                category['growth_sum'] += state.growth_rate
+                category['product_count'] += 1
+        self._rank(state)
+
+    def _add_product(self, product):
+        state = ProductTrend(product)
+        historical_sales = parse_historical_sales(product.historical_sales)
+        state.has_sales_data = bool(historical_sales)
+        for day, quantity in historical_sales.items():
+            try:
+                qty = float(quantity)
+            except (ValueError, TypeError):
+                continue
+            state.daily[day] = qty
+            state.total += qty
+        state.growth_rate = state.compute_growth_rate()
+        self._products[state.id] = state
+        self._attach(state)
+        return state
+
+    def _remove_product(self, product_id):
+        state = self._products.pop(product_id, None)
+        if state is not None:
+            self._detach(state)
+        return state
+
+    def _apply(self, method, *args):
+        """Apply an update, invalidating the store if it cannot be applied."""
+        with self._lock:
+            # Checked under the lock: a build in progress finishes first
+            if not self._loaded:
+                return
+            try:
+                method(*args)
+            except Exception as e:
+                logger.error(f"Trend store update failed, scheduling rebuild: {str(e)}")
+                self.invalidate()
+
+    def refresh_product(self, product):
+        """Re-read a product after it was added or edited."""
+        self._apply(self._refresh_product, product)
+
+    def _refresh_product(self, product):
+        self._remove_product(product.id)
+        self._add_product(product)
+
+    def remove_product(self, product_id):
+        """Forget a deleted product."""
+        self._apply(self._remove_product, product_id)
+
+    def update_stock(self, product):
+        """Track a stock change that did not touch sales history."""
+        self._apply(self._update_stock, product)
+
+    def _update_stock(self, product):
+        state = self._products.get(product.id)
+        if state is None:
+            self._add_product(product)
+        else:
+            state.update_metadata(product)
+
+    def record_sale(self, product, day, quantity, generation=None):
+        """
+        Apply a single sale of ``quantity`` units on ``day`` in O(1).
+
+        ``generation`` is the store's generation read before the sale was
+        committed. If the store was rebuilt since, the rebuild may already
+        have counted the sale, so the product is re-read from its saved
+        history instead of having the sale added again.
+        """
+        self._apply(self._record_sale, product, day, quantity, generation)
+
+    def _record_sale(self, product, day, quantity, generation=None):
+        if generation is not None and generation != self._generation:
+            self._refresh_product(product)
+            return
+        state = self._products.get(product.id)
+        if state is None:
+            self._add_product(product)
+            return
+
+        qty = float(quantity)
+        category = self._category(state.category)
+        if not state.daily:
+            category['contributors'] += 1
+        if state.counts_for_growth:
+            category['growth_sum'] -= state.growth_rate
+            category['product_count'] -= 1
+
+        if day in state.daily:
+            state.daily[day] += qty
+        else:
+            state.daily[day] = qty
+            self._daily_counts[day] = self._daily_counts.get(day, 0) + 1
+        self._daily_totals[day] = self._daily_totals.get(day, 0) + qty
+        self._add_rollups(state, day, qty)
+        state.total += qty
+        state.has_sales_data = True
+        state.growth_rate = state.compute_growth_rate()
+        state.update_metadata(product)
+
+        category['total_sales'] += qty
+        if state.counts_for_growth:
+            category['growth_sum'] += state.growth_rate
+            category['product_count'] += 1
+
+        for board in self._boards(state, 'avg_daily', None):
+            board.set(state.id, state.avg_daily_sales)
+        for board in self._boards(state, 'total', None):
+            board.add(state.id, qty)
+        number = self._number(day)
+        for window in self._leaderboard_windows:
+            if self._in_window(number, window):
+                for board in self._boards(state, 'total', window):
+                    board.add(state.id, qty)
+
+    def get_trend_data(self, top_n=10):
+        """Assemble the trends payload from the running aggregates."""
+        self.ensure_loaded()
+        with self._lock:
+            top_selling = [
+                self._products[product_id].to_trend()
+                for product_id, _ in self._board('avg_daily', None, None).top(top_n)
+            ]
+
+            sales_trend = [
+                {'day': day, 'sales': self._daily_totals[day]}
+                for day in sorted(self._daily_totals, key=self._day_sort_key)
+            ]
+
+            category_trends = [
+                {
+                    'name': name,
+                    'total_sales': category['total_sales'],
+                    'avg_growth': round(category['growth_sum'] / category['product_count'], 2)
+                    if category['product_count'] > 0 else 0,
+                    'product_count': category['product_count']
+                }
+                for name, category in self._categories.items()
+            ]
+            category_trends.sort(key=lambda x: x['total_sales'], reverse=True)
+
+        return {
+            'topSellingProducts': top_selling,
+            'salesTrend': sales_trend,
+            'categoryTrends': category_trends
+        }
+
+    @property
+    def leaderboard_windows(self):
+        return self._leaderboard_windows
+
+    def top_sellers(self, k=10, metric='total', window_days=None, category=None):
+        """
+        Best sellers from the incrementally maintained leaderboards.
+
+        Args:
+            k: Number of products to return
+            metric: 'total' units sold, or 'avg_daily' average units per recorded day
+            window_days: One of the configured leaderboard windows, or None for all time
+            category: Restrict the ranking to one category
+
+        Returns:
+            List of product trend dicts with a 'total_sales' or
+            'avg_daily_sales' score, best first
+        """
+        if metric not in LEADERBOARD_METRICS:
+            raise ValueError(f"Invalid metric '{metric}'. Use one of: {', '.join(LEADERBOARD_METRICS)}")
+
+        self.ensure_loaded()
+        if window_days is not None:
+            if metric != 'total':
+                raise ValueError('Windowed leaderboards rank by total sales only')
+            if window_days not in self._leaderboard_windows:
+                windows = ', '.join(f'{window}d' for window in self._leaderboard_windows)
+                raise ValueError(f'No leaderboard for a {window_days}-day window. Available windows: {windows}')
+
+        with self._lock:
+            board = self._leaderboards.get((metric, window_days, category))
+            if board is None:
+                return []
+            top = []
+            for product_id, score in board.top(k):
+                entry = self._products[product_id].to_trend()
+                if metric == 'total':
+                    entry['total_sales'] = score
+                top.append(entry)
+        return top
+
+    def _window_total(self, rollup, start, end):
+        return sum(point['sales'] for point in self._series(rollup, start, end, 'week'))
+
+    def _series(self, rollup, start, end, bucket):
+        """Bucketed sales between two day numbers, inclusive.
+
+        Whole buckets are read straight from the rollup; only the partially
+        covered buckets at either edge fall back to daily values, so the cost
+        depends on the number of buckets rather than the window length.
+        """
+        series = []
+        if rollup is None or start > end:
+            return series
+        daily = rollup['day']
+        for index in range(self._bucket_index(start, bucket), self._bucket_index(end, bucket) + 1):
+            first, last = self._bucket_bounds(index, bucket)
+            if first < start or last > end:
+                first, last = max(first, start), min(last, end)
+                sales = sum(daily.get(number, 0) for number in range(first, last + 1))
+            else:
+                sales = rollup[bucket].get(index, 0)
+            series.append({
+                'period': self._bucket_label(index, bucket),
+                'start_day': self._day_label(first),
+                'end_day': self._day_label(last),
+                'sales': sales
+            })
+        return series
+
+    def _window_summary(self, rollup, start, end, days, bucket):
+        series = self._series(rollup, start, end, bucket)
+        total = sum(point['sales'] for point in series)
+        previous = self._window_total(rollup, start - days, start - 1)
+        growth_rate = ((total - previous) / previous * 100) if previous > 0 else 0
+        return {
+            'total_sales': total,
+            'previous_total_sales': previous,
+            'growth_rate': round(growth_rate, 2),
+            'series': series
+        }
+
+    def get_windowed_trends(self, window_days, bucket='day', product_id=None):
+        """
+        Sales over the last ``window_days`` recorded days in day, week or
+        month buckets, overall and per category, with growth measured
+        against the preceding window of the same length.
+        """
+        if bucket not in BUCKETS:
+            raise ValueError(f"Invalid bucket '{bucket}'. Use one of: {', '.join(BUCKETS)}")
+
+        self.ensure_loaded()
+        with self._lock:
+            end = self._last_day
+            if end is None:
+                return {'window_days': window_days, 'bucket': bucket, 'salesTrend': [], 'categoryTrends': []}
+            start = end - window_days + 1
+
+            overall = self._window_summary(self._rollups.get('all'), start, end, window_days, bucket)
+            category_trends = []
+            for name in self._categories:
+                summary = self._window_summary(self._rollups.get(('category', name)), start, end, window_days, bucket)
+                summary['name'] = name
+                category_trends.append(summary)
+            category_trends.sort(key=lambda x: x['total_sales'], reverse=True)
+
+            result = {
+                'window_days': window_days,
+                'bucket': bucket,
+                'start_day': self._day_label(start),
+                'end_day': self._day_label(end),
+                'total_sales': overall['total_sales'],
+                'growth_rate': overall['growth_rate'],
+                'salesTrend': overall['series'],
+                'categoryTrends': category_trends
+            }
+
+            if product_id is not None:
+                if product_id not in self._products:
+                    raise KeyError(product_id)
+                product = self._window_summary(self._rollups.get(('product', product_id)), start, end, window_days, bucket)
+                product['id'] = product_id
+                result['product'] = product
+
+        return result
+
+# Process-wide store shared by the inventory and predictions routes
+trend_store = TrendStore()
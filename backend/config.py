@@ -14,4 +14,67 @@ class Config:
     USE_OLLAMA = os.environ.get('USE_OLLAMA', 'True').lower() in ('true', '1', 't')
     OLLAMA_BASE_URL = os.environ.get('OLLAMA_BASE_URL', 'http://localhost:11433')
     OLLAMA_MODEL = os.environ.get('OLLAMA_MODEL', 'llama3')
-
+    # Model ladder, smallest first (e.g. 'llama3.2:1b,llama3'); empty uses OLLAMA_MODEL alone
+    OLLAMA_MODEL_TIERS = os.environ.get('OLLAMA_MODEL_TIERS', '')
+    # Questions longer than this many words or with more context tokens start on a larger tier
+    LLM_SMALL_TIER_MAX_WORDS = int(os.environ.get('LLM_SMALL_TIER_MAX_WORDS', '20'))
+    LLM_SMALL_TIER_MAX_CONTEXT = int(os.environ.get('LLM_SMALL_TIER_MAX_CONTEXT', '400'))
+    # Answers shorter than this are retried on the next tier
+    LLM_MIN_ANSWER_CHARS = int(os.environ.get('LLM_MIN_ANSWER_CHARS', '20'))
+    # Recent latencies kept per model tier for percentiles
+    LLM_TIER_METRICS_WINDOW = int(os.environ.get('LLM_TIER_METRICS_WINDOW', '1000'))
+    # Pooled keep-alive HTTP client and cached availability probe
+    OLLAMA_CONNECT_TIMEOUT = float(os.environ.get('OLLAMA_CONNECT_TIMEOUT', '3.05'))
+    OLLAMA_READ_TIMEOUT = float(os.environ.get('OLLAMA_READ_TIMEOUT', '30'))
+    OLLAMA_PROBE_TIMEOUT = float(os.environ.get('OLLAMA_PROBE_TIMEOUT', '2'))
+    OLLAMA_PROBE_TTL = float(os.environ.get('OLLAMA_PROBE_TTL', '30'))
+    OLLAMA_POOL_SIZE = int(os.environ.get('OLLAMA_POOL_SIZE', '10'))
+    # Model residency: Ollama keep_alive, warm-up at start and keep-warm pings while the assistant is in use
+    OLLAMA_KEEP_ALIVE = os.environ.get('OLLAMA_KEEP_ALIVE', '30m')
+    OLLAMA_WARMUP = os.environ.get('OLLAMA_WARMUP', 'True').lower() in ('true', '1', 't')
+    OLLAMA_KEEP_WARM_INTERVAL = float(os.environ.get('OLLAMA_KEEP_WARM_INTERVAL', '240'))
+    OLLAMA_KEEP_WARM_IDLE = float(os.environ.get('OLLAMA_KEEP_WARM_IDLE', '1800'))
+    # Circuit breaker: consecutive failures that open it, the backoff between trial calls and how long a trial may run
+    OLLAMA_BREAKER_FAILURES = int(os.environ.get('OLLAMA_BREAKER_FAILURES', '3'))
+    OLLAMA_BREAKER_BASE_INTERVAL = float(os.environ.get('OLLAMA_BREAKER_BASE_INTERVAL', '5'))
+    OLLAMA_BREAKER_MAX_INTERVAL = float(os.environ.get('OLLAMA_BREAKER_MAX_INTERVAL', '300'))
+    OLLAMA_BREAKER_TRIAL_TIMEOUT = float(os.environ.get('OLLAMA_BREAKER_TRIAL_TIMEOUT', '60'))
+    # Generated answers cached per question, product, model and inventory version
+    LLM_CACHE_SIZE = int(os.environ.get('LLM_CACHE_SIZE', '256'))
+    LLM_CACHE_TTL = float(os.environ.get('LLM_CACHE_TTL', '600'))
+    # Token budget of the inventory context embedded in LLM prompts
+    LLM_CONTEXT_TOKENS = int(os.environ.get('LLM_CONTEXT_TOKENS', '1024'))
+    # Questions the local intent router is at least this confident about skip the LLM
+    INTENT_CONFIDENCE_THRESHOLD = float(os.environ.get('INTENT_CONFIDENCE_THRESHOLD', '0.6'))
+    INTENT_METRICS_WINDOW = int(os.environ.get('INTENT_METRICS_WINDOW', '1000'))
+    # Products named in a question: share of the name to match, fuzzy similarity and how many to resolve
+    PRODUCT_MATCH_MIN_COVERAGE = float(os.environ.get('PRODUCT_MATCH_MIN_COVERAGE', '0.5'))
+    PRODUCT_FUZZY_SIMILARITY = float(os.environ.get('PRODUCT_FUZZY_SIMILARITY', '0.5'))
+    PRODUCT_MATCH_LIMIT = int(os.environ.get('PRODUCT_MATCH_LIMIT', '3'))
+    # Back-pressure for Ollama generations: concurrent slots, waiting queue and its timeout
+    LLM_MAX_CONCURRENCY = int(os.environ.get('LLM_MAX_CONCURRENCY', '1'))
+    LLM_MAX_QUEUE = int(os.environ.get('LLM_MAX_QUEUE', '8'))
+    LLM_QUEUE_TIMEOUT = float(os.environ.get('LLM_QUEUE_TIMEOUT', '10'))
+    
+    # Trend analytics
+    # Trailing windows (in days) that keep their own best-seller leaderboards
+    LEADERBOARD_WINDOWS = [int(days) for days in os.environ.get('LEADERBOARD_WINDOWS', '7,30,90').split(',') if days.strip()]
+    
+    # Streaming sales anomaly detection (EWMA control limits + CUSUM)
+    ANOMALY_EWMA_ALPHA = float(os.environ.get('ANOMALY_EWMA_ALPHA', '0.3'))
+    ANOMALY_SIGMA_LIMIT = float(os.environ.get('ANOMALY_SIGMA_LIMIT', '3.0'))
+    ANOMALY_CUSUM_K = float(os.environ.get('ANOMALY_CUSUM_K', '0.5'))
+    ANOMALY_CUSUM_H = float(os.environ.get('ANOMALY_CUSUM_H', '5.0'))
+    ANOMALY_MIN_DAYS = int(os.environ.get('ANOMALY_MIN_DAYS', '7'))
+    
+    # Stored inventory exports (content-addressed) and their retention policy
+    EXPORT_DIR = os.environ.get('EXPORT_DIR')
+    EXPORT_RETENTION_DAYS = int(os.environ.get('EXPORT_RETENTION_DAYS', '30'))
+    EXPORT_RETENTION_MAX_FILES = int(os.environ.get('EXPORT_RETENTION_MAX_FILES', '20'))
+    EXPORT_RETENTION_MAX_BYTES = int(os.environ.get('EXPORT_RETENTION_MAX_BYTES', str(100 * 1024 * 1024)))
+    
+    # Inventory CSV: journaled product updates folded into the file after this many entries
+    CSV_JOURNAL_COMPACT_ENTRIES = int(os.environ.get('CSV_JOURNAL_COMPACT_ENTRIES', '1000'))
+    # Database/CSV sync: side that wins a conflict ('db', 'csv' or 'skip') and rows per batched statement
+    INVENTORY_SYNC_PREFER = os.environ.get('INVENTORY_SYNC_PREFER', 'db')
+    INVENTORY_SYNC_BATCH_SIZE = int(os.environ.get('INVENTORY_SYNC_BATCH_SIZE', '1000'))
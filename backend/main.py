@@ -24,11 +24,17 @@ def create_app(config_class=Config):
     app.register_blueprint(export_bp, url_prefix='/api/export')
     app.register_blueprint(assistant_bp)
     
+    # Load the Ollama model in the background and keep it warm while in use
+    from app.services.ollama_service import model_residency
+    model_residency.start(app)
+    
     return app
 
 def init_db(app):
     with app.app_context():
+        from app.models.inventory import create_missing_indexes
         db.create_all()
+        create_missing_indexes()
         
         # Create default admin user if it doesn't exist
         admin = User.query.filter_by(username='admin').first()
@@ -0,0 +1,186 @@
+import os
+import sys
+import json
+import time
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from scripts.ollama_standin import OllamaStandIn, StandInSettings, parse_models
+from scripts.benchmark_insights import build_inventory
+
+# Open-ended questions, so the intent router sends them to the LLM
+QUESTION_TEMPLATES = (
+    'Why should I rethink the supplier strategy for order batch {i}?',
+    'What do you recommend for the inventory plan of week {i}?',
+    'Explain how demand could change for promotion {i}',
+    'Suggest an improvement to our restocking process, idea {i}'
+)
+
+def questions(count):
+    """Distinct questions, so neither the answer cache nor single-flight can merge them."""
+    return [QUESTION_TEMPLATES[i % len(QUESTION_TEMPLATES)].format(i=i) for i in range(count)]
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def seed_products(db, products, seed):
+    """Fill the benchmark database with a synthetic inventory."""
+    from app.models.inventory import Product, bump_inventory_version
+
+    df = build_inventory(products, max(1, products // 40), seed)
+    history = json.dumps({f"Day-{day}": (day * 7) % 23 for day in range(1, 31)})
+    db.session.bulk_insert_mappings(Product, [
+        dict(row, historical_sales=history)
+        for row in df.drop(columns=['stock_status']).to_dict(orient='records')
+    ])
+    bump_inventory_version()
+    db.session.commit()
+
+def create_benchmark_app(base_url, args):
+    """App wired to the stand-in server and a throwaway SQLite database."""
+    from main import create_app
+    from app.extensions import db
+
+    database = os.path.join(tempfile.mkdtemp(prefix='inventiq-bench-'), 'bench.db')
+
+    class BenchmarkConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{database}"
+        OLLAMA_BASE_URL = base_url
+        OLLAMA_MODEL = args.model
+        # Model ladder, smallest first, without the stand-in's speed factors
+        OLLAMA_MODEL_TIERS = ','.join(parse_models(args.tiers)) if args.tiers else ''
+        OLLAMA_READ_TIMEOUT = args.read_timeout
+        # Every question reaches the LLM unless caching is being measured
+        LLM_CACHE_SIZE = Config.LLM_CACHE_SIZE if args.cache else 0
+        LLM_MAX_CONCURRENCY = args.llm_concurrency
+        LLM_MAX_QUEUE = args.llm_queue
+        OLLAMA_WARMUP = not args.no_warmup
+        OLLAMA_KEEP_WARM_INTERVAL = 0
+
+    app = create_app(BenchmarkConfig)
+    with app.app_context():
+        from app.models.inventory import create_missing_indexes
+        db.create_all()
+        create_missing_indexes()
+        seed_products(db, args.products, args.seed)
+    return app
+
+def call_function(app, query):
+    from app.services.llm_service import get_llm_insights
+
+    with app.app_context():
+        start = time.perf_counter()
+        get_llm_insights(query)
+        elapsed = time.perf_counter() - start
+    return elapsed, elapsed, True
+
+def call_route(app, query):
+    start = time.perf_counter()
+    response = app.test_client().post('/api/assistant/insights', json={'query': query})
+    elapsed = time.perf_counter() - start
+    return elapsed, elapsed, response.status_code == 200
+
+def call_stream(app, query):
+    start = time.perf_counter()
+    response = app.test_client().post('/api/assistant/insights', json={'query': query, 'stream': True},
+                                      buffered=False)
+    first = None
+    for _ in response.response:
+        if first is None:
+            first = time.perf_counter() - start
+    elapsed = time.perf_counter() - start
+    return first if first is not None else elapsed, elapsed, response.status_code == 200
+
+# Benchmarked entry points: (label, call)
+SCENARIOS = (
+    ('get_llm_insights', call_function),
+    ('POST /insights', call_route),
+    ('POST /insights SSE', call_stream)
+)
+
+def run_scenario(app, call, queries, concurrency):
+    results = []
+    lock = threading.Lock()
+
+    def one(query):
+        outcome = call(app, query)
+        with lock:
+            results.append(outcome)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, queries))
+    wall = time.perf_counter() - start
+    return results, wall
+
+def main():
+    """Drive the assistant's LLM path against a local Ollama stand-in."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark the assistant LLM path against an Ollama stand-in')
+    parser.add_argument('--requests', type=int, default=40, help='Requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=4, help='Concurrent clients')
+    parser.add_argument('--products', type=int, default=500, help='Synthetic products in the database')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed for the synthetic data')
+    parser.add_argument('--model', default='llama3', help='Model to request')
+    parser.add_argument('--tiers', help="Model ladder, smallest first, as 'name=speed,...' (e.g. 'tiny=0.25,llama3')")
+    parser.add_argument('--url', help='Benchmark an already running server instead of starting a stand-in')
+    parser.add_argument('--latency', type=float, default=0.2, help='Stand-in seconds before the first token')
+    parser.add_argument('--token-rate', type=float, default=200.0, help='Stand-in tokens per second')
+    parser.add_argument('--tokens', type=int, default=60, help='Stand-in tokens per answer')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='Stand-in fraction of failed generations')
+    parser.add_argument('--timeout-rate', type=float, default=0.0, help='Stand-in fraction of hanging generations')
+    parser.add_argument('--load-time', type=float, default=0.0, help='Stand-in seconds to load a cold model')
+    parser.add_argument('--no-warmup', action='store_true', help='Skip the model warm-up at app start')
+    parser.add_argument('--read-timeout', type=float, default=Config.OLLAMA_READ_TIMEOUT, help='Ollama read timeout')
+    parser.add_argument('--llm-concurrency', type=int, default=Config.LLM_MAX_CONCURRENCY, help='LLM_MAX_CONCURRENCY')
+    parser.add_argument('--llm-queue', type=int, default=Config.LLM_MAX_QUEUE, help='LLM_MAX_QUEUE')
+    parser.add_argument('--cache', action='store_true', help='Keep the answer cache enabled')
+
+    args = parser.parse_args()
+
+    server = None
+    if args.url:
+        base_url = args.url.rstrip('/')
+    else:
+        # Hanging generations outlast the read timeout so they surface as timeouts
+        settings = StandInSettings(args.tiers or args.model, args.latency, args.token_rate, args.tokens,
+                                   args.failure_rate, args.timeout_rate, args.read_timeout + 1, args.load_time)
+        server = OllamaStandIn(('127.0.0.1', 0), settings).start()
+        base_url = server.url
+
+    app = create_benchmark_app(base_url, args)
+    if not args.no_warmup:
+        from app.services.ollama_service import model_residency
+        # Measure requests against a resident model, as after a normal start-up
+        model_residency.ready.wait(args.load_time + args.read_timeout)
+    print(f"Ollama at {base_url}, {args.products:,} products, {args.requests} requests per scenario, "
+          f"{args.concurrency} clients")
+    print(f"{'scenario':<22}{'p50 ms':>10}{'p99 ms':>10}{'first p50':>11}{'max ms':>10}{'req/s':>9}{'errors':>8}")
+
+    for offset, (label, call) in enumerate(SCENARIOS):
+        # Each scenario asks its own questions
+        queries = questions((offset + 1) * args.requests)[offset * args.requests:]
+        results, wall = run_scenario(app, call, queries, args.concurrency)
+        totals = [total * 1000 for first, total, ok in results]
+        firsts = [first * 1000 for first, total, ok in results]
+        errors = sum(1 for first, total, ok in results if not ok)
+        print(f"{label:<22}{percentile(totals, 0.5):>10.1f}{percentile(totals, 0.99):>10.1f}"
+              f"{percentile(firsts, 0.5):>11.1f}{max(totals):>10.1f}{len(results) / wall:>9.2f}{errors:>8}")
+
+    metrics = app.test_client().get('/api/assistant/metrics').get_json()
+    print(f"LLM queue: {json.dumps(metrics['llm_queue'])}")
+    print(f"Breakers: {json.dumps(metrics['ollama_breakers'])}")
+    for model, tier in metrics['model_tiers']['tiers'].items():
+        print(f"Tier {model}: {json.dumps(tier)}")
+    if server is not None:
+        print(f"Stand-in: {json.dumps(server.stats())}")
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+import os
+import sys
+import time
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+from app.models.export_data import ExportData
+
+# One query per branch of the rule-based assistant
+QUERIES = {
+    'greeting': 'good morning',
+    'farewell': 'bye for now',
+    'low_stock': 'what products are low on stock?',
+    'out_of_stock': 'which items are out of stock',
+    'categories': 'which categories need attention',
+    'health': 'how is my inventory health',
+    'other': 'summarize everything'
+}
+
+def build_inventory(products, categories, seed):
+    """Synthetic inventory snapshot shaped like get_inventory_snapshot()'s frame."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'id': [f'P{i:06d}' for i in range(products)],
+        'name': [f'Product {i}' for i in range(products)],
+        'category': rng.choice([f'Category {i}' for i in range(categories)], products),
+        'supplier': rng.choice([f'Supplier {i}' for i in range(50)], products),
+        'current_stock': rng.integers(0, 200, products),
+        'reorder_level': rng.integers(5, 50, products),
+        'purchase_price': rng.uniform(1, 500, products).round(2),
+        'selling_price': rng.uniform(1, 800, products).round(2),
+        'lead_time': rng.integers(1, 30, products)
+    })
+    df['stock_status'] = np.select(
+        [df['current_stock'] <= 0, df['current_stock'] <= df['reorder_level']],
+        ['OUT_OF_STOCK', 'LOW_STOCK'],
+        default='IN_STOCK'
+    )
+    return df
+
+def main():
+    """Time rule-based insight generation against a synthetic inventory."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark rule-based inventory insights')
+    parser.add_argument('--products', type=int, default=100000, help='Number of synthetic products')
+    parser.add_argument('--categories', type=int, default=25, help='Number of product categories')
+    parser.add_argument('--repeat', type=int, default=10, help='Timed runs per query')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed for the synthetic data')
+
+    args = parser.parse_args()
+
+    df = build_inventory(args.products, args.categories, args.seed)
+    low = int((df['stock_status'] == 'LOW_STOCK').sum())
+    out = int((df['stock_status'] == 'OUT_OF_STOCK').sum())
+    print(f"{args.products:,} products, {args.categories} categories ({low:,} low stock, {out:,} out of stock)")
+    print(f"{'query':<14}{'median ms':>12}{'max ms':>12}{'chars':>12}")
+
+    for name, query in QUERIES.items():
+        # Warm-up run, not timed
+        insights = ExportData.generate_rule_based_insights(df, query)
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            ExportData.generate_rule_based_insights(df, query)
+            timings.append((time.perf_counter() - start) * 1000)
+        print(f"{name:<14}{statistics.median(timings):>12.2f}{max(timings):>12.2f}{len(insights):>12,}")
+
+if __name__ == '__main__':
+    main()
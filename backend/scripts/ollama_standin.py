@@ -0,0 +1,266 @@
+import re
+import json
+import time
+import hashlib
+import threading
+from datetime import datetime, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Words the stand-in builds its answers from
+VOCABULARY = (
+    'stock', 'reorder', 'supplier', 'demand', 'category', 'units', 'levels', 'inventory',
+    'restock', 'sales', 'trend', 'low', 'high', 'week', 'products', 'lead', 'time', 'order',
+    'the', 'and', 'of', 'to', 'is', 'for', 'with', 'should', 'consider', 'increasing'
+)
+
+# Ollama unloads an idle model after five minutes unless told otherwise
+DEFAULT_KEEP_ALIVE = 300.0
+
+class StandInSettings:
+    """Behaviour of the stand-in server; every knob is deterministic."""
+
+    def __init__(self, model='llama3', latency=0.2, token_rate=50.0, tokens=60,
+                 failure_rate=0.0, timeout_rate=0.0, hang=60.0, load_time=0.0):
+        # Served models as 'name' or 'name=speed', comma-separated; speed scales
+        # latency and time per token, e.g. 'llama3.2:1b=0.25,llama3'
+        self.models = parse_models(model)
+        self.model = next(iter(self.models))
+        self.load_time = load_time  # seconds to load the model when it is not resident
+        self.latency = latency  # seconds before the first token
+        self.token_rate = token_rate  # tokens generated per second after the first
+        self.tokens = tokens  # tokens per answer, unless the request asks for fewer
+        self.failure_rate = failure_rate  # fraction of generations answered with HTTP 500
+        self.timeout_rate = timeout_rate  # fraction of generations that hang for ``hang`` seconds
+        self.hang = hang
+
+def parse_models(spec):
+    """Model names and their speed factors from a 'name[=factor],...' spec."""
+    models = {}
+    for item in str(spec).split(','):
+        name, _, factor = item.strip().partition('=')
+        if name:
+            models[name] = float(factor) if factor else 1.0
+    return models or {'llama3': 1.0}
+
+def _every(rate, n):
+    """True for the n-th event (1-based) of an evenly spaced ``rate`` fraction of events."""
+    return rate > 0 and int(n * rate) != int((n - 1) * rate)
+
+def parse_keep_alive(value):
+    """Seconds a model stays loaded for an Ollama ``keep_alive`` value ('30m', '90s', 300, -1)."""
+    if value is None or value == '':
+        return DEFAULT_KEEP_ALIVE
+    if isinstance(value, (int, float)):
+        return float('inf') if value < 0 else float(value)
+    units = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+    match = re.fullmatch(r"(-?\d+(?:\.\d+)?)(ms|s|m|h)?", str(value).strip())
+    if not match:
+        return DEFAULT_KEEP_ALIVE
+    seconds = float(match.group(1)) * units[match.group(2) or 's']
+    return float('inf') if seconds < 0 else seconds
+
+def answer_tokens(prompt, count):
+    """The answer to ``prompt``: the same prompt always gets the same tokens."""
+    seed = hashlib.sha256(prompt.encode('utf-8')).digest()
+    return [VOCABULARY[seed[i % len(seed)] * (i + 1) % len(VOCABULARY)] + ' ' for i in range(count)]
+
+class OllamaStandIn(ThreadingHTTPServer):
+    """
+    Local stand-in for an Ollama server.
+
+    Implements /api/health, /api/tags and /api/generate, streamed and not,
+    with a fixed time to first token and token rate. The model is "loaded"
+    on first use and unloaded after the request's keep_alive, costing
+    ``load_time`` on the next request; an empty prompt only loads it, as
+    with Ollama. Failures and hangs hit
+    an evenly spaced fraction of generations, so the same settings give the
+    same run every time.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, settings=None):
+        super().__init__(address, _Handler)
+        self.settings = settings or StandInSettings()
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self.generations = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.loads = 0
+        self._loaded_until = {}
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def next_generation(self):
+        """Number the next generation and decide whether it fails or hangs."""
+        with self._lock:
+            self.generations += 1
+            n = self.generations
+            if _every(self.settings.timeout_rate, n):
+                self.timeouts += 1
+                return 'timeout'
+            if _every(self.settings.failure_rate, n):
+                self.failures += 1
+                return 'failure'
+            return 'ok'
+
+    def speed(self, model):
+        """Speed factor of a requested model; a ':latest' tag matches the bare name."""
+        models = self.settings.models
+        return models.get(model, models.get(str(model).split(':latest')[0], 1.0))
+
+    def use_model(self, model, keep_alive):
+        """Load ``model`` if it is not resident, then keep it for ``keep_alive``."""
+        # Concurrent requests for a cold model wait for a single load
+        with self._load_lock:
+            with self._lock:
+                loaded_until = self._loaded_until.get(model)
+                cold = loaded_until is None or time.monotonic() >= loaded_until
+                if cold:
+                    self.loads += 1
+            if cold:
+                time.sleep(self.settings.load_time * self.speed(model))
+            with self._lock:
+                self._loaded_until[model] = time.monotonic() + parse_keep_alive(keep_alive)
+        return cold
+
+    def stats(self):
+        with self._lock:
+            return {'generations': self.generations, 'failures': self.failures, 'timeouts': self.timeouts,
+                    'loads': self.loads}
+
+    def start(self):
+        """Serve from a background thread; returns the server."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, data, status=200):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_chunk(self, data):
+        line = json.dumps(data).encode('utf-8') + b'\n'
+        self.wfile.write(f"{len(line):x}\r\n".encode('ascii') + line + b'\r\n')
+        self.wfile.flush()
+
+    def do_GET(self):
+        settings = self.server.settings
+        if self.path == '/api/health':
+            self._send_json({'status': 'ok'})
+        elif self.path == '/api/tags':
+            names = [name if ':' in name else f"{name}:latest" for name in settings.models]
+            self._send_json({'models': [{'name': name, 'model': name} for name in names]})
+        else:
+            self._send_json({'error': 'not found'}, 404)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if self.path != '/api/generate':
+            self._send_json({'error': 'not found'}, 404)
+            return
+        try:
+            request = json.loads(body or b'{}')
+        except ValueError:
+            self._send_json({'error': 'invalid JSON'}, 400)
+            return
+
+        settings = self.server.settings
+        model = request.get('model', settings.model)
+        self.server.use_model(model, request.get('keep_alive'))
+        if not request.get('prompt') and not request.get('system'):
+            self._send_json({'model': model, 'created_at': datetime.now(timezone.utc).isoformat(),
+                             'response': '', 'done': True, 'done_reason': 'load'})
+            return
+
+        outcome = self.server.next_generation()
+        if outcome != 'ok':
+            if outcome == 'timeout':
+                time.sleep(settings.hang)
+            try:
+                self._send_json({'error': f"stand-in generation {outcome}"}, 500)
+            except (BrokenPipeError, ConnectionResetError):
+                # The client gave up waiting
+                self.close_connection = True
+            return
+
+        limit = request.get('max_tokens') or (request.get('options') or {}).get('num_predict')
+        count = min(settings.tokens, limit) if limit else settings.tokens
+        tokens = answer_tokens(request.get('prompt', ''), count)
+        started = time.perf_counter()
+        speed = self.server.speed(model)
+        latency = settings.latency * speed
+        per_token = speed / settings.token_rate if settings.token_rate > 0 else 0.0
+
+        def done(total_seconds):
+            return {'model': model, 'created_at': datetime.now(timezone.utc).isoformat(), 'response': '',
+                    'done': True, 'eval_count': count, 'total_duration': int(total_seconds * 1e9)}
+
+        if request.get('stream', True):
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/x-ndjson')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            try:
+                time.sleep(latency)
+                for i, token in enumerate(tokens):
+                    if i:
+                        time.sleep(per_token)
+                    self._send_chunk({'model': model, 'response': token, 'done': False})
+                self._send_chunk(done(time.perf_counter() - started))
+                self.wfile.write(b'0\r\n\r\n')
+            except (BrokenPipeError, ConnectionResetError):
+                # The client stopped reading
+                self.close_connection = True
+            return
+
+        time.sleep(latency + per_token * max(count - 1, 0))
+        result = done(time.perf_counter() - started)
+        result['response'] = ''.join(tokens)
+        self._send_json(result)
+
+def main():
+    """Run the stand-in server in the foreground."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Deterministic local stand-in for an Ollama server')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on')
+    parser.add_argument('--port', type=int, default=11434, help='Port to listen on')
+    parser.add_argument('--model', default='llama3',
+                        help="Served models, comma-separated, each optionally 'name=speed' (e.g. 'llama3.2:1b=0.25,llama3')")
+    parser.add_argument('--latency', type=float, default=0.2, help='Seconds before the first token')
+    parser.add_argument('--token-rate', type=float, default=50.0, help='Tokens generated per second')
+    parser.add_argument('--tokens', type=int, default=60, help='Tokens per answer')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='Fraction of generations that return HTTP 500')
+    parser.add_argument('--timeout-rate', type=float, default=0.0, help='Fraction of generations that hang')
+    parser.add_argument('--hang', type=float, default=60.0, help='Seconds a hanging generation waits before failing')
+    parser.add_argument('--load-time', type=float, default=0.0, help='Seconds to load the model when it is not resident')
+
+    args = parser.parse_args()
+
+    settings = StandInSettings(args.model, args.latency, args.token_rate, args.tokens,
+                               args.failure_rate, args.timeout_rate, args.hang, args.load_time)
+    server = OllamaStandIn((args.host, args.port), settings)
+    print(f"Ollama stand-in serving {', '.join(settings.models)} on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == '__main__':
+    main()
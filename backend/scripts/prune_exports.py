@@ -0,0 +1,43 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from app.models.export_data import prune_exports, prune_export_index
+
+# Default location of stored exports (backend/exports)
+DEFAULT_EXPORT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'exports')
+
+def main():
+    """Apply the export retention policy to a directory of stored exports."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Prune stored inventory exports')
+    parser.add_argument('--dir', default=Config.EXPORT_DIR or DEFAULT_EXPORT_DIR, help='Export directory')
+    parser.add_argument('--max-age-days', type=int, default=Config.EXPORT_RETENTION_DAYS, help='Delete exports older than this')
+    parser.add_argument('--max-files', type=int, default=Config.EXPORT_RETENTION_MAX_FILES, help='Keep at most this many exports')
+    parser.add_argument('--max-bytes', type=int, default=Config.EXPORT_RETENTION_MAX_BYTES, help='Keep at most this many bytes of exports')
+    parser.add_argument('--dry-run', action='store_true', help='Only report what would be deleted')
+
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.dir):
+        print(f"Export directory not found: {args.dir}")
+        return
+
+    result = prune_exports(
+        args.dir,
+        max_age_days=args.max_age_days,
+        max_files=args.max_files,
+        max_bytes=args.max_bytes,
+        dry_run=args.dry_run
+    )
+    if not args.dry_run:
+        prune_export_index(args.dir)
+
+    action = 'Would remove' if args.dry_run else 'Removed'
+    print(f"{action} {len(result['removed'])} exports ({result['bytes_freed']:,} bytes), kept {result['kept']}")
+
+if __name__ == '__main__':
+    main()
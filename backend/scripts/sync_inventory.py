@@ -0,0 +1,54 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from app.services.inventory_sync import PREFER_CHOICES
+
+# Default inventory CSV (backend/data/inventory_data.csv)
+DEFAULT_CSV_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'inventory_data.csv')
+
+def main():
+    """Reconcile the products table with the inventory CSV, copying only changed rows."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Sync the products table and the inventory CSV')
+    parser.add_argument('--csv', default=DEFAULT_CSV_PATH, help='Inventory CSV file')
+    parser.add_argument('--prefer', choices=PREFER_CHOICES, default=Config.INVENTORY_SYNC_PREFER,
+                        help='Side that wins when both changed a product (skip: leave it and report it)')
+    parser.add_argument('--dry-run', action='store_true', help='Only report what would change')
+    parser.add_argument('--verbose', action='store_true', help='List the product ids behind each change')
+
+    args = parser.parse_args()
+
+    if not os.path.isfile(args.csv):
+        print(f"CSV file not found: {args.csv}")
+        return
+
+    from main import create_app
+    from app.services.inventory_sync import sync_inventory
+
+    app = create_app()
+    with app.app_context():
+        report = sync_inventory(args.csv, dry_run=args.dry_run, prefer=args.prefer)
+
+    action = 'Would apply' if args.dry_run else 'Applied'
+    first = ' (first sync: no baseline, so nothing counts as deleted)' if report['first_sync'] else ''
+    print(f"{action} in {report['seconds']}s{first}: {report['csv_rows']:,} CSV rows, "
+          f"{report['db_rows']:,} database rows, {report['unchanged']:,} unchanged")
+    print(f"  to database: {report['to_db']['insert']} inserts, {report['to_db']['update']} updates, "
+          f"{report['to_db']['delete']} deletes")
+    print(f"  to CSV: {report['to_csv']['upsert']} upserts, {report['to_csv']['delete']} deletes")
+    if args.verbose:
+        for direction, changes in report['changes'].items():
+            for change, product_ids in changes.items():
+                if product_ids:
+                    print(f"  {direction} {change}: {', '.join(product_ids)}")
+    for conflict in report['conflicts']:
+        print(f"  conflict {conflict['product_id']}: {conflict['kind']}, resolved by {conflict['resolution']}")
+    for error in report['errors']:
+        print(f"  error {error['product_id']} ({error['side']}): {error['message']}")
+
+if __name__ == '__main__':
+    main()